@@ -1,29 +1,325 @@
 #!/usr/bin/env python
 
 from __future__ import with_statement
-from grpc.beta import implementations
-
 import zfs_pb2
 import os
 import sys
+import stat
 import errno
 import random
 import time
+import socket
+import threading
+import uuid
+import Queue
+import ctypes
+import ctypes.util
+import contextlib
 
-from functools import partial
 
 from fuse import FUSE, FuseOSError, Operations
+from zfs_cache import CacheIndex, AttrCache, DirCache, WriteBack, PathLocks, Journal, ATTR_TTL
+from zfs_rpc import unreachable, RPC_WINDOW, META_TIMEOUT, BULK_TIMEOUT
+from zfs_vldb import VolumeRouter, VOLUME_REFRESH
+from zfs_common import signature_table, compute_delta, file_chunks, chunk_id, ChunkLocations, \
+    CompressionStats, Packer, unpack, BlockSizer, CODEC_ZLIB, TRANSFER_MAX, STREAMS_PER_CLIENT
+
+CACHE_BYTES = 1 << 30
+CACHE_INODES = 100000
+# The beta stub insists on a deadline even for the callback stream, so it is
+# simply reopened whenever this expires.
+CALLBACK_STREAM_TIMEOUT = 60 * 60
+CALLBACK_RETRY = 5
+# Files bigger than this are opened as sparse copies and fetched block by
+# block as they are read instead of being downloaded on open.
+LARGE_FILE = 64 << 20
+# Fetched blocks are made durable and recorded in the block map this often.
+BLOCKMAP_SYNC = 64
+FILL_BLOCKS = 8
+# Readahead window bounds, in cache blocks, and the number of threads that
+# fetch ahead of sequential readers.
+READAHEAD_MAX = 16
+READAHEAD_WORKERS = 4
+# Smaller files are always stored whole; the signature round trip is not
+# worth it.
+DELTA_MIN = 64 * 1024
+# The delta scan runs at Python speed, fast only over data the server already
+# has. A file is stored whole instead if its size changed by more than
+# DELTA_SIZE_SLACK of the server's copy, or if over half of the first
+# DELTA_PROBE bytes scanned turn out to be new.
+DELTA_SIZE_SLACK = 0.25
+DELTA_PROBE = 2 << 20
+# On the first open in a directory, its uncached files up to this size are
+# fetched together with one FetchMany, at most PREFETCH_FILES of them.
+PREFETCH_SIZE = 64 * 1024
+PREFETCH_FILES = 512
+# Files of at least STRIPE_MIN bytes are fetched as ranges of STRIPE_SIZE
+# bytes over several streams at once, as are the blocks of a background
+# fill. The number of streams adapts to the throughput seen, up to STRIPES,
+# which by default is the server's limit on streams per client.
+STRIPE_MIN = 16 << 20
+STRIPE_SIZE = 4 << 20
+STRIPES = STREAMS_PER_CLIENT
+# One stream more must raise throughput by this factor to be kept. Every
+# STRIPE_PROBE striped fetches a stream more is tried again anyway.
+STRIPE_GAIN = 1.1
+STRIPE_PROBE = 8
+STRIPE_WEIGHT = 0.5
+
+# Positional reads and writes, so threads sharing a file handle do not race
+# on its offset. Python 2 has no os.pread, so they come from libc; without it
+# an lseek and the read or write are done under one lock.
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    _pread = _libc.pread64
+    _pwrite = _libc.pwrite64
+    _pread.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int64]
+    _pwrite.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_size_t, ctypes.c_int64]
+    _pread.restype = _pwrite.restype = ctypes.c_ssize_t
+except (OSError, AttributeError, TypeError):
+    _pread = _pwrite = None
+_seek_lock = threading.Lock()
+
+
+def pread(fd, length, offset):
+    if _pread is None:
+        with _seek_lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            return os.read(fd, length)
+    buf = ctypes.create_string_buffer(length)
+    n = _pread(fd, buf, length, offset)
+    if n < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+    return buf.raw[:n]
+
 
-BLOCK_SIZE = 4096
+def pwrite(fd, data, offset):
+    if _pwrite is None:
+        with _seek_lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            return os.write(fd, data)
+    n = _pwrite(fd, data, len(data), offset)
+    if n < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+    return n
+
+
+class Readahead(object):
+    # Per-handle access pattern tracking for sparse files. While a handle
+    # keeps reading where it left off the window doubles up to max_window
+    # blocks; any seek collapses it to nothing.
+
+    def __init__(self, max_window=READAHEAD_MAX):
+        self.max_window = max_window
+        self.handles = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.issued = 0
+
+    def record(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def advise(self, fh, offset, length, block_size, nblocks):
+        # Returns the block numbers to prefetch after this read.
+        with self.lock:
+            # state: [offset the next sequential read starts at, window,
+            #         last block already handed out for prefetch]
+            state = self.handles.setdefault(fh, [0, 0, -1])
+            if offset == state[0]:
+                state[1] = min(max(state[1] * 2, 1), self.max_window)
+            else:
+                state[1] = 0
+                state[2] = -1
+            state[0] = offset + length
+            if not state[1]:
+                return []
+            next_block = (offset + length + block_size - 1) // block_size
+            first = max(next_block, state[2] + 1)
+            last = min(next_block + state[1], nblocks)
+            if first >= last:
+                return []
+            state[2] = last - 1
+            self.issued += last - first
+            return range(first, last)
+
+    def forget(self, fh):
+        with self.lock:
+            self.handles.pop(fh, None)
+
+
+class StripeTuner(object):
+    # How many streams a striped fetch is spread over. It starts at one and
+    # goes up by one per fetch while the extra stream raises throughput over
+    # that seen with one stream fewer. Once it stops paying, the link, the
+    # server or our own CPU being saturated, it steps back and only tries a
+    # stream more every STRIPE_PROBE fetches.
+
+    def __init__(self, max_stripes=STRIPES):
+        self.max_stripes = max(max_stripes, 1)
+        self.stripes = 1
+        self.ceiling = self.max_stripes
+        # rates: stream count -> smoothed bytes per second
+        self.rates = {}
+        self.fetches = 0
+        self.lock = threading.Lock()
+
+    def count(self):
+        with self.lock:
+            return self.stripes
+
+    def observe(self, stripes, nbytes, seconds):
+        if seconds <= 0 or nbytes <= 0:
+            return
+        with self.lock:
+            rate = nbytes / seconds
+            old = self.rates.get(stripes)
+            if old is not None:
+                rate = old + STRIPE_WEIGHT * (rate - old)
+            self.rates[stripes] = rate
+            self.fetches += 1
+            fewer = self.rates.get(stripes - 1)
+            if fewer is not None and rate < fewer * STRIPE_GAIN:
+                self.stripes = self.ceiling = stripes - 1
+            elif stripes < self.max_stripes and (stripes < self.ceiling or self.fetches % STRIPE_PROBE == 0):
+                self.ceiling = max(self.ceiling, stripes + 1)
+                self.stripes = stripes + 1
+
+    def report(self):
+        with self.lock:
+            rates = " ".join("%d: %.1f MB/s" % (n, rate / (1 << 20)) for n, rate in sorted(self.rates.items()))
+            return "%d fetches, now %d streams (%s)" % (self.fetches, self.stripes, rates or "no data")
+
+
+STAT_KEYS = ('st_atime', 'st_ctime', 'st_gid', 'st_mode', 'st_mtime', 'st_nlink', 'st_size', 'st_uid')
+# FileStat carries these as int64 nanoseconds, in fields named with _ns.
+TIME_KEYS = ('st_atime', 'st_ctime', 'st_mtime')
 
 class ZFS(Operations):
 
-    def __init__(self, root, remote_host):
+    def __init__(self, root, remote_host, cache_bytes=CACHE_BYTES, cache_inodes=CACHE_INODES,
+                 attr_ttl=ATTR_TTL, large_file=LARGE_FILE, background_fill=False,
+                 readahead_max=READAHEAD_MAX, writeback=False, codecs=(CODEC_ZLIB,),
+                 rpc_window=RPC_WINDOW, meta_timeout=META_TIMEOUT, bulk_timeout=BULK_TIMEOUT,
+                 prefetch_size=PREFETCH_SIZE, stripes=STRIPES, stripe_min=STRIPE_MIN, location=None):
         self.root = root
         if not os.listdir(root).__contains__('tmp'):
             os.mkdir(root + "/tmp")
-        channel = implementations.insecure_channel(remote_host, 50051)
-        self.stub = zfs_pb2.beta_create_ZfsRpc_stub(channel)
+        self.cache = CacheIndex(root + "/tmp", cache_bytes, cache_inodes)
+        self.cache.load()
+        # Changes the server has not confirmed, replayed at mount.
+        self.journal = Journal(root + "/tmp")
+        self.journal.load()
+        self.attrs = AttrCache(attr_ttl)
+        self.dirs = DirCache()
+        self.large_file = large_file
+        self.background_fill = background_fill
+        self.fill_queue = Queue.Queue()
+        # handles: fh -> {'flags': open flags, 'dirty': written through this fh},
+        # under handle_lock. Opening, releasing, storing and removing a file is serialized per
+        # path, so concurrent opens of one file share a single fetch.
+        self.handles = {}
+        self.handle_lock = threading.Lock()
+        self.path_locks = PathLocks()
+        self.stores_performed = 0
+        self.stores_skipped = 0
+        # In write-back mode release queues dirty files for a background
+        # upload instead of storing them before returning.
+        self.writeback = None
+        if writeback:
+            self.writeback = WriteBack(root + "/tmp", self._writeback_upload)
+            self.writeback.load()
+        # Chunks of files we fetched or stored, so a fetch can copy data we
+        # already hold in some cached file instead of downloading it again.
+        self.chunks = ChunkLocations()
+        self.chunk_bytes_local = 0
+        self.chunk_bytes_fetched = 0
+        # Codecs offered for file data, most preferred first; empty to send
+        # everything raw.
+        self.codecs = list(codecs)
+        self.compression = CompressionStats()
+        self.readahead = Readahead(readahead_max)
+        self.prefetch_queue = Queue.Queue()
+        # Directories whose small files have been prefetched; 0 turns it off.
+        self.prefetch_size = prefetch_size
+        self.prefetched_dirs = set()
+        self.prefetch_lock = threading.Lock()
+        self.files_prefetched = 0
+        # Striping is off with a single stream.
+        self.stripes = StripeTuner(stripes)
+        self.stripe_min = stripe_min
+        self.client_id = "%s-%s" % (socket.gethostname(), uuid.uuid4().hex)
+        # Calls go to the server holding the volume of their path. Without a
+        # volume location service remote_host holds everything.
+        self.rpc = VolumeRouter(self.client_id, remote_host, location, rpc_window, meta_timeout, bulk_timeout)
+        # callbacks: paths we hold a valid callback promise for. A promise is
+        # only trusted while the break stream of the server that made it is
+        # up; callback_epoch changes every time one drops so in-flight opens
+        # cannot resurrect old promises.
+        self.callbacks = set()
+        self.callback_lock = threading.Lock()
+        self.callback_epoch = 0
+        # endpoint -> break stream, for the servers whose stream is up in
+        # callback_up
+        self.callback_streams = {}
+        self.callback_up = set()
+        self.recent_breaks = {}
+        self.break_seq = 0
+        self.running = False
+
+    def init(self, path):
+        self.cache.start()
+        self.running = True
+        try:
+            self.rpc.refresh()
+        except Exception as e:
+            print "cannot fetch the volume table:", e
+        if self.rpc.location is not None:
+            t = threading.Thread(target=self._volume_loop, name="zfs-volumes")
+            t.daemon = True
+            t.start()
+        self._start_callbacks()
+        if self.background_fill:
+            t = threading.Thread(target=self._fill_loop, name="zfs-fill")
+            t.daemon = True
+            t.start()
+        self._replay()
+        if self.writeback is not None:
+            self.writeback.start()
+        for i in range(READAHEAD_WORKERS):
+            t = threading.Thread(target=self._prefetch_loop, name="zfs-readahead-%d" % i)
+            t.daemon = True
+            t.start()
+
+    def destroy(self, path):
+        print "stores: performed", self.stores_performed, "skipped", self.stores_skipped
+        for line in self.rpc.report():
+            print "rpc:", line
+        print "readahead: hits", self.readahead.hits, "misses", self.readahead.misses, \
+            "blocks prefetched", self.readahead.issued
+        print "small files prefetched:", self.files_prefetched
+        print "striping:", self.stripes.report()
+        self.running = False
+        with self.callback_lock:
+            # None marks a stream still being opened.
+            streams = [stream for stream in self.callback_streams.values() if stream is not None]
+        for stream in streams:
+            stream.cancel()
+        if self.writeback is not None:
+            print "write-back: uploaded", self.writeback.uploaded, "coalesced", self.writeback.coalesced, \
+                "cancelled", self.writeback.cancelled, "failed", self.writeback.failed
+            self.writeback.stop()
+        print "chunks: fetched", self.chunk_bytes_fetched, "bytes, copied", self.chunk_bytes_local, "bytes locally"
+        for line in self.compression.report():
+            print "compression:", line
+        self.cache.stop()
+        self.journal.close()
 
     # Helpers
     # =======
@@ -31,14 +327,373 @@ class ZFS(Operations):
     def _full_path(self, partial):
         if partial.startswith("/"):
             partial = partial[1:]
-        path = os.path.join(self.root, partial)
+        # Normalized, so the mount root is "root", as os.path.dirname gives
+        # it for its entries, and not "root/".
+        path = os.path.normpath(os.path.join(self.root, partial))
         return path
 
+    def _volume_loop(self):
+        while self.running:
+            time.sleep(VOLUME_REFRESH)
+            try:
+                changed = self.rpc.refresh()
+            except Exception as e:
+                print "cannot refresh the volume table:", e
+                continue
+            if changed:
+                # A moved volume's old server no longer tells us about changes.
+                endpoints = self.rpc.endpoints()
+                with self.callback_lock:
+                    self.callback_epoch += 1
+                    self.callbacks.clear()
+                    self.recent_breaks.clear()
+                    gone = [stream for endpoint, stream in self.callback_streams.items()
+                            if endpoint not in endpoints and stream is not None]
+                for stream in gone:
+                    stream.cancel()
+                self._start_callbacks()
+
+    def _start_callbacks(self):
+        # One break stream per server we may call.
+        for endpoint in self.rpc.endpoints():
+            with self.callback_lock:
+                if endpoint in self.callback_streams:
+                    continue
+                self.callback_streams[endpoint] = None
+            t = threading.Thread(target=self._callback_loop, args=(endpoint,), name="zfs-callbacks-" + endpoint)
+            t.daemon = True
+            t.start()
+
+    def _callback_loop(self, endpoint):
+        core = self.rpc.core(endpoint)
+        while self.running and endpoint in self.rpc.endpoints():
+            try:
+                stream = core.stub.CallbackBreaks(
+                    zfs_pb2.ClientId(client_id=self.client_id), CALLBACK_STREAM_TIMEOUT,
+                    metadata=core.metadata)
+                with self.callback_lock:
+                    self.callback_streams[endpoint] = stream
+                for brk in stream:
+                    if not brk.path:
+                        print "callback stream up to", endpoint
+                        with self.callback_lock:
+                            self.callback_up.add(endpoint)
+                        continue
+                    print "callback broken for:", brk.path
+                    self.attrs.invalidate(brk.path)
+                    with self.callback_lock:
+                        self.break_seq += 1
+                        self.recent_breaks[brk.path] = self.break_seq
+                        self.callbacks.discard(brk.path)
+            except Exception as e:
+                print "callback stream failed:", e
+            # Without the stream we cannot hear about changes, so every cached
+            # file of the server goes back to being validated with TestAuth.
+            with self.callback_lock:
+                self.callback_up.discard(endpoint)
+                self.callback_epoch += 1
+                self.callbacks = set(path for path in self.callbacks if self.rpc.endpoint(path) != endpoint)
+                self.recent_breaks.clear()
+            if self.running:
+                time.sleep(CALLBACK_RETRY)
+        with self.callback_lock:
+            del self.callback_streams[endpoint]
+
+    def _callback_token(self):
+        with self.callback_lock:
+            return self.callback_epoch, self.break_seq
+
+    def _grant_callback(self, full_path, token):
+        epoch, seq = token
+        with self.callback_lock:
+            if self.rpc.endpoint(full_path) not in self.callback_up or epoch != self.callback_epoch:
+                return
+            if self.recent_breaks.get(full_path, 0) > seq:
+                return
+            self.callbacks.add(full_path)
+
+    def _has_callback(self, full_path):
+        with self.callback_lock:
+            return full_path in self.callbacks
+
+    def _drop_callback(self, full_path):
+        with self.callback_lock:
+            self.callbacks.discard(full_path)
+
+    def _list_dir(self, full_path, plus=False):
+        # With plus, the attributes of the entries come along and fill the
+        # attribute cache, so the getattr calls that follow a readdir stay
+        # local.
+        cached = self.dirs.get(full_path)
+        if cached is not None and self._has_callback(full_path) and \
+                (not plus or self.attrs.fresh(full_path, cached[1])):
+            self.dirs.hits += 1
+            return cached[1]
+        token = self._callback_token()
+        request = zfs_pb2.FilePath(path=full_path, mode=0, client_id=self.client_id)
+        if cached is not None:
+            request.version = cached[0]
+        print "sending readdir req for:", full_path
+        names = []
+        version = 0
+        not_modified = False
+        for block in self.rpc.stream('FetchDirPlus' if plus else 'FetchDir', request):
+            version = block.version
+            for fileStat in block.stats:
+                self.attrs.put(fileStat.path, self._stat_map(fileStat))
+            if block.not_modified:
+                not_modified = True
+            names.extend(block.names)
+        if not_modified:
+            self.dirs.revalidations += 1
+            names = cached[1]
+        else:
+            self.dirs.misses += 1
+        self.dirs.put(full_path, version, names)
+        self.attrs.note_listing(full_path, names)
+        if version:
+            self._grant_callback(full_path, token)
+        return names
+
+    def _fetch_range(self, full_path, fd, offset, length, version):
+        blocks = self.rpc.stream('FetchRange', zfs_pb2.RangeRequest(path=full_path, offset=offset, length=length,
+                                                                    version=version, block_size=TRANSFER_MAX))
+        got = 0
+        for block in blocks:
+            pwrite(fd, block.data_block, offset + got)
+            got += len(block.data_block)
+        return got == length
+
+    def _run_striped(self, pieces, fetch):
+        # Calls fetch(offset, length) for every piece from as many threads
+        # as the tuner picks, each taking the next piece when done with one,
+        # so a slow stream holds up no other. Returns the first error, after
+        # which no further pieces are started, or None.
+        queue = Queue.Queue()
+        for piece in pieces:
+            queue.put(piece)
+        errors = []
+
+        def worker():
+            while not errors:
+                try:
+                    offset, length = queue.get_nowait()
+                except Queue.Empty:
+                    return
+                try:
+                    fetch(offset, length)
+                except Exception as e:
+                    errors.append(e)
+        streams = min(self.stripes.count(), len(pieces))
+        started = time.time()
+        threads = [threading.Thread(target=worker, name="zfs-stripe-%d" % i) for i in range(streams)]
+        for t in threads:
+            t.daemon = True
+            t.start()
+        for t in threads:
+            t.join()
+        if errors:
+            return errors[0]
+        self.stripes.observe(streams, sum(length for offset, length in pieces), time.time() - started)
+        return None
+
+    def _fetch_striped(self, full_path, tmpFileName, size, version):
+        # Fetches the file into tmpFileName as ranges over several streams at
+        # once, each written at its offset: one stream is held back by flow
+        # control and by unpacking it on a single thread. Returns False if
+        # that failed, the file having changed on the server meanwhile.
+        fd = os.open(tmpFileName, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0666)
+
+        def fetch(offset, length):
+            if not self._fetch_range(full_path, fd, offset, length, version):
+                raise IOError(errno.ESTALE, "file changed on server", full_path)
+        try:
+            os.ftruncate(fd, size)
+            pieces = [(offset, min(STRIPE_SIZE, size - offset)) for offset in xrange(0, size, STRIPE_SIZE)]
+            error = self._run_striped(pieces, fetch)
+        finally:
+            os.close(fd)
+        if error is not None:
+            print "striped fetch of", full_path, "failed:", error
+            os.unlink(tmpFileName)
+            return False
+        return True
+
+    def _fault(self, full_path, offset, length):
+        # Make sure [offset, offset+length) of a sparse cache file is present.
+        # Blocks another thread is already fetching are waited for, not
+        # fetched twice, so readahead and the reader can overlap.
+        bmap = self.cache.blockmap(full_path)
+        if bmap is None:
+            return
+        version = self.cache.lookup(full_path)['version']
+        while True:
+            with bmap.lock:
+                runs, busy = bmap.claim(offset, length)
+                if not runs:
+                    if not busy:
+                        return
+                    bmap.changed.wait()
+                    continue
+            self._fault_runs(full_path, bmap, runs, version)
+
+    def _fault_runs(self, full_path, bmap, runs, version):
+        fd = os.open(full_path, os.O_WRONLY)
+        done = False
+        try:
+            for first, last in runs:
+                start = first * bmap.block_size
+                end = min(last * bmap.block_size, bmap.size)
+                print "faulting in", full_path, "bytes", start, "-", end
+                if not self._fetch_range(full_path, fd, start, end - start, version):
+                    # The holes can no longer be filled consistently.
+                    print "file changed on server while partially cached:", full_path
+                    self.cache.forget(full_path)
+                    self._drop_callback(full_path)
+                    try:
+                        os.unlink(full_path)
+                    except OSError:
+                        pass
+                    raise FuseOSError(errno.EIO)
+            with bmap.lock:
+                for first, last in runs:
+                    for i in xrange(first, last):
+                        bmap.mark(i)
+                bmap.unclaim(runs)
+                done = True
+                # Only blocks whose data is durable may be saved as present.
+                if bmap.complete():
+                    os.fsync(fd)
+                    self.cache.completed(full_path)
+                elif bmap.unsaved >= BLOCKMAP_SYNC:
+                    os.fsync(fd)
+                    bmap.save()
+            self.cache.resize(full_path, bmap.present_bytes())
+        finally:
+            if not done:
+                with bmap.lock:
+                    bmap.unclaim(runs)
+            os.close(fd)
+
+    def _fill_loop(self):
+        while self.running:
+            try:
+                full_path = self.fill_queue.get(timeout=1)
+            except Queue.Empty:
+                continue
+            print "background fill of:", full_path
+            bmap = self.cache.blockmap(full_path)
+            if bmap is None:
+                continue
+            pieces = []
+            for first, last in bmap.missing_runs(0, bmap.size):
+                end = min(last * bmap.block_size, bmap.size)
+                for start in xrange(first * bmap.block_size, end, FILL_BLOCKS * bmap.block_size):
+                    pieces.append((start, min(FILL_BLOCKS * bmap.block_size, end - start)))
+
+            def fill(offset, length):
+                if self.running:
+                    self._fault(full_path, offset, length)
+            error = self._run_striped(pieces, fill)
+            if error is not None:
+                print "background fill of", full_path, "failed:", error
+
+    def _prefetch_loop(self):
+        while self.running:
+            try:
+                full_path, block = self.prefetch_queue.get(timeout=1)
+            except Queue.Empty:
+                continue
+            bmap = self.cache.blockmap(full_path)
+            if bmap is None or bmap.has(block):
+                continue
+            try:
+                self._fault(full_path, block * bmap.block_size, bmap.block_size)
+            except Exception as e:
+                print "readahead of", full_path, "failed:", e
+
+    def _replay(self):
+        # Sends the changes a crash left unconfirmed, in the order they were
+        # made. A change the server refuses, say a mkdir of a directory it
+        # already has, was most likely applied before the crash and is
+        # dropped. If the server cannot be reached the rest waits for the
+        # next mount.
+        for intent in self.journal.entries():
+            print "replaying", intent['op'], "of", intent['path']
+            try:
+                if not self._replay_intent(intent):
+                    print "replay stopped, server did not take the upload of", intent['path']
+                    return
+            except Exception as e:
+                if unreachable(e):
+                    print "replay stopped, server unreachable:", e
+                    return
+                print "server refused replayed", intent['op'], "of", intent['path'], ":", e
+            self.journal.done(intent['seq'])
+
+    def _replay_intent(self, intent):
+        # Returns False if the change has to stay in the journal.
+        op = intent['op']
+        full_path = intent['path']
+        if op == 'dirty':
+            if not os.path.isfile(full_path):
+                return True
+            # The index may have been saved before the file was dirtied.
+            if self.cache.lookup(full_path) is None:
+                self.cache.record(full_path, intent['base'], os.path.getsize(full_path))
+            self.cache.mark_dirty(full_path)
+            fd = os.open(full_path, os.O_RDONLY)
+            try:
+                return self._ship(full_path, fd).status == 1
+            finally:
+                os.close(fd)
+        if op == 'mkdir':
+            self.rpc.call('MakeDir', zfs_pb2.FilePath(path=full_path, mode=intent['mode']))
+        elif op == 'rmdir':
+            self.rpc.call('RemoveDir', zfs_pb2.FilePath(path=full_path, mode=0, client_id=self.client_id))
+        elif op == 'unlink':
+            self.rpc.call('RemoveFile', zfs_pb2.FilePath(path=full_path, mode=0, client_id=self.client_id))
+        elif op == 'rename':
+            self.rpc.call('Rename', zfs_pb2.RenameMsg(old=full_path, new=intent['new'], client_id=self.client_id))
+        elif op == 'chmod':
+            self.rpc.call('SetFileStat', zfs_pb2.FileStat(path=full_path, st_mode=intent['mode']))
+        return True
+
+    @contextlib.contextmanager
+    def _intent(self, op, full_path, **fields):
+        # Journals the change made in the block. If the server could not be
+        # reached the change stands locally and the intent stays open, to be
+        # replayed after the next mount, so the operation succeeds. Any other
+        # failure means it was not made, and replaying it later would make
+        # it behind the user's back.
+        seq = self.journal.begin(op, full_path, **fields)
+        try:
+            yield seq
+        except Exception as e:
+            if not unreachable(e):
+                self.journal.done(seq)
+                raise
+            print "server unreachable,", op, "of", full_path, "is sent after the next mount"
+            return
+        self.journal.done(seq)
+
+    def _dir_changed(self, full_path):
+        # Our own namespace change: the server breaks everyone's callback on
+        # the parent, including ours, but do not wait for the break to arrive.
+        parent = os.path.dirname(full_path)
+        self.dirs.invalidate(parent)
+        self._drop_callback(parent)
+
     def rmdir(self, path):
         full_path = self._full_path(path)
         print "sending rmdir req for:", full_path
-        os.rmdir(full_path)
-        self.stub.RemoveDir(zfs_pb2.FilePath(path=full_path, mode=0), 10)
+        with self._intent('rmdir', full_path):
+            os.rmdir(full_path)
+            self.attrs.invalidate(full_path)
+            self.attrs.forget_listing(full_path)
+            self.dirs.invalidate(full_path)
+            self._dir_changed(full_path)
+            self.rpc.call('RemoveDir', zfs_pb2.FilePath(path=full_path, mode=0, client_id=self.client_id))
         #print "Response: " + response.message
         #return response.message
 
@@ -46,8 +701,11 @@ class ZFS(Operations):
         #print path, " : Hi"
         full_path = self._full_path(path)
         print "sending mkdir req for: ", full_path
-        os.mkdir(full_path, mode)
-        self.stub.MakeDir(zfs_pb2.FilePath(path=full_path, mode=mode), 10)
+        with self._intent('mkdir', full_path, mode=mode):
+            os.mkdir(full_path, mode)
+            self.attrs.invalidate(full_path)
+            self._dir_changed(full_path)
+            self.rpc.call('MakeDir', zfs_pb2.FilePath(path=full_path, mode=mode))
         #print "Response: " + response.message
         #return response.message
 
@@ -58,7 +716,10 @@ class ZFS(Operations):
         print "sending create req for file:", full_path #TODO
         return os.open(full_path, os.O_WRONLY | os.O_CREAT, mode)'''
 
-        self.open(path, 1234)
+        fh = self.open(path, os.O_RDWR)
+        # Even an empty new file has to reach the server.
+        self._mark_dirty(self._full_path(path), fh)
+        return fh
 
         #return self.stub.create(zfs_pb2.Create(path=full_path, mode=mode), 10)
         #print "Response: " + response.message
@@ -67,125 +728,716 @@ class ZFS(Operations):
     def unlink(self, path):
         full_path = self._full_path(path)
         print "sending unlink req for file:", full_path #TODO :
-        os.unlink(full_path)
-        self.stub.RemoveFile(zfs_pb2.FilePath(path=full_path, mode=0), 10)
+        with self._intent('unlink', full_path):
+            with self.path_locks.hold(full_path):
+                os.unlink(full_path)
+                self.journal.mark_clean(full_path)
+                if self.writeback is not None:
+                    # A store still running must not land after the removal.
+                    self.writeback.cancel(full_path)
+                    self.writeback.wait(full_path)
+                self.chunks.forget(full_path)
+                self.cache.forget(full_path)
+            self._drop_callback(full_path)
+            self.attrs.invalidate(full_path)
+            self._dir_changed(full_path)
+            self.rpc.call('RemoveFile', zfs_pb2.FilePath(path=full_path, mode=0, client_id=self.client_id))
         #print "Response: " + response.message
         #return response.message
 
     def getattr(self, path, fh=None):
-        # print "GETATTR: ", path
         full_path = self._full_path(path)
-        #print "sending getattr req for: " + full_path
-        st = os.lstat(full_path)
-        return dict((key, getattr(st, key)) for key in ('st_atime', 'st_ctime', 'st_gid', 'st_mode', 'st_mtime', 'st_nlink', 'st_size', 'st_uid'))
-        '''fileStat = self.stub.GetFileStat(zfs_pb2.FilePath(path=full_path, mode=0), 10)
-        statMap = {'st_atime': fileStat.st_atime,
-                   'st_ctime': fileStat.st_ctime,
-                   'st_mtime': fileStat.st_mtime,
-                   'st_dev': fileStat.st_dev,
-                   'st_ino': fileStat.st_ino,
-                   'st_size': fileStat.st_size,
-                   'st_uid': fileStat.st_uid,
-                   'st_gid': fileStat.st_gid,
-                   'st_mode': fileStat.st_mode,
-                   'st_nlink': fileStat.st_nlink}
-        return statMap'''
+        # An open file may hold local writes the server has not seen yet, and
+        # so may a closed one until its upload lands, so the cached copy is
+        # the authority until then.
+        if fh is not None or self._local_authority(full_path):
+            st = os.lstat(full_path)
+            return dict((key, getattr(st, key)) for key in STAT_KEYS)
+        found, attrs = self.attrs.get(full_path)
+        if not found:
+            # Only what the same server holds can be asked for together.
+            endpoint = self.rpc.endpoint(full_path)
+            batch = [other for other in self.attrs.batch_for(full_path) if self.rpc.endpoint(other) == endpoint]
+            print "sending getattr req for", len(batch), "files"
+            reply = self.rpc.call('GetFileStats', zfs_pb2.FilePaths(paths=batch))
+            for fileStat in reply.stats:
+                stat_map = self._stat_map(fileStat)
+                self.attrs.put(fileStat.path, stat_map)
+                if fileStat.path == full_path:
+                    attrs = stat_map
+        if attrs is None:
+            raise FuseOSError(errno.ENOENT)
+        return attrs
+
+    def _local_authority(self, full_path):
+        # Whether the cached copy is newer than anything the server has.
+        return full_path in self.cache.pinned or \
+            (self.cache.is_dirty(full_path) and os.path.isfile(full_path))
+
+    def _cached_version(self, full_path):
+        # The server's version our copy was taken from, 0 if we have none.
+        entry = self.cache.lookup(full_path)
+        return entry['version'] if entry is not None else 0
+
+    def _stat_map(self, fileStat):
+        if fileStat.error:
+            return None
+        attrs = dict((key, getattr(fileStat, key)) for key in STAT_KEYS if key not in TIME_KEYS)
+        for key in TIME_KEYS:
+            attrs[key] = getattr(fileStat, key + '_ns') / 1e9
+        return attrs
 
     def readdir(self, path, fh):
         full_path = self._full_path(path)
-        print "sending readdir req"
-        files = self.stub.FetchDir(zfs_pb2.FilePath(path=full_path, mode=0), 10)
-        for f in files:
-            yield f.dir_list_block
+        entries = []
+        names = list(self._list_dir(full_path, plus=True))
+        # Files created here whose upload has not landed yet.
+        listed = set(names)
+        for dirty_path in self.cache.dirty_in(full_path):
+            name = os.path.basename(dirty_path)
+            if name not in listed and os.path.isfile(dirty_path):
+                names.append(name)
+        for name in names:
+            entry_path = os.path.normpath(os.path.join(full_path, name))
+            if self._local_authority(entry_path):
+                # Local changes the server may not have; see getattr.
+                st = os.lstat(entry_path)
+                attrs = dict((key, getattr(st, key)) for key in STAT_KEYS)
+            else:
+                attrs = self.attrs.get(entry_path)[1]
+            entries.append((name, attrs, 0))
+        return entries
 
     def open(self, path, flags):
+        with self.path_locks.hold(self._full_path(path)):
+            return self._open(path, flags)
+
+    def _open(self, path, flags):
         full_path = self._full_path(path)
         print "sending open req for file: ", full_path
         # check server mod time
         flag = 0
         reply = zfs_pb2.TestAuthReply()
+        if self.prefetch_size and self.cache.lookup(full_path) is None:
+            self._prefetch_dir(os.path.dirname(full_path))
+        entry = self.cache.lookup(full_path)
+        if entry is not None and entry.get('dirty') and os.path.isfile(full_path):
+            # Validating would refetch over changes we have not stored yet.
+            print "cached copy has unstored changes, opening it:", full_path
+            return self._open_cached(full_path, flags)
+        if entry is not None and entry.get('partial') and full_path in self.cache.pinned and \
+                os.path.isfile(full_path):
+            # Open handles fault their missing blocks in by path, so a new
+            # copy renamed over this one would feed them the wrong file.
+            # It is refetched once they are all closed.
+            print "sparse copy still open, opening it:", full_path
+            return self._open_cached(full_path, flags)
+        if entry is not None and self._has_callback(full_path) and os.path.isfile(full_path):
+            print "callback valid, opening cached copy:", full_path
+            return self._open_cached(full_path, flags)
+        token = self._callback_token()
         if os.path.isfile(full_path):
             print "file exists:", full_path
-            mtime = os.lstat(full_path).st_mtime
-            reply = self.stub.TestAuth(zfs_pb2.TestAuthRequest(path=full_path, st_mtime=mtime), 10)
+            # Validate against the server version we fetched at. A copy the
+            # index does not know is sent as version 0, which never matches.
+            version = entry['version'] if entry is not None else 0
+            reply = self.rpc.call('TestAuth', zfs_pb2.TestAuthRequest(path=full_path, version=version,
+                                                                     client_id=self.client_id))
+            if reply.callback == 1:
+                self._grant_callback(full_path, token)
         else:
             print "file doesn't exist:", full_path
-            files = self.stub.FetchDir(zfs_pb2.FilePath(path=os.getcwd(), mode=0), 10)
             strSplit = full_path.split("/")[-1]
             print "file name: ", strSplit
-            isFound=False
-            for f in files:
-                print "file from server:", f.dir_list_block
-                if f is strSplit:
-                    isFound=True
+            isFound = strSplit in self._list_dir(os.path.dirname(full_path))
             if not isFound:
-                return os.open(full_path, os.O_WRONLY | os.O_CREAT, 0777)
+                fh = self._new_handle(full_path, os.open(full_path, os.O_WRONLY | os.O_CREAT, 0777), flags)
+                self.attrs.invalidate(full_path)
+                self._mark_dirty(full_path, fh)
+                return fh
             else:
                 flag = 1
         print "reply", reply.flag
         if reply.flag == 1 or flag == 1:
             print "File modified on server, fetching it again"
+            # Stat before fetching: if the file changes in between we record
+            # an older version and simply refetch on the next open.
+            if reply.flag == 1:
+                # A stale copy: the reply carries the new version's size.
+                fileStat = zfs_pb2.FileStat(path=full_path, st_size=reply.size, version=reply.version)
+            else:
+                fileStat = self.rpc.call('GetFileStat', zfs_pb2.FilePath(path=full_path, mode=0))
+            version = fileStat.version
             rand = random.randint(10000000, 99999999)
             tmpFileName = self.root + "/tmp/" + str(rand)
+            if fileStat.st_size > self.large_file:
+                return self._open_sparse(full_path, flags, tmpFileName, fileStat)
+            if self.stripes.max_stripes > 1 and fileStat.st_size >= self.stripe_min and \
+                    self._fetch_striped(full_path, tmpFileName, fileStat.st_size, version):
+                os.rename(tmpFileName, full_path)
+                self.cache.record(full_path, version, fileStat.st_size)
+                # FetchRange makes no promise; ask for one on what we now hold.
+                reply = self.rpc.call('TestAuth', zfs_pb2.TestAuthRequest(path=full_path, version=version,
+                                                                          client_id=self.client_id))
+                if reply.flag == 0 and reply.callback == 1:
+                    self._grant_callback(full_path, token)
+                return self._open_cached(full_path, flags)
+            manifest = self._fetch_chunked(full_path, tmpFileName)
+            if manifest is not None:
+                os.rename(tmpFileName, full_path)
+                self.cache.record(full_path, manifest.version, manifest.size)
+                self.chunks.add(full_path, manifest.ids, manifest.lengths)
+                self._grant_callback(full_path, token)
+                return self._open_cached(full_path, flags)
             fd = open(tmpFileName, 'w')
-            data_blocks = self.stub.Fetch(zfs_pb2.FilePath(path=full_path, mode=0), 10)
+            data_blocks = self.rpc.stream('Fetch', zfs_pb2.FilePath(path=full_path, mode=0, client_id=self.client_id,
+                                                                    codecs=self.codecs, block_size=TRANSFER_MAX))
             actlen = 0
             count = 0
             for block in data_blocks:
-                print block.data_block
                 if count == 0:
                     count += 1
-                    actlen = block.data_block
+                    actlen = block.length
                 else:
-                    fd.write(block.data_block)
+                    fd.write(unpack(block.codec, block.data_block, full_path, self.compression))
             fd.close()
             tmplen = os.stat(tmpFileName).st_size
             print "tmplen:", tmplen, "actual len:", actlen
             if not tmplen < actlen:
                 os.rename(tmpFileName, full_path)
+                self.cache.record(full_path, version, tmplen)
+                self._grant_callback(full_path, token)
+            else:
+                os.unlink(tmpFileName)
+            return self._new_handle(full_path, os.open(full_path, flags), flags)
+        return self._open_cached(full_path, flags)
 
-        return os.open(full_path, flags)
+    def _prefetch_dir(self, directory):
+        # Fetches the directory's small files we have no copy of in one
+        # round trip, with callback promises, so opening them afterwards
+        # needs no RPC at all.
+        with self.prefetch_lock:
+            if directory in self.prefetched_dirs:
+                return
+            self.prefetched_dirs.add(directory)
+        paths = []
+        try:
+            for name in self._list_dir(directory, plus=True):
+                path = os.path.normpath(os.path.join(directory, name))
+                attrs = self.attrs.get(path)[1]
+                if attrs is not None and stat.S_ISREG(attrs['st_mode']) and \
+                        attrs['st_size'] <= self.prefetch_size and self.cache.lookup(path) is None:
+                    paths.append(path)
+        except Exception as e:
+            print "cannot list", directory, "for prefetch:", e
+            return
+        if not paths:
+            return
+        print "prefetching", len(paths[:PREFETCH_FILES]), "small files of", directory
+        token = self._callback_token()
+        request = zfs_pb2.FetchManyRequest(paths=paths[:PREFETCH_FILES], client_id=self.client_id,
+                                           codecs=self.codecs, block_size=TRANSFER_MAX,
+                                           max_size=self.prefetch_size)
+        current = None
+        try:
+            for block in self.rpc.stream('FetchMany', request):
+                if block.path:
+                    self._install_prefetched(current, token)
+                    current = None if block.error else (block.path, block.version, block.length, [])
+                elif current is not None:
+                    current[3].append(unpack(block.codec, block.data_block, current[0], self.compression))
+            self._install_prefetched(current, token)
+        except Exception as e:
+            print "prefetch of", directory, "failed:", e
+
+    def _install_prefetched(self, item, token):
+        if item is None:
+            return
+        path, version, length, blocks = item
+        data = ''.join(blocks)
+        if len(data) != length:
+            return
+        with self.path_locks.hold(path):
+            # Opened or created by someone else while the stream ran.
+            if self.cache.lookup(path) is not None or os.path.exists(path):
+                return
+            tmpFileName = self.root + "/tmp/" + str(random.randint(10000000, 99999999))
+            with open(tmpFileName, 'wb') as fd:
+                fd.write(data)
+            try:
+                os.rename(tmpFileName, path)
+            except OSError:
+                os.unlink(tmpFileName)
+                return
+            self.cache.record(path, version, length)
+            self._grant_callback(path, token)
+        self.files_prefetched += 1
+
+    def _fetch_chunked(self, full_path, tmpFileName):
+        # Fetches the file into tmpFileName as chunks, copying the ones some
+        # cached file already holds. Returns the manifest, or None if the
+        # file has to be fetched whole.
+        try:
+            manifest = self.rpc.call('GetManifest', zfs_pb2.FilePath(path=full_path, mode=0,
+                                                                     client_id=self.client_id))
+        except Exception as e:
+            print "no manifest for", full_path, ":", e
+            return None
+        if manifest.error:
+            return None
+        # chunk id -> offsets it still has to be written at
+        missing = {}
+        offset = 0
+        with open(tmpFileName, 'wb') as fd:
+            for cid, length in zip(manifest.ids, manifest.lengths):
+                data = self.chunks.read(cid)
+                if data is None:
+                    missing.setdefault(cid, []).append(offset)
+                else:
+                    fd.seek(offset)
+                    fd.write(data)
+                    self.chunk_bytes_local += length
+                offset += length
+            if missing:
+                request = zfs_pb2.ChunkIds(ids=missing.keys(), codecs=self.codecs, path=full_path)
+                for chunk in self.rpc.stream('FetchChunks', request):
+                    data = unpack(chunk.codec, chunk.data, full_path, self.compression)
+                    if chunk_id(data) != chunk.id:
+                        continue
+                    for at in missing.pop(chunk.id, []):
+                        fd.seek(at)
+                        fd.write(data)
+                        self.chunk_bytes_fetched += len(data)
+            fd.truncate(manifest.size)
+        if missing:
+            print "server is missing chunks of", full_path
+            os.unlink(tmpFileName)
+            return None
+        return manifest
+
+    def _open_cached(self, full_path, flags):
+        self.cache.touch(full_path)
+        return self._new_handle(full_path, os.open(full_path, flags), flags)
+
+    def _new_handle(self, full_path, fh, flags):
+        self.cache.pin(full_path)
+        handle = {'flags': flags, 'dirty': False}
+        if self.cache.blockmap(full_path) is not None:
+            # The sparse copy this handle faults its blocks into.
+            handle['ino'] = os.fstat(fh).st_ino
+        with self.handle_lock:
+            self.handles[fh] = handle
+        return fh
+
+    def _check_sparse(self, full_path, fh):
+        # A sparse copy dropped after a failed fault can no longer be filled
+        # in; faulting blocks in by path would fill whatever copy is there
+        # now instead.
+        with self.handle_lock:
+            ino = self.handles.get(fh, {}).get('ino')
+        if ino is None:
+            return
+        try:
+            current = os.stat(full_path).st_ino
+        except OSError:
+            current = None
+        if current != ino:
+            raise FuseOSError(errno.EIO)
+
+    def _handle_dirty(self, fh):
+        with self.handle_lock:
+            handle = self.handles.get(fh)
+            return handle is not None and handle['dirty']
+
+    def _mark_dirty(self, full_path, fh=None, mode=None, mode_seq=None):
+        entry = self.cache.lookup(full_path)
+        self.journal.mark_dirty(full_path, entry['version'] if entry is not None else 0)
+        with self.handle_lock:
+            handle = self.handles.get(fh)
+            if handle is not None:
+                handle['dirty'] = True
+        self.cache.mark_dirty(full_path, mode, mode_seq)
+
+    def _open_sparse(self, full_path, flags, tmpFileName, fileStat):
+        print "large file, fetching blocks on demand:", full_path
+        with open(tmpFileName, 'w') as fd:
+            fd.truncate(fileStat.st_size)
+        os.rename(tmpFileName, full_path)
+        self.cache.record(full_path, fileStat.version, 0, length=fileStat.st_size)
+        if self.background_fill:
+            self.fill_queue.put(full_path)
+        return self._new_handle(full_path, os.open(full_path, flags), flags)
 
     def write(self, path, buf, offset, fh):
         full_path = self._full_path(path)
         print "sending write req for file: ", full_path
-        os.lseek(fh, offset, os.SEEK_SET)
-        return os.write(fh, buf)
+        self._check_sparse(full_path, fh)
+        self._fault(full_path, offset, len(buf))
+        self._mark_dirty(full_path, fh)
+        return pwrite(fh, buf, offset)
+
+    def truncate(self, path, length, fh=None):
+        full_path = self._full_path(path)
+        print "truncating file:", full_path, "to", length
+        if fh is None:
+            # Bring the file into the cache, truncate it there and store it.
+            fh = self.open(path, os.O_RDWR)
+            try:
+                self.truncate(path, length, fh)
+            finally:
+                self.release(path, fh)
+            return
+        bmap = self.cache.blockmap(full_path)
+        if bmap is not None:
+            self._fault(full_path, 0, bmap.size)
+        os.ftruncate(fh, length)
+        self._mark_dirty(full_path, fh)
 
     def release(self, path, fh):
+        with self.path_locks.hold(self._full_path(path)):
+            return self._release(path, fh)
+
+    def _release(self, path, fh):
         full_path = self._full_path(path)
         print "sending release req for file: ", full_path
-        os.lseek(fh, 0, 0)
-        chunk = self.generate_chunk_iter(full_path)
-        self.stub.Store(chunk, 10)
-        return os.close(fh)
+        with self.handle_lock:
+            handle = self.handles.pop(fh, None)
+        self.readahead.forget(fh)
+        try:
+            if (handle is not None and handle['dirty']) or self.cache.is_dirty(full_path):
+                if self.writeback is not None:
+                    print "queueing upload of:", full_path
+                    self.writeback.enqueue(full_path)
+                else:
+                    self._ship(full_path, fh)
+            else:
+                print "file not modified, skipping store:", full_path
+                self.stores_skipped += 1
+                bmap = self.cache.blockmap(full_path)
+                if bmap is not None:
+                    # Keep the sparse copy and what we fetched of it.
+                    with bmap.lock:
+                        os.fsync(fh)
+                        bmap.save()
+        finally:
+            # The handle is gone whatever happened to the store; a failed
+            # one leaves the file dirty for the next close or the journal.
+            self.cache.unpin(full_path)
+            self.attrs.invalidate(full_path)
+            os.close(fh)
+
+    def _ship(self, full_path, fh):
+        # Upload the cached copy; on success it is clean again.
+        entry = self.cache.lookup(full_path)
+        mode = entry.get('mode') if entry is not None else None
+        mode_seq = entry.get('mode_seq') if entry is not None else None
+        bmap = self.cache.blockmap(full_path)
+        self._fault(full_path, 0, bmap.size if bmap is not None else 0)
+        changes = self.cache.change_count(full_path)
+        size = os.fstat(fh).st_size
+        reply = None
+        # Chunking runs at Python speed, so it is only worth it for a file
+        # the server has chunked, which we then fetched or stored as chunks.
+        if size >= DELTA_MIN and self.chunks.has_file(full_path):
+            reply = self._store_chunks(full_path, size)
+        if (reply is None or reply.status != 1) and size >= DELTA_MIN and entry is not None \
+                and entry['version']:
+            reply = self._store_delta(full_path, size)
+        if reply is None or reply.status != 1:
+            reply = self.rpc.call('Store', lambda: self.generate_chunk_iter(full_path), path=full_path)
+        if reply.status != 1:
+            print "store failed, file stays dirty:", full_path, reply.error_message
+            return reply
+        self.stores_performed += 1
+        # Our copy is now the server's current version, unless another
+        # handle wrote to it while it was being sent.
+        self.cache.record(full_path, reply.version, size)
+        if self.cache.change_count(full_path) != changes:
+            self.cache.mark_dirty(full_path)
+        else:
+            self.journal.mark_clean(full_path)
+        if mode is not None:
+            # Left in the journal if this fails, to be replayed at mount.
+            try:
+                stat_reply = self.rpc.call('SetFileStat', zfs_pb2.FileStat(path=full_path, st_mode=mode,
+                                                                          version=reply.version))
+                applied = stat_reply.status == 1
+            except Exception as e:
+                print "cannot set mode of", full_path, ":", e
+                applied = False
+            if applied:
+                self.cache.advance(full_path, reply.version, stat_reply.version)
+                if mode_seq is not None:
+                    self.journal.done(mode_seq)
+        return reply
+
+    def _writeback_upload(self, full_path):
+        # Files the journal replay already stored are clean by now.
+        if not os.path.isfile(full_path) or not self.cache.is_dirty(full_path):
+            return True
+        # Not under the path lock, so opening the file meanwhile does not
+        # wait for the upload; writes made while it runs leave it dirty.
+        fd = os.open(full_path, os.O_RDONLY)
+        try:
+            reply = self._ship(full_path, fd)
+        finally:
+            os.close(fd)
+        return reply.status == 1
+
+    def _store_chunks(self, full_path, size):
+        # Sends only the chunks the server has in no file or chunk store.
+        # Returns the StoreManifest reply, or None to fall back.
+        ids = []
+        lengths = []
+        with open(full_path, 'rb') as reader:
+            for cid, data in file_chunks(reader):
+                ids.append(cid)
+                lengths.append(len(data))
+        try:
+            request = zfs_pb2.ChunkIds(ids=list(set(ids)), path=full_path)
+            missing = set(self.rpc.call('MissingChunks', request).ids)
+            if missing:
+                reply = self.rpc.call('PutChunks',
+                                      lambda: self.generate_chunk_data_iter(full_path, ids, lengths, set(missing)),
+                                      path=full_path)
+                if reply.status != 1:
+                    print "chunk upload failed:", reply.error_message
+                    return None
+            print "sending manifest store req for file:", full_path
+            reply = self.rpc.call('StoreManifest', zfs_pb2.Manifest(path=full_path, ids=ids, lengths=lengths,
+                                                                    size=sum(lengths), client_id=self.client_id))
+        except Exception as e:
+            print "chunked store of", full_path, "failed:", e
+            return None
+        if reply.status == 1:
+            self.chunks.add(full_path, ids, lengths)
+        else:
+            print "manifest store rejected:", reply.error_message
+        return reply
+
+    def generate_chunk_data_iter(self, full_path, ids, lengths, missing):
+        sent = 0
+        packer = Packer(self.codecs, full_path, self.compression)
+        first = True
+        with open(full_path, 'rb') as reader:
+            for cid, length in zip(ids, lengths):
+                data = reader.read(length)
+                if cid not in missing:
+                    continue
+                missing.discard(cid)
+                # A chunk that changed under us is left out; the manifest
+                # store then fails and the file is stored whole.
+                if chunk_id(data) == cid:
+                    sent += length
+                    codec, payload = packer.pack(data)
+                    yield zfs_pb2.ChunkData(id=cid, data=payload, codec=codec, path=full_path if first else '')
+                    first = False
+        print "chunks for", full_path, ":", sent, "bytes sent"
+
+    def _store_delta(self, full_path, size):
+        # Returns the StoreDelta reply, or None if the server has no usable
+        # base version and the file has to be stored whole.
+        try:
+            blocks = self.rpc.stream('GetSignatures', zfs_pb2.FilePath(path=full_path, mode=0))
+            header = next(blocks)
+            weaks = []
+            strongs = []
+            for block in blocks:
+                weaks.extend(block.weak)
+                strongs.extend(block.strong)
+        except Exception as e:
+            print "no signatures for", full_path, ":", e
+            return None
+        if abs(size - header.size) > header.size * DELTA_SIZE_SLACK:
+            print "size of", full_path, "changed too much for a delta"
+            return None
+        table = signature_table(weaks, strongs, header.block_size, header.size)
+        if not self._delta_pays(full_path, header.block_size, table):
+            print "delta for", full_path, "is mostly new data, storing whole"
+            return None
+        print "sending delta store req for file:", full_path
+        reply = self.rpc.call('StoreDelta', lambda: self.generate_delta_iter(full_path, header, table, size),
+                              path=full_path)
+        if reply.status != 1:
+            print "delta store rejected:", reply.error_message
+        return reply
+
+    def _delta_pays(self, full_path, block_size, table):
+        # Scans the start of the file, stopping as soon as too much of it is
+        # literal.
+        scanned = 0
+        literal = 0
+        with open(full_path, 'rb') as reader:
+            for kind, value in compute_delta(reader, block_size, table):
+                if kind == 'copy':
+                    scanned += block_size
+                else:
+                    scanned += len(value)
+                    literal += len(value)
+                    if literal > DELTA_PROBE / 2:
+                        return False
+                if scanned >= DELTA_PROBE:
+                    break
+        return True
+
+    def generate_delta_iter(self, full_path, header, table, size):
+        yield zfs_pb2.DeltaBlock(path=full_path, base_version=header.version, length=size,
+                                 block_size=header.block_size, client_id=self.client_id)
+        # Consecutive matching blocks are sent as one copy run.
+        run_start = None
+        run_count = 0
+        literal = 0
+        with open(full_path, 'rb') as reader:
+            for kind, value in compute_delta(reader, header.block_size, table):
+                if kind == 'copy':
+                    if run_start is not None and value == run_start + run_count:
+                        run_count += 1
+                        continue
+                    if run_start is not None:
+                        yield zfs_pb2.DeltaBlock(copy_index=run_start, copy_count=run_count)
+                    run_start = value
+                    run_count = 1
+                else:
+                    if run_start is not None:
+                        yield zfs_pb2.DeltaBlock(copy_index=run_start, copy_count=run_count)
+                        run_start = None
+                    literal += len(value)
+                    yield zfs_pb2.DeltaBlock(literal=value)
+        if run_start is not None:
+            yield zfs_pb2.DeltaBlock(copy_index=run_start, copy_count=run_count)
+        print "delta for", full_path, ":", literal, "of", size, "bytes sent"
 
     def generate_chunk_iter(self, full_path):
-         yield zfs_pb2.FileDataBlock(data_block=full_path)
+         size = os.path.getsize(full_path)
+         yield zfs_pb2.FileDataBlock(path=full_path, client_id=self.client_id, length=size)
+         packer = Packer(self.codecs, full_path, self.compression)
+         sizer = BlockSizer(size)
          fd = open(full_path)
          with fd as reader:
-            for chunk in iter(partial(reader.read, BLOCK_SIZE), ''):
-                yield zfs_pb2.FileDataBlock(data_block=chunk)
+            while True:
+                chunk = reader.read(sizer.block_size)
+                if not chunk:
+                    break
+                codec, payload = packer.pack(chunk)
+                yield zfs_pb2.FileDataBlock(data_block=payload, codec=codec)
+                sizer.sent(len(payload))
 
     def read(self, path, length, offset, fh):
         full_path = self._full_path(path)
         print "reading file: ", full_path
-        os.lseek(fh, offset, os.SEEK_SET)
-        return os.read(fh, length)
+        self._check_sparse(full_path, fh)
+        bmap = self.cache.blockmap(full_path)
+        if bmap is not None:
+            self.readahead.record(not bmap.missing_runs(offset, length))
+            self._fault(full_path, offset, length)
+            for block in self.readahead.advise(fh, offset, length, bmap.block_size, bmap.nblocks):
+                self.prefetch_queue.put((full_path, block))
+        return pread(fh, length, offset)
 
     def flush(self, path, fh):
         full_path = self._full_path(path)
         print "sending flush req for file: ", full_path
+        # Uploads queued by earlier closes must be on the server first.
+        if self.writeback is not None and not self.writeback.wait(full_path):
+            raise FuseOSError(errno.EIO)
         return os.fsync(fh)
 
     def fsync(self, path, fdatasync, fh):
         full_path = self._full_path(path)
         print "sending fsync req for file: ", full_path
-        return self.flush(path, fh)
+        self.flush(path, fh)
+        with self.path_locks.hold(full_path):
+            if self._handle_dirty(fh) or self.cache.is_dirty(full_path):
+                if self.writeback is not None:
+                    self.writeback.cancel(full_path)
+                reply = self._ship(full_path, fh)
+                if reply.status == 1:
+                    with self.handle_lock:
+                        if fh in self.handles:
+                            self.handles[fh]['dirty'] = False
+
+    def chmod(self, path, mode):
+        full_path = self._full_path(path)
+        print "sending chmod req for:", full_path
+        seq = self.journal.begin('chmod', full_path, mode=mode)
+        version = self._cached_version(full_path)
+        try:
+            if os.path.exists(full_path):
+                os.chmod(full_path, mode)
+            self.attrs.invalidate(full_path)
+            reply = self.rpc.call('SetFileStat', zfs_pb2.FileStat(path=full_path, st_mode=mode, version=version))
+        except Exception as e:
+            if not unreachable(e):
+                self.journal.done(seq)
+                raise
+            print "server unreachable, chmod of", full_path, "is sent after the next mount"
+            return 0
+        if reply.status != 1:
+            if not self.cache.is_dirty(full_path):
+                self.journal.done(seq)
+                raise FuseOSError(errno.EIO)
+            # Not on the server yet; applied after the file is first stored,
+            # and replayed after its upload if we crash first. _ship closes
+            # the intent once the mode is on the server.
+            superseded = self.cache.take_mode(full_path)
+            self._mark_dirty(full_path, mode=mode, mode_seq=seq)
+        else:
+            # Our copy is still current: the chmod is ours.
+            self.cache.advance(full_path, version, reply.version)
+            superseded = self.cache.take_mode(full_path)
+            self.journal.done(seq)
+        # An earlier chmod still waiting for the store must not be applied
+        # over this one, now or at the next mount.
+        if superseded is not None:
+            self.journal.done(superseded)
+        return 0
 
     def rename(self, old, new):
         print "sending rename req"
-        return self.stub.Rename(zfs_pb2.FilePath(old=self._full_path(old), new=self._full_path(new)), 10)
+        old_path = self._full_path(old)
+        new_path = self._full_path(new)
+        # Volumes are renamed within, never across; the caller copies instead.
+        if self.rpc.endpoint(old_path) != self.rpc.endpoint(new_path):
+            raise FuseOSError(errno.EXDEV)
+        # The server can only rename what it has, under a directory too.
+        if self.writeback is not None and not self.writeback.wait(old_path):
+            raise FuseOSError(errno.EIO)
+        # Both paths are locked, always in the same order.
+        first, second = sorted([old_path, new_path])
+        with self.path_locks.hold(first):
+            with self.path_locks.hold(second):
+                version = self._cached_version(old_path)
+                reply = None
+                with self._intent('rename', old_path, new=new_path):
+                    # Made here even if the server cannot be reached, as it
+                    # is sent after the next mount; not if it refuses.
+                    deferred = None
+                    try:
+                        reply = self.rpc.call('Rename', zfs_pb2.RenameMsg(old=old_path, new=new_path,
+                                                                          client_id=self.client_id, version=version))
+                    except Exception as e:
+                        if not unreachable(e):
+                            raise
+                        deferred = e
+                    self._drop_callback(old_path)
+                    self._drop_callback(new_path)
+                    self.attrs.invalidate(old_path)
+                    self.attrs.invalidate(new_path)
+                    self._dir_changed(old_path)
+                    self._dir_changed(new_path)
+                    self.dirs.invalidate(old_path)
+                    if os.path.exists(old_path):
+                        os.rename(old_path, new_path)
+                    self.chunks.forget(old_path)
+                    self.chunks.forget(new_path)
+                    self.cache.rename(old_path, new_path)
+                    self.journal.rename(old_path, new_path)
+                    if self.writeback is not None:
+                        self.writeback.rename(old_path, new_path)
+                    if deferred is not None:
+                        raise deferred
+                    self.cache.advance(new_path, version, reply.version)
+        return reply
 
     '''def release(self, path, fh):
         full_path = self._full_path(path)
@@ -198,11 +1450,6 @@ class ZFS(Operations):
         if not os.access(full_path, mode):
             raise FuseOSError(errno.EACCES)
 
-    def chmod(self, path, mode):
-        print "sending chmod req"
-        full_path = self._full_path(path)
-        return os.chmod(full_path, mode)
-
     def chown(self, path, uid, gid):
         print "sending chown req"
         full_path = self._full_path(path)
@@ -244,16 +1491,19 @@ class ZFS(Operations):
         return os.utime(self._full_path(path), times)'''
 
 
-def main(mntPoint, mountee, remote):
-    FUSE(ZFS(mountee, remote), mntPoint, nothreads=True, foreground=True)
+def main(mntPoint, mountee, remote, location=None):
+    FUSE(ZFS(mountee, remote, location=location), mntPoint, nothreads=False, foreground=True)
 
 
 if __name__ == '__main__':
     mntPoint = "/users/vvaidhy/mnt"
     mountee = "/users/vvaidhy/mountee"
     remote = "128.104.222.43"
-    if (len(sys.argv) == 4):
+    location = None
+    if (len(sys.argv) >= 4):
         mntPoint = sys.argv[1]
         mountee = sys.argv[2]
         remote = sys.argv[3]
-    main(mntPoint, mountee, remote)
+    if (len(sys.argv) == 5):
+        location = sys.argv[4]
+    main(mntPoint, mountee, remote, location)
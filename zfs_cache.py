@@ -0,0 +1,823 @@
+import os
+import json
+import collections
+import contextlib
+import hashlib
+import threading
+import time
+
+INDEX_NAME = "cache.idx"
+EVICT_INTERVAL = 30
+# Eviction stops once usage drops below this fraction of the budget so that
+# we do not run the evictor again on the very next fetch.
+LOW_WATER = 0.9
+ATTR_TTL = 3
+ATTR_BATCH = 512
+FAULT_BLOCK = 1 << 20
+WRITEBACK_NAME = "writeback"
+WRITEBACK_RETRY = 5
+# Uploads of different files run this many at a time.
+WRITEBACK_WORKERS = 4
+JOURNAL_NAME = "journal"
+
+
+class CacheIndex(object):
+    # Tracks every file cached under the mountee root: the server version it
+    # was fetched at, its size and when it was last used. The index lives in
+    # the client's private tmp dir so a remount starts with a warm cache.
+
+    def __init__(self, cache_dir, max_bytes, max_inodes, interval=EVICT_INTERVAL):
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(cache_dir, INDEX_NAME)
+        self.max_bytes = max_bytes
+        self.max_inodes = max_inodes
+        self.interval = interval
+        self.entries = {}
+        self.pinned = {}
+        self.blockmaps = {}
+        self.changes = {}
+        self.total_bytes = 0
+        self.evictions = 0
+        self.lock = threading.RLock()
+        self.dirty = False
+        self.wakeup = threading.Event()
+        self.running = False
+        self.thread = None
+
+    def load(self):
+        # Staging files from a fetch that was interrupted by a crash are named
+        # with random digits; they are never valid cache contents.
+        for name in os.listdir(self.cache_dir):
+            if name.isdigit():
+                print "removing stale staging file:", name
+                os.unlink(os.path.join(self.cache_dir, name))
+        maps = set(name for name in os.listdir(self.cache_dir) if name.endswith(".map"))
+        try:
+            with open(self.index_path) as f:
+                entries = json.load(f)
+        except (IOError, ValueError):
+            print "no usable cache index, starting cold"
+            entries = {}
+        with self.lock:
+            self.entries = {}
+            self.total_bytes = 0
+            for path, entry in entries.iteritems():
+                if not os.path.isfile(path):
+                    continue
+                if entry.get('partial'):
+                    map_name = os.path.basename(self._map_path(path))
+                    if map_name not in maps:
+                        # Without its block map a sparse file is just holes.
+                        os.unlink(path)
+                        continue
+                    maps.discard(map_name)
+                else:
+                    entry['size'] = os.lstat(path).st_size
+                self.entries[path] = entry
+                self.total_bytes += entry['size']
+        for name in maps:
+            os.unlink(os.path.join(self.cache_dir, name))
+        print "cache index loaded:", len(self.entries), "files,", self.total_bytes, "bytes"
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            data = json.dumps(self.entries)
+            self.dirty = False
+        tmp_path = self.index_path + ".new"
+        with open(tmp_path, 'w') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmp_path, self.index_path)
+
+    def lookup(self, path):
+        with self.lock:
+            return self.entries.get(path)
+
+    def record(self, path, version, size, length=None):
+        # length is given for a sparse copy that is filled in on demand; size
+        # is then the number of bytes actually present.
+        with self.lock:
+            old = self.entries.get(path)
+            if old is not None:
+                self.total_bytes -= old['size']
+            self._drop_blockmap(path)
+            entry = {'version': version, 'size': size, 'atime': time.time()}
+            if length is not None:
+                entry['partial'] = True
+                entry['length'] = length
+                self.blockmaps[path] = BlockMap(self._map_path(path), length)
+            self.entries[path] = entry
+            self.total_bytes += size
+            self.dirty = True
+            over = self._over_budget()
+        if over:
+            self.wakeup.set()
+
+    def advance(self, path, version, new_version):
+        # The server gave our copy, at version, a new version without
+        # changing its contents: a chmod or rename of our own.
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry['version'] == version and new_version:
+                entry['version'] = new_version
+                self.dirty = True
+
+    def touch(self, path):
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None:
+                entry['atime'] = time.time()
+                self.dirty = True
+
+    def resize(self, path, size):
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is None:
+                return
+            self.total_bytes += size - entry['size']
+            entry['size'] = size
+            self.dirty = True
+
+    def mark_dirty(self, path, mode=None, mode_seq=None):
+        # The cached copy has changes the server has not seen. A file created
+        # locally gets an entry with version 0 here. mode is a chmod that
+        # could not be applied on the server yet, journaled as mode_seq.
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is None:
+                entry = {'version': 0, 'size': 0, 'atime': time.time()}
+                self.entries[path] = entry
+            entry['dirty'] = True
+            if mode is not None:
+                entry['mode'] = mode
+                entry['mode_seq'] = mode_seq
+            self.changes[path] = self.changes.get(path, 0) + 1
+            self.dirty = True
+
+    def dirty_in(self, directory):
+        # Dirty files directly in directory.
+        with self.lock:
+            return [path for path, entry in self.entries.iteritems()
+                    if entry.get('dirty') and os.path.dirname(path) == directory]
+
+    def take_mode(self, path):
+        # Drops the chmod waiting for the file to be stored, if any, and
+        # returns its journal seq.
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is None or 'mode' not in entry:
+                return None
+            del entry['mode']
+            self.dirty = True
+            return entry.pop('mode_seq', None)
+
+    def change_count(self, path):
+        # Bumped by every mark_dirty, so a store can tell whether the file
+        # was written to while it was being uploaded.
+        with self.lock:
+            return self.changes.get(path, 0)
+
+    def is_dirty(self, path):
+        with self.lock:
+            entry = self.entries.get(path)
+            return entry is not None and entry.get('dirty', False)
+
+    def forget(self, path):
+        with self.lock:
+            entry = self.entries.pop(path, None)
+            if entry is not None:
+                self.total_bytes -= entry['size']
+                self.dirty = True
+                self._drop_blockmap(path)
+
+    def _map_path(self, path):
+        if isinstance(path, unicode):
+            path = path.encode('utf-8')
+        return os.path.join(self.cache_dir, hashlib.md5(path).hexdigest() + ".map")
+
+    def _drop_blockmap(self, path):
+        self.blockmaps.pop(path, None)
+        try:
+            os.unlink(self._map_path(path))
+        except OSError:
+            pass
+
+    def blockmap(self, path):
+        # The block map of a partially fetched file, None once it is complete.
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is None or not entry.get('partial'):
+                return None
+            bmap = self.blockmaps.get(path)
+            if bmap is None:
+                bmap = BlockMap.load(self._map_path(path), entry['length'])
+                self.blockmaps[path] = bmap
+            return bmap
+
+    def completed(self, path):
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is None:
+                return
+            entry.pop('partial', None)
+            entry.pop('length', None)
+            self._drop_blockmap(path)
+            self.dirty = True
+
+    def rename(self, old, new):
+        # Handles both a single file and every cached file under a directory.
+        with self.lock:
+            prefix = old + "/"
+            for path in self.entries.keys():
+                if path == old:
+                    target = new
+                elif path.startswith(prefix):
+                    target = new + path[len(old):]
+                else:
+                    continue
+                bmap = self.blockmap(path)
+                entry = self.entries.pop(path)
+                self._drop_blockmap(path)
+                self.forget(target)
+                self.entries[target] = entry
+                if bmap is not None:
+                    bmap.map_path = self._map_path(target)
+                    bmap.save()
+                    self.blockmaps[target] = bmap
+                if path in self.pinned:
+                    self.pinned[target] = self.pinned.pop(path)
+                self.dirty = True
+
+    def pin(self, path):
+        with self.lock:
+            self.pinned[path] = self.pinned.get(path, 0) + 1
+
+    def unpin(self, path):
+        with self.lock:
+            count = self.pinned.get(path, 0) - 1
+            if count > 0:
+                self.pinned[path] = count
+            else:
+                self.pinned.pop(path, None)
+
+    def _over_budget(self):
+        return self.total_bytes > self.max_bytes or len(self.entries) > self.max_inodes
+
+    def evict(self):
+        with self.lock:
+            if not self._over_budget():
+                return 0
+            byte_goal = self.max_bytes * LOW_WATER
+            inode_goal = self.max_inodes * LOW_WATER
+            victims = sorted(self.entries.iteritems(), key=lambda item: item[1]['atime'])
+            count = 0
+            for path, entry in victims:
+                if self.total_bytes <= byte_goal and len(self.entries) <= inode_goal:
+                    break
+                if path in self.pinned or entry.get('dirty'):
+                    continue
+                bmap = self.blockmaps.get(path)
+                if bmap is not None and bmap.inflight:
+                    # A fault or prefetch is writing into it.
+                    continue
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+                self.forget(path)
+                count += 1
+            self.evictions += count
+        print "evicted", count, "files; cache now", self.total_bytes, "bytes"
+        return count
+
+    def _run(self):
+        while self.running:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            try:
+                self.evict()
+                self.save()
+            except (OSError, IOError) as e:
+                print "cache maintenance failed:", e
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="zfs-cache-evictor")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.save()
+
+
+class BlockMap(object):
+    # Which FAULT_BLOCK sized blocks of a sparse cache file hold fetched data.
+    # Saved next to the cache index as "<size> <block size>\n" followed by
+    # the raw bitmap.
+
+    def __init__(self, map_path, size, block_size=FAULT_BLOCK):
+        self.map_path = map_path
+        self.size = size
+        self.block_size = block_size
+        self.nblocks = (size + block_size - 1) // block_size
+        self.bits = bytearray((self.nblocks + 7) // 8)
+        self.present = 0
+        self.unsaved = 0
+        # inflight: blocks some thread is fetching right now; changed is
+        # notified whenever a fetch finishes or fails.
+        self.inflight = set()
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+
+    @classmethod
+    def load(cls, map_path, size):
+        try:
+            with open(map_path, 'rb') as f:
+                header = f.readline().split()
+                bits = bytearray(f.read())
+        except IOError:
+            return cls(map_path, size)
+        bmap = cls(map_path, int(header[0]), int(header[1]))
+        if bmap.size != size or len(bits) != len(bmap.bits):
+            return cls(map_path, size)
+        bmap.bits = bits
+        bmap.present = sum(1 for i in xrange(bmap.nblocks) if bmap.has(i))
+        return bmap
+
+    def save(self):
+        tmp_path = self.map_path + ".new"
+        with open(tmp_path, 'wb') as f:
+            f.write("%d %d\n" % (self.size, self.block_size))
+            f.write(self.bits)
+        os.rename(tmp_path, self.map_path)
+        self.unsaved = 0
+
+    def has(self, i):
+        return self.bits[i >> 3] & (1 << (i & 7)) != 0
+
+    def mark(self, i):
+        if not self.has(i):
+            self.bits[i >> 3] |= 1 << (i & 7)
+            self.present += 1
+            self.unsaved += 1
+
+    def complete(self):
+        return self.present == self.nblocks
+
+    def present_bytes(self):
+        return min(self.present * self.block_size, self.size)
+
+    def missing_runs(self, offset, length):
+        # Runs of missing blocks, as [first, last) block numbers, that cover
+        # the byte range.
+        if length <= 0 or offset >= self.size:
+            return []
+        first = offset // self.block_size
+        last = min((offset + length + self.block_size - 1) // self.block_size, self.nblocks)
+        runs = []
+        start = None
+        for i in xrange(first, last):
+            if not self.has(i):
+                if start is None:
+                    start = i
+            elif start is not None:
+                runs.append((start, i))
+                start = None
+        if start is not None:
+            runs.append((start, last))
+        return runs
+
+    def claim(self, offset, length):
+        # Caller holds lock. Splits the missing blocks of the range into runs
+        # the caller should fetch, now marked in flight, and reports whether
+        # other threads are already fetching part of it.
+        runs = []
+        busy = False
+        for first, last in self.missing_runs(offset, length):
+            start = None
+            for i in xrange(first, last):
+                if i in self.inflight:
+                    busy = True
+                    if start is not None:
+                        runs.append((start, i))
+                        start = None
+                elif start is None:
+                    start = i
+            if start is not None:
+                runs.append((start, last))
+        for first, last in runs:
+            self.inflight.update(xrange(first, last))
+        return runs, busy
+
+    def unclaim(self, runs):
+        # Caller holds lock.
+        for first, last in runs:
+            self.inflight.difference_update(xrange(first, last))
+        self.changed.notify_all()
+
+
+class PathLocks(object):
+    # A re-entrant lock per path, created on demand and dropped once no
+    # thread holds or waits for it.
+
+    def __init__(self):
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def hold(self, path):
+        with self.lock:
+            entry = self.locks.setdefault(path, [threading.RLock(), 0])
+            entry[1] += 1
+        entry[0].acquire()
+        try:
+            yield
+        finally:
+            entry[0].release()
+            with self.lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.locks[path]
+
+
+class AttrCache(object):
+    # Short-lived cache of server attributes. A None attrs value is a cached
+    # ENOENT. The last directory listing is kept as a hint so a miss can be
+    # filled for all of the file's siblings in one batched stat.
+
+    def __init__(self, ttl=ATTR_TTL):
+        self.ttl = ttl
+        self.attrs = {}
+        self.listings = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path):
+        # Returns (found, attrs); attrs is None for a cached missing file.
+        with self.lock:
+            item = self.attrs.get(path)
+            if item is None or item[1] < time.time():
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            return True, item[0]
+
+    def put(self, path, attrs):
+        with self.lock:
+            self.attrs[path] = (attrs, time.time() + self.ttl)
+
+    def invalidate(self, path):
+        with self.lock:
+            self.attrs.pop(path, None)
+            self.attrs.pop(os.path.dirname(path), None)
+
+    def fresh(self, dir_path, names):
+        # Whether attributes of all the listed entries are cached and fresh.
+        now = time.time()
+        with self.lock:
+            for name in names:
+                item = self.attrs.get(os.path.normpath(os.path.join(dir_path, name)))
+                if item is None or item[1] < now:
+                    return False
+        return True
+
+    def note_listing(self, dir_path, names):
+        with self.lock:
+            self.listings[dir_path] = [n for n in names if n not in ('.', '..')]
+
+    def forget_listing(self, dir_path):
+        with self.lock:
+            self.listings.pop(dir_path, None)
+
+    def batch_for(self, path, limit=ATTR_BATCH):
+        # The paths to stat along with path: its siblings that are not fresh.
+        parent = os.path.dirname(path)
+        now = time.time()
+        batch = [path]
+        with self.lock:
+            for name in self.listings.get(parent, ()):
+                if len(batch) >= limit:
+                    break
+                sibling = os.path.join(parent, name)
+                item = self.attrs.get(sibling)
+                if sibling != path and (item is None or item[1] < now):
+                    batch.append(sibling)
+        return batch
+
+
+class DirCache(object):
+    # Directory listings keyed by the version the server listed them at, so a
+    # repeat readdir only needs a not-modified check (or nothing, under a
+    # callback promise).
+
+    def __init__(self):
+        self.dirs = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+
+    def get(self, path):
+        with self.lock:
+            return self.dirs.get(path)
+
+    def put(self, path, version, names):
+        with self.lock:
+            if version:
+                self.dirs[path] = (version, names)
+            else:
+                self.dirs.pop(path, None)
+
+    def invalidate(self, path):
+        with self.lock:
+            self.dirs.pop(path, None)
+
+
+def _within(path, tree):
+    return path == tree or path.startswith(tree + "/")
+
+
+class WriteBack(object):
+    # Uploads dirty files in the background after they are closed. Pending
+    # paths are kept, in order, in a small file next to the cache index so a
+    # remount resumes them. Closing a file that is already queued costs
+    # nothing; the upload reads whatever the cached copy holds by then.
+    # Several files are uploaded at once, but never one file twice at once.
+
+    def __init__(self, cache_dir, upload, retry=WRITEBACK_RETRY, workers=WRITEBACK_WORKERS):
+        self.queue_path = os.path.join(cache_dir, WRITEBACK_NAME)
+        self.upload = upload
+        self.retry = retry
+        self.workers = workers
+        self.pending = []
+        self.active = set()
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.running = False
+        self.threads = []
+        self.uploaded = 0
+        self.coalesced = 0
+        self.cancelled = 0
+        self.failed = 0
+        # failures: path -> failed uploads of it, for wait()
+        self.failures = {}
+        # moved: path being uploaded -> the path it was renamed to meanwhile
+        self.moved = {}
+
+    def load(self):
+        try:
+            with open(self.queue_path) as f:
+                self.pending = [line.rstrip("\n").decode('utf-8') for line in f if line.strip()]
+        except IOError:
+            self.pending = []
+        if self.pending:
+            print "resuming", len(self.pending), "pending uploads"
+
+    def _save(self):
+        # Caller holds lock. Paths being uploaded stay in the file until the
+        # server has them.
+        paths = [path for path in self.active if path not in self.pending] + self.pending
+        tmp_path = self.queue_path + ".new"
+        with open(tmp_path, 'w') as f:
+            for path in paths:
+                if isinstance(path, unicode):
+                    path = path.encode('utf-8')
+                f.write(path + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmp_path, self.queue_path)
+
+    def enqueue(self, path):
+        with self.lock:
+            if path in self.pending:
+                self.coalesced += 1
+                return
+            self.pending.append(path)
+            self._save()
+            self.changed.notify_all()
+
+    def cancel(self, path):
+        with self.lock:
+            if path in self.pending:
+                self.pending.remove(path)
+                self.cancelled += 1
+                self._save()
+                self.changed.notify_all()
+
+    def wait(self, path):
+        # Returns True once no upload of path, or of any file under it, is
+        # queued or running, or False as soon as one fails; it stays queued
+        # and is retried meanwhile.
+        with self.lock:
+            failures = self._failures(path)
+            while any(_within(queued, path) for queued in self.pending) or \
+                    any(_within(active, path) for active in self.active):
+                if self._failures(path) != failures:
+                    return False
+                self.changed.wait()
+            return True
+
+    def _failures(self, path):
+        # Caller holds lock.
+        return sum(count for failed, count in self.failures.items() if _within(failed, path))
+
+    def rename(self, old, new):
+        # Uploads of old, or of files under it, go on under their new paths.
+        # One already running is sent again under its new path.
+        with self.lock:
+            pending = []
+            for path in self.pending:
+                if _within(path, old):
+                    path = new + path[len(old):]
+                if path not in pending:
+                    pending.append(path)
+            self.pending = pending
+            for path in self.active:
+                if _within(path, old):
+                    self.moved[path] = new + path[len(old):]
+            self._save()
+            self.changed.notify_all()
+
+    def _next(self):
+        # Caller holds lock.
+        for path in self.pending:
+            if path not in self.active:
+                return path
+        return None
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while self.running and self._next() is None:
+                    self.changed.wait(1)
+                if not self.running:
+                    return
+                path = self._next()
+                self.pending.remove(path)
+                self.active.add(path)
+            try:
+                ok = self.upload(path)
+            except Exception as e:
+                print "background upload of", path, "failed:", e
+                ok = False
+            with self.lock:
+                self.active.discard(path)
+                target = self.moved.pop(path, None)
+                if target is not None and target not in self.pending:
+                    self.pending.append(target)
+                if ok:
+                    self.uploaded += 1
+                else:
+                    self.failed += 1
+                    self.failures[path] = self.failures.get(path, 0) + 1
+                    if path not in self.pending:
+                        self.pending.insert(0, path)
+                self._save()
+                self.changed.notify_all()
+            if not ok:
+                time.sleep(self.retry)
+
+    def start(self):
+        self.running = True
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name="zfs-writeback-%d" % i)
+            t.daemon = True
+            t.start()
+            self.threads.append(t)
+
+    def stop(self):
+        # Whatever is still queued is uploaded after the next mount.
+        with self.lock:
+            self.running = False
+            self.changed.notify_all()
+        for t in self.threads:
+            t.join()
+        self.threads = []
+
+
+class Journal(object):
+    # Write-ahead log of changes the server has not confirmed yet, kept next
+    # to the cache index. An intent is appended and fsynced before the change
+    # is made locally, and a done record follows once the server has it; a
+    # lost done record only means the change is sent twice. Intents still
+    # open at mount are replayed in order. A file is logged as dirty once,
+    # on its first write after being clean, with the server version its
+    # changes are based on.
+
+    def __init__(self, cache_dir):
+        self.path = os.path.join(cache_dir, JOURNAL_NAME)
+        # pending: seq -> intent, in the order they were logged
+        # dirty: path -> seq of its open dirty intent
+        self.pending = collections.OrderedDict()
+        self.dirty = {}
+        self.seq = 0
+        self.file = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn by a crash mid-append; nothing follows it.
+                        break
+                    if 'done' in record:
+                        self.pending.pop(record['done'], None)
+                    else:
+                        self.pending[record['seq']] = record
+                    self.seq = max(self.seq, record.get('seq', record.get('done')))
+        except IOError:
+            pass
+        for seq, record in self.pending.items():
+            if record['op'] == 'dirty':
+                self.dirty[record['path']] = seq
+        # Start over with just the open intents.
+        tmp_path = self.path + ".new"
+        with open(tmp_path, 'w') as f:
+            for record in self.pending.values():
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmp_path, self.path)
+        self.file = open(self.path, 'a')
+        if self.pending:
+            print "journal:", len(self.pending), "changes to replay"
+
+    def entries(self):
+        with self.lock:
+            return self.pending.values()
+
+    def begin(self, op, path, **fields):
+        with self.lock:
+            return self._begin(op, path, fields)
+
+    def _begin(self, op, path, fields):
+        # Caller holds lock.
+        self.seq += 1
+        record = dict(fields, seq=self.seq, op=op, path=path)
+        self.pending[self.seq] = record
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.seq
+
+    def done(self, seq):
+        with self.lock:
+            self._done(seq)
+
+    def _done(self, seq):
+        # Caller holds lock.
+        if self.pending.pop(seq, None) is None:
+            return
+        if not self.pending:
+            # Nothing left to replay.
+            self.file.truncate(0)
+            return
+        self.file.write(json.dumps({'done': seq}) + "\n")
+        self.file.flush()
+
+    def mark_dirty(self, path, base):
+        with self.lock:
+            if path not in self.dirty:
+                self.dirty[path] = self._begin('dirty', path, {'base': base})
+
+    def mark_clean(self, path):
+        with self.lock:
+            seq = self.dirty.pop(path, None)
+            if seq is not None:
+                self._done(seq)
+
+    def rename(self, old, new):
+        # Dirty files under old are logged again under their new paths, after
+        # the rename.
+        with self.lock:
+            prefix = old + "/"
+            for path in self.dirty.keys():
+                if path == old:
+                    target = new
+                elif path.startswith(prefix):
+                    target = new + path[len(old):]
+                else:
+                    continue
+                seq = self.dirty.pop(path)
+                if target in self.dirty:
+                    # Overwritten by the rename.
+                    self._done(self.dirty.pop(target))
+                self.dirty[target] = self._begin('dirty', target, {'base': self.pending[seq]['base']})
+                self._done(seq)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
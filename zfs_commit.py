@@ -0,0 +1,277 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import tempfile
+import threading
+import time
+
+# A batch is held open this long for more stores to join, but only while
+# stores are arriving together; a lone store is committed at once.
+COMMIT_WINDOW = 0.002
+COMMIT_BATCH = 256
+# Batch statistics are printed every this many batches.
+COMMIT_REPORT = 100
+# Uploads are staged in a directory of this name at the root of the
+# destination's filesystem, or, failing that, next to the destination in
+# files whose names start with it.
+STAGING_NAME = ".zfs_staging"
+FALLOC_FL_KEEP_SIZE = 1
+
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    _syncfs = _libc.syncfs
+    _syncfs.argtypes = [ctypes.c_int]
+except (OSError, AttributeError, TypeError):
+    _syncfs = None
+try:
+    _fallocate = _libc.fallocate64
+    _fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64]
+except (NameError, AttributeError, TypeError):
+    _fallocate = None
+
+
+def volume_root(path):
+    # The mount point of the filesystem path is on.
+    path = os.path.realpath(path)
+    dev = os.stat(path).st_dev
+    while path != '/':
+        parent = os.path.dirname(path)
+        if os.stat(parent).st_dev != dev:
+            break
+        path = parent
+    return path
+
+
+def fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class GroupCommit(object):
+    # Makes stored files durable in batches. A store hands over its written
+    # staging file and waits; one thread at a time commits everything handed
+    # over so far: the staging files' data is synced, then each is renamed
+    # over its target, then each target directory is synced once. Stores
+    # arriving during a commit make up the next batch. Every caller returns
+    # only once its own file is durable, or with the error that stopped it.
+
+    def __init__(self, window=COMMIT_WINDOW, max_batch=COMMIT_BATCH, report_every=COMMIT_REPORT):
+        self.window = window
+        self.max_batch = max_batch
+        self.report_every = report_every
+        self.queue = []
+        self.committing = False
+        self.last_batch = 0
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.batches = 0
+        self.stores = 0
+        self.largest = 0
+        self.latency = 0.0
+        self.syncs = 0
+
+    def commit(self, tmp_path, path):
+        # Raises the OSError or IOError that kept the file from being stored.
+        started = time.time()
+        entry = {'tmp': tmp_path, 'path': path, 'done': False, 'error': None}
+        with self.lock:
+            self.queue.append(entry)
+            self.changed.notify_all()
+        while True:
+            with self.lock:
+                while self.committing and not entry['done']:
+                    self.changed.wait()
+                if entry['done']:
+                    self.stores += 1
+                    self.latency += time.time() - started
+                    break
+                self.committing = True
+                if self.last_batch > 1:
+                    deadline = time.time() + self.window
+                    while len(self.queue) < self.max_batch and time.time() < deadline:
+                        self.changed.wait(deadline - time.time())
+                batch = self.queue[:self.max_batch]
+                del self.queue[:self.max_batch]
+            try:
+                self._commit(batch)
+            except Exception as e:
+                # Nothing in the batch can be trusted to be durable.
+                for item in batch:
+                    item['error'] = item['error'] or e
+            finally:
+                with self.lock:
+                    for item in batch:
+                        item['done'] = True
+                    self.committing = False
+                    self.last_batch = len(batch)
+                    self.batches += 1
+                    self.largest = max(self.largest, len(batch))
+                    self.changed.notify_all()
+                    if self.report_every and self.batches % self.report_every == 0:
+                        print self._summary()
+        if entry['error'] is not None:
+            raise entry['error']
+
+    def report(self):
+        with self.lock:
+            return self._summary()
+
+    def _summary(self):
+        return ("group commit: %d stores in %d batches (%.1f per batch, largest %d), "
+                "%d data syncs, %.1f ms average commit latency" %
+                (self.stores, self.batches, float(self.stores) / max(self.batches, 1), self.largest,
+                 self.syncs, 1000.0 * self.latency / max(self.stores, 1)))
+
+    def _commit(self, batch):
+        self._sync_data(batch)
+        dirs = {}
+        for entry in batch:
+            if entry['error'] is not None:
+                continue
+            try:
+                os.rename(entry['tmp'], entry['path'])
+            except OSError as e:
+                entry['error'] = e
+                continue
+            dirs.setdefault(os.path.dirname(entry['path']), []).append(entry)
+        for directory, entries in dirs.items():
+            try:
+                fsync_path(directory)
+            except (OSError, IOError) as e:
+                for entry in entries:
+                    entry['error'] = e
+
+    def _sync_data(self, batch):
+        # One syncfs per filesystem covers all the staging files on it,
+        # however many there are; without it each is synced in turn.
+        if len(batch) > 1 and _syncfs is not None:
+            devices = {}
+            for entry in batch:
+                try:
+                    devices.setdefault(os.stat(entry['tmp']).st_dev, entry['tmp'])
+                except OSError as e:
+                    entry['error'] = e
+            failed = False
+            for tmp_path in devices.values():
+                fd = os.open(tmp_path, os.O_RDONLY)
+                try:
+                    failed = failed or _syncfs(fd) != 0
+                finally:
+                    os.close(fd)
+                self.syncs += 1
+            if not failed:
+                return
+        for entry in batch:
+            if entry['error'] is not None:
+                continue
+            try:
+                fsync_path(entry['tmp'])
+                self.syncs += 1
+            except (OSError, IOError) as e:
+                entry['error'] = e
+
+
+class Staging(object):
+    # Staging files for uploads, on the same filesystem as the file they
+    # will replace so that committing one is an atomic rename and never a
+    # copy. Each is preallocated to the length the client declared, without
+    # changing its size, so a short upload still fails the length check.
+    # Every directory staged in, a staging directory or the target's own, is
+    # listed in a file so that the staging files of uploads that died with
+    # the server can be removed at startup.
+
+    def __init__(self, list_path, name=STAGING_NAME):
+        self.list_path = list_path
+        self.name = name
+        # dirs: st_dev -> staging directory on that filesystem, None where
+        # uploads are staged next to their targets
+        self.dirs = {}
+        self.known = set()
+        self.lock = threading.Lock()
+        self.preallocated = 0
+
+    def cleanup(self):
+        try:
+            with open(self.list_path) as f:
+                self.known = set(line.rstrip("\n") for line in f if line.strip())
+        except IOError:
+            self.known = set()
+        removed = sum(self._clean(directory) for directory in self.known)
+        if removed:
+            print "removed", removed, "orphaned staging files"
+
+    def create(self, path, length):
+        # Returns (file open for writing, its path) for an upload of length
+        # bytes to path.
+        directory = self._dir_for(path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=self.name + ".")
+        if length > 0 and _fallocate is not None:
+            # Only a hint; the upload goes ahead without it.
+            if _fallocate(fd, FALLOC_FL_KEEP_SIZE, 0, length) == 0:
+                with self.lock:
+                    self.preallocated += length
+        return os.fdopen(fd, 'wb'), tmp_path
+
+    def _dir_for(self, path):
+        parent = os.path.dirname(path)
+        dev = os.stat(parent).st_dev
+        with self.lock:
+            known = dev in self.dirs
+            directory = self.dirs.get(dev)
+        if not known:
+            directory = self._staging_dir(parent, dev)
+            with self.lock:
+                self.dirs[dev] = directory
+        # Without a staging directory on the filesystem, stage next to the
+        # target.
+        directory = directory or parent
+        with self.lock:
+            if directory not in self.known:
+                # The list may have been lost with the temp dir it lives in.
+                # Nothing of ours is staged here yet.
+                self._clean(directory)
+                self.known.add(directory)
+                with open(self.list_path, 'a') as f:
+                    f.write(directory + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+        return directory
+
+    def _staging_dir(self, parent, dev):
+        # The staging directory at the root of parent's filesystem, or None
+        # if there cannot be one.
+        root = volume_root(parent)
+        directory = os.path.join(root, self.name)
+        try:
+            os.mkdir(directory, 0700)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                print "cannot stage uploads in", root, ":", e
+                return None
+        if not os.access(directory, os.W_OK) or os.stat(directory).st_dev != dev:
+            print "cannot stage uploads in", directory
+            return None
+        return directory
+
+    def _clean(self, directory):
+        # A staging directory is emptied; anywhere else only staging files
+        # are removed.
+        whole = os.path.basename(directory) == self.name
+        removed = 0
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return 0
+        for name in names:
+            if not whole and not name.startswith(self.name + "."):
+                continue
+            try:
+                os.unlink(os.path.join(directory, name))
+                removed += 1
+            except OSError:
+                pass
+        return removed
@@ -0,0 +1,409 @@
+import binascii
+import bz2
+import hashlib
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+# Shared by zfs.py and zfs_server.py.
+
+ADLER_MOD = 65521
+DELTA_MIN_BLOCK = 2048
+DELTA_MAX_BLOCK = 128 * 1024
+# Pending literal data is flushed at this size so the delta scan never has to
+# hold more than about this much of the file in memory.
+LITERAL_MAX = 64 * 1024
+READ_CHUNK = 1 << 20
+# Invocation metadata key clients identify themselves with on every call.
+CLIENT_ID_KEY = 'zfs-client-id'
+# Port a ZfsRpc server listens on unless told otherwise.
+SERVER_PORT = 50051
+# Calls moving file data a server runs at once for any one client, and so
+# the most a client has in flight to one server.
+STREAMS_PER_CLIENT = 4
+# Content-defined chunk bounds. A boundary is cut where the top 16 bits of the
+# gear hash are zero, so chunks average about 64 KiB past the minimum.
+CHUNK_MIN = 16 * 1024
+CHUNK_MAX = 256 * 1024
+CHUNK_MASK = 0xffff0000
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODEC_BZ2 = 2
+CODECS = {
+    CODEC_ZLIB: (lambda data: zlib.compress(data, 6), zlib.decompress),
+    CODEC_BZ2: (lambda data: bz2.compress(data, 9), bz2.decompress),
+}
+# Data whose first block does not shrink by this much is taken to be
+# compressed already and sent raw.
+COMPRESS_MIN_SAVING = 0.1
+# Bounds for file data blocks on the wire. The top stays well below gRPC's
+# default 4 MiB message limit.
+TRANSFER_MIN = 64 * 1024
+TRANSFER_MAX = 3 << 20
+# Blocks sent at one size before its throughput is judged.
+TRANSFER_WINDOW = 4
+
+
+def to_ns(seconds):
+    # Times travel as int64 nanoseconds. Python 2 stats only give float
+    # seconds, good to well under a microsecond.
+    return int(round(seconds * 1e9))
+
+
+def signature_block_size(size):
+    # rsync's rule of thumb: about sqrt(size), so a file's signature grows
+    # only with the square root of its length.
+    block_size = int(math.sqrt(size)) & ~1023
+    return min(max(block_size, DELTA_MIN_BLOCK), DELTA_MAX_BLOCK)
+
+
+def weak_checksum(data):
+    return zlib.adler32(bytes(data)) & 0xffffffff
+
+
+def strong_checksum(data):
+    return hashlib.md5(bytes(data)).digest()
+
+
+def file_signatures(reader, block_size):
+    # Yields (weak, strong) for every block of the file, the last one short.
+    while True:
+        block = reader.read(block_size)
+        if not block:
+            break
+        yield weak_checksum(block), strong_checksum(block)
+
+
+def signature_table(weaks, strongs, block_size, size):
+    # weak checksum -> [(block index, strong checksum, block length)]
+    table = {}
+    for index, weak in enumerate(weaks):
+        length = min(block_size, size - index * block_size)
+        table.setdefault(weak, []).append((index, strongs[index], length))
+    return table
+
+
+def compute_delta(reader, block_size, table):
+    # rsync's algorithm: slide a block-sized window over the new file using
+    # the rolling Adler-32 checksum and emit ('copy', index) for every window
+    # found in the old file's signature table and ('literal', data) for the
+    # bytes in between.
+    buf = bytearray(reader.read(READ_CHUNK))
+    eof = len(buf) < READ_CHUNK
+    pos = 0
+    lit = 0
+    a = b = None
+    while True:
+        if len(buf) - pos <= block_size and not eof:
+            if lit:
+                del buf[:lit]
+                pos -= lit
+                lit = 0
+            more = reader.read(READ_CHUNK)
+            if more:
+                buf.extend(more)
+            else:
+                eof = True
+            continue
+        n = min(block_size, len(buf) - pos)
+        if n == 0:
+            break
+        if a is None or n < block_size:
+            weak = weak_checksum(buf[pos:pos + n])
+            a = weak & 0xffff
+            b = weak >> 16
+        else:
+            weak = (b << 16) | a
+        candidates = table.get(weak)
+        if candidates:
+            strong = strong_checksum(buf[pos:pos + n])
+            match = None
+            for index, block_strong, length in candidates:
+                if length == n and block_strong == strong:
+                    match = index
+                    break
+            if match is not None:
+                if lit < pos:
+                    yield 'literal', bytes(buf[lit:pos])
+                yield 'copy', match
+                pos += n
+                lit = pos
+                a = None
+                continue
+        if pos + n >= len(buf):
+            # Nothing left to roll in: the rest of the file is literal.
+            break
+        out = buf[pos]
+        a = (a - out + buf[pos + n]) % ADLER_MOD
+        b = (b - n * out + a - 1) % ADLER_MOD
+        pos += 1
+        if pos - lit >= LITERAL_MAX:
+            yield 'literal', bytes(buf[lit:pos])
+            lit = pos
+    if lit < len(buf):
+        yield 'literal', bytes(buf[lit:])
+
+
+def _gear_table():
+    # Fixed pseudo-random values, so every client and server cuts the same
+    # boundaries.
+    return [struct.unpack('<I', hashlib.md5(str(i)).digest()[:4])[0] for i in range(256)]
+
+GEAR = _gear_table()
+
+
+def chunk_id(data):
+    return hashlib.sha1(bytes(data)).digest()
+
+
+def file_chunks(reader):
+    # Content-defined chunking: yields (id, data) for consecutive chunks of
+    # the file. A boundary depends only on the 32 bytes before it, so an edit
+    # only changes the chunks around it and identical runs of data in
+    # different files are cut into identical chunks.
+    buf = bytearray()
+    eof = False
+    while True:
+        while len(buf) < CHUNK_MAX and not eof:
+            more = reader.read(READ_CHUNK)
+            if more:
+                buf.extend(more)
+            else:
+                eof = True
+        if not buf:
+            break
+        end = min(len(buf), CHUNK_MAX)
+        cut = end
+        h = 0
+        for i in xrange(CHUNK_MIN, end):
+            h = ((h << 1) + GEAR[buf[i]]) & 0xffffffff
+            if not h & CHUNK_MASK:
+                cut = i + 1
+                break
+        data = bytes(buf[:cut])
+        del buf[:cut]
+        yield chunk_id(data), data
+
+
+class ChunkStore(object):
+    # Chunk bodies on disk, one file per chunk named by the hex of its id.
+
+    def __init__(self, root):
+        self.root = root
+        if not os.path.isdir(root):
+            os.makedirs(root)
+
+    def _path(self, cid):
+        name = binascii.hexlify(cid)
+        return os.path.join(self.root, name[:2], name[2:])
+
+    def has(self, cid):
+        return os.path.exists(self._path(cid))
+
+    def get(self, cid):
+        try:
+            with open(self._path(cid), 'rb') as f:
+                return f.read()
+        except IOError:
+            return None
+
+    def put(self, cid, data):
+        path = self._path(cid)
+        if os.path.exists(path):
+            return
+        if not os.path.isdir(os.path.dirname(path)):
+            try:
+                os.mkdir(os.path.dirname(path))
+            except OSError:
+                pass
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as tmp:
+            tmp.write(data)
+        os.rename(tmp.name, path)
+
+    def remove(self, cid):
+        try:
+            os.unlink(self._path(cid))
+        except OSError:
+            pass
+
+    def clear(self):
+        # Returns the number of chunks removed.
+        removed = 0
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                try:
+                    os.unlink(os.path.join(directory, name))
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+
+class ChunkLocations(object):
+    # chunk id -> (path, offset, length) of a copy of the chunk inside some
+    # file, taken from the manifests of files we have chunked or fetched.
+    # Reads are checked against the id, so a file that changed since only
+    # costs a miss.
+
+    def __init__(self):
+        self.chunks = {}
+        self.files = {}
+        self.lock = threading.Lock()
+
+    def add(self, path, ids, lengths):
+        with self.lock:
+            self._forget(path)
+            offset = 0
+            for cid, length in zip(ids, lengths):
+                self.chunks[cid] = (path, offset, length)
+                offset += length
+            self.files[path] = list(ids)
+
+    def _forget(self, path):
+        for cid in self.files.pop(path, []):
+            if self.chunks.get(cid, (None,))[0] == path:
+                del self.chunks[cid]
+
+    def forget(self, path):
+        with self.lock:
+            self._forget(path)
+
+    def has(self, cid):
+        return cid in self.chunks
+
+    def has_file(self, path):
+        return path in self.files
+
+    def read(self, cid):
+        location = self.chunks.get(cid)
+        if location is None:
+            return None
+        path, offset, length = location
+        try:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                data = f.read(length)
+        except IOError:
+            data = None
+        if data is None or len(data) != length or chunk_id(data) != cid:
+            with self.lock:
+                if self.chunks.get(cid) == location:
+                    del self.chunks[cid]
+            return None
+        return data
+
+
+class CompressionStats(object):
+    # Bytes before and after compression and CPU seconds spent on it, per
+    # directory, so codecs can be tuned by path.
+
+    def __init__(self):
+        self.dirs = {}
+        self.lock = threading.Lock()
+
+    def add(self, path, raw, wire, cpu):
+        with self.lock:
+            totals = self.dirs.setdefault(os.path.dirname(path), [0, 0, 0.0])
+            totals[0] += raw
+            totals[1] += wire
+            totals[2] += cpu
+
+    def report(self, path=None):
+        # One line per directory, or just the line for path's directory.
+        with self.lock:
+            items = sorted(self.dirs.items())
+        if path is not None:
+            items = [item for item in items if item[0] == os.path.dirname(path)]
+        return ["%s: %d -> %d bytes (%.2fx), %.2fs cpu" % (d, raw, wire, float(raw) / max(wire, 1), cpu)
+                for d, (raw, wire, cpu) in items]
+
+
+class Packer(object):
+    # Compresses the blocks of one transfer. The codec is the first offered
+    # one we know, and is dropped for the whole transfer if the first block
+    # does not shrink enough. After that any single block that does not
+    # shrink is still sent raw.
+
+    def __init__(self, offered, path, stats):
+        self.codec = next((codec for codec in offered if codec in CODECS), CODEC_RAW)
+        self.sampled = False
+        self.path = path
+        self.stats = stats
+
+    def pack(self, data):
+        # Returns (codec, payload).
+        if self.codec == CODEC_RAW or not data:
+            self.stats.add(self.path, len(data), len(data), 0.0)
+            return CODEC_RAW, data
+        start = time.clock()
+        packed = CODECS[self.codec][0](data)
+        cpu = time.clock() - start
+        if not self.sampled:
+            self.sampled = True
+            if len(packed) > len(data) * (1 - COMPRESS_MIN_SAVING):
+                print "not compressing", self.path, ": first block does not shrink"
+                self.codec = CODEC_RAW
+                self.stats.add(self.path, len(data), len(data), cpu)
+                return CODEC_RAW, data
+        if len(packed) >= len(data):
+            self.stats.add(self.path, len(data), len(data), cpu)
+            return CODEC_RAW, data
+        self.stats.add(self.path, len(data), len(packed), cpu)
+        return self.codec, packed
+
+
+def unpack(codec, payload, path, stats):
+    if codec == CODEC_RAW:
+        stats.add(path, len(payload), len(payload), 0.0)
+        return payload
+    start = time.clock()
+    data = CODECS[codec][1](payload)
+    stats.add(path, len(data), len(payload), time.clock() - start)
+    return data
+
+
+class BlockSizer(object):
+    # Size of the next data block of a transfer. Starts at about 1/64th of
+    # the file and doubles while the throughput of the last window of blocks
+    # beats the best so far by 10%, up to the receiver's limit.
+
+    def __init__(self, size, limit=0):
+        self.limit = min(limit, TRANSFER_MAX) if limit > 0 else TRANSFER_MAX
+        self.block_size = TRANSFER_MIN
+        while self.block_size * 64 < size and self.block_size < self.limit:
+            self.block_size *= 2
+        self.block_size = min(self.block_size, self.limit)
+        self.growing = self.block_size < self.limit
+        self.best = 0.0
+        self.start = None
+        self.sent_bytes = 0
+        self.sent_blocks = 0
+
+    def sent(self, nbytes):
+        if not self.growing:
+            return
+        now = time.time()
+        if self.start is None:
+            # The first block also pays for the call setup; time from here.
+            self.start = now
+            return
+        self.sent_bytes += nbytes
+        self.sent_blocks += 1
+        if self.sent_blocks < TRANSFER_WINDOW:
+            return
+        elapsed = now - self.start
+        # A window too quick to time counts as an improvement.
+        rate = self.sent_bytes / elapsed if elapsed > 0 else None
+        if rate is None or rate > self.best * 1.1:
+            self.best = max(rate, self.best)
+            self.block_size = min(self.block_size * 2, self.limit)
+            self.growing = self.block_size < self.limit
+        else:
+            self.growing = False
+        self.start = now
+        self.sent_bytes = 0
+        self.sent_blocks = 0
@@ -0,0 +1,431 @@
+import anydbm
+import ctypes
+import ctypes.util
+import errno
+import os
+import stat
+import struct
+import sys
+import threading
+
+from zfs_common import to_ns
+
+# inotify(7) constants.
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE |
+              IN_DELETE_SELF | IN_MOVE_SELF)
+MEMBERSHIP = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+GONE = IN_MOVED_FROM | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')
+EVENT_BUFFER = 64 * 1024
+# Watches we take at most, leaving the rest of the per-user inotify limit to
+# other processes. Past it, or past the system limit, paths are stat'ed on
+# every call.
+META_WATCHES = 8192
+# Stat results and directory listings kept, each.
+META_ENTRIES = 65536
+# Hit rates are printed every this many lookups.
+META_REPORT = 10000
+VERSION_DB = "versions"
+# Versions reserved on disk at a time, and records written between syncs.
+VERSION_RESERVE = 4096
+VERSION_SYNC = 256
+
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    _inotify_init = _libc.inotify_init
+    _inotify_add_watch = _libc.inotify_add_watch
+    _inotify_rm_watch = _libc.inotify_rm_watch
+    _inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    _inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+except (OSError, AttributeError, TypeError):
+    _inotify_init = None
+# Paths arrive as unicode from protobuf; the kernel takes and reports bytes.
+FS_ENCODING = sys.getfilesystemencoding() or 'utf-8'
+
+
+def _encode(path):
+    if isinstance(path, unicode):
+        return path.encode(FS_ENCODING)
+    return path
+
+
+class MetaCache(object):
+    # lstat results and directory listings of the server's files, kept in
+    # memory. Entries are filled on first use and are only kept for paths
+    # whose directory has an inotify watch, which drops them when anything in
+    # the directory changes. A path whose directory cannot be watched, or any
+    # path when inotify is missing, is stat'ed on every call.
+    #
+    # Events arrive a little after the change, so the server also invalidates
+    # paths it changes itself before replying. A fill is discarded if its
+    # directory saw an event after the watch was taken, so an lstat racing a
+    # change never caches the old result.
+
+    def __init__(self, max_watches=META_WATCHES, max_entries=META_ENTRIES, report_every=META_REPORT):
+        self.max_watches = max_watches
+        self.max_entries = max_entries
+        self.report_every = report_every
+        # stats: path -> stat result, or the OSError for a missing path
+        # listings: directory -> names in it
+        # watches: directory -> watch descriptor; dirs: watch descriptor ->
+        # directories watched through it (more than one if symlinked)
+        # gens: directory -> count of changes seen in it
+        self.stats = {}
+        self.listings = {}
+        self.watches = {}
+        self.dirs = {}
+        self.gens = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0
+        self.invalidations = 0
+        self.limited = False
+        self.fd = None
+        if _inotify_init is not None:
+            fd = _inotify_init()
+            if fd >= 0:
+                self.fd = fd
+                reader = threading.Thread(target=self._read_events)
+                reader.daemon = True
+                reader.start()
+        if self.fd is None:
+            print "inotify not available, metadata is not cached"
+
+    def lstat(self, path):
+        path = os.path.normpath(path)
+        found = self._lookup(self.stats, path)
+        if found is not None:
+            return self._result(found)
+        watched = self._watch(os.path.dirname(path))
+        result = self._load(os.lstat, path)
+        if watched is not None and not isinstance(result, OSError) and stat.S_ISDIR(result.st_mode):
+            # A directory's own times move with its entries, which only its
+            # own watch reports. Stat again once that watch is in place.
+            own = self._watch(path)
+            if own is None:
+                watched = None
+            else:
+                watched += own
+                result = self._load(os.lstat, path)
+        if isinstance(result, OSError) and result.errno != errno.ENOENT:
+            watched = None
+        self._store(self.stats, path, watched, result)
+        return self._result(result)
+
+    def listdir(self, path):
+        path = os.path.normpath(path)
+        found = self._lookup(self.listings, path)
+        if found is not None:
+            return list(found)
+        watched = self._watch(path)
+        result = self._load(os.listdir, path)
+        if isinstance(result, OSError):
+            watched = None
+        self._store(self.listings, path, watched, result)
+        return list(self._result(result))
+
+    def isdir(self, path):
+        try:
+            return stat.S_ISDIR(self.lstat(path).st_mode)
+        except OSError:
+            return False
+
+    def invalidate(self, path, tree=False):
+        # Called for changes the server makes itself. tree drops everything
+        # cached under path too, for renamed or removed directories.
+        path = os.path.normpath(path)
+        with self.lock:
+            if tree:
+                self._drop_tree(path)
+            else:
+                self._drop_dir(path)
+            self._changed(os.path.dirname(path), os.path.basename(path), MEMBERSHIP)
+
+    def report(self):
+        with self.lock:
+            return self._summary()
+
+    def _lookup(self, table, path):
+        with self.lock:
+            found = table.get(path)
+            if found is not None:
+                self.hits += 1
+                self._count()
+            return found
+
+    def _load(self, load, path):
+        try:
+            return load(path)
+        except OSError as e:
+            return e
+
+    def _result(self, result):
+        if isinstance(result, OSError):
+            raise result
+        return result
+
+    def _store(self, table, path, watched, result):
+        with self.lock:
+            if watched is None:
+                self.uncached += 1
+            else:
+                self.misses += 1
+                if all(self.gens.get(d) == gen for d, gen in watched):
+                    if path not in table and len(table) >= self.max_entries:
+                        table.popitem()
+                    table[path] = result
+            self._count()
+
+    def _count(self):
+        # Caller holds lock.
+        if self.report_every and (self.hits + self.misses + self.uncached) % self.report_every == 0:
+            print self._summary()
+
+    def _summary(self):
+        lookups = self.hits + self.misses + self.uncached
+        return ("metadata cache: %d hits, %d misses, %d uncached (%.1f%% hit rate), "
+                "%d invalidations, %d watches, %d entries" %
+                (self.hits, self.misses, self.uncached, 100.0 * self.hits / max(lookups, 1),
+                 self.invalidations, len(self.watches), len(self.stats) + len(self.listings)))
+
+    def _watch(self, directory):
+        # Returns [(directory, generation)] once directory is watched, or
+        # None if it cannot be.
+        with self.lock:
+            if directory in self.watches:
+                return [(directory, self.gens[directory])]
+            if self.fd is None or len(self.watches) >= self.max_watches:
+                return None
+        try:
+            wd = _inotify_add_watch(self.fd, _encode(directory), WATCH_MASK)
+        except (UnicodeError, ctypes.ArgumentError):
+            return None
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC and not self.limited:
+                self.limited = True
+                print "inotify watch limit reached, stat'ing unwatched paths on every call"
+            return None
+        with self.lock:
+            if self.fd is None:
+                return None
+            self.watches[directory] = wd
+            self.dirs.setdefault(wd, set()).add(directory)
+            return [(directory, self.gens.setdefault(directory, 0))]
+
+    def _unwatch(self, directory):
+        # Caller holds lock.
+        wd = self.watches.pop(directory, None)
+        if wd is None:
+            return
+        aliases = self.dirs.get(wd, set())
+        aliases.discard(directory)
+        if not aliases:
+            self.dirs.pop(wd, None)
+            _inotify_rm_watch(self.fd, wd)
+        self.gens[directory] = self.gens.get(directory, 0) + 1
+
+    def _drop_dir(self, path):
+        # Caller holds lock.
+        self.stats.pop(path, None)
+        self.listings.pop(path, None)
+        if path in self.gens:
+            self.gens[path] += 1
+
+    def _drop_tree(self, path):
+        # Caller holds lock. Watches under a moved directory would report
+        # changes under paths it no longer has, so they go too.
+        prefix = path.rstrip('/') + '/'
+        for table in (self.stats, self.listings):
+            for key in [key for key in table if key.startswith(prefix)]:
+                del table[key]
+        for directory in [d for d in self.watches if d == path or d.startswith(prefix)]:
+            self._unwatch(directory)
+        self._drop_dir(path)
+
+    def _drop_all(self):
+        # Caller holds lock.
+        self.stats.clear()
+        self.listings.clear()
+        for directory in self.gens:
+            self.gens[directory] += 1
+
+    def _changed(self, directory, name, mask):
+        # Caller holds lock. Something in directory changed, and with it the
+        # directory's own times.
+        self.invalidations += 1
+        if name and isinstance(directory, unicode) and not isinstance(name, unicode):
+            try:
+                name = name.decode(FS_ENCODING)
+            except UnicodeError:
+                # Not a name any request could have cached.
+                name = None
+        if name:
+            child = os.path.join(directory, name)
+            self.stats.pop(child, None)
+            if mask & IN_ISDIR and mask & GONE:
+                self._drop_tree(child)
+        if mask & MEMBERSHIP:
+            self.listings.pop(directory, None)
+        self.stats.pop(directory, None)
+        if directory in self.gens:
+            self.gens[directory] += 1
+
+    def _read_events(self):
+        while True:
+            try:
+                buf = os.read(self.fd, EVENT_BUFFER)
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                # Without events nothing cached can be trusted.
+                print "inotify read failed, metadata is no longer cached:", e
+                with self.lock:
+                    self.fd = None
+                    self._drop_all()
+                    self.watches.clear()
+                    self.dirs.clear()
+                return
+            offset = 0
+            while offset < len(buf):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(buf, offset)
+                offset += EVENT_HEADER.size
+                name = buf[offset:offset + length].rstrip('\0')
+                offset += length
+                self._event(wd, mask, name)
+
+    def _event(self, wd, mask, name):
+        with self.lock:
+            if mask & IN_Q_OVERFLOW:
+                print "inotify queue overflowed, dropping cached metadata"
+                self._drop_all()
+                return
+            for directory in list(self.dirs.get(wd, ())):
+                if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                    self._drop_tree(directory)
+                    self._changed(os.path.dirname(directory), os.path.basename(directory), MEMBERSHIP)
+                else:
+                    self._changed(directory, name, mask)
+            if mask & IN_IGNORED:
+                # The kernel has already removed the watch.
+                for directory in self.dirs.pop(wd, ()):
+                    self.watches.pop(directory, None)
+
+
+def fingerprint(st):
+    return (st.st_ino, st.st_size, to_ns(st.st_mtime), to_ns(st.st_ctime))
+
+
+class FileVersions(object):
+    # Durable per-file version numbers, which clients validate their cached
+    # copies against. A file gets a new version whenever the server stores,
+    # renames or chmods it, and whenever it is found to have been changed
+    # behind the server's back: each record keeps the inode, size and times
+    # its version was given for. Versions come from one counter, so a path
+    # never gets back a version it had before, even once removed and
+    # recreated. The counter is reserved ahead and fsynced; records are only
+    # synced in batches, and a record lost in a crash just gets a fresh
+    # version, costing clients one refetch.
+
+    def __init__(self, state_dir, lstat=os.lstat, reserve=VERSION_RESERVE, sync_every=VERSION_SYNC):
+        if not os.path.isdir(state_dir):
+            os.makedirs(state_dir)
+        self.db = anydbm.open(os.path.join(state_dir, VERSION_DB), 'c')
+        self.counter_path = os.path.join(state_dir, VERSION_DB + ".next")
+        self.lstat = lstat
+        self.reserve = reserve
+        self.sync_every = sync_every
+        self.lock = threading.Lock()
+        try:
+            with open(self.counter_path) as f:
+                self.next = int(f.read())
+        except (IOError, ValueError):
+            self.next = 1
+        self.reserved = self.next
+        self.unsynced = 0
+        self.bumps = 0
+
+    def current(self, path, st=None):
+        # The version of path as it is now; st, if given, is its lstat.
+        # Raises OSError if there is no such file.
+        if st is None:
+            st = self.lstat(path)
+        now = fingerprint(st)
+        with self.lock:
+            record = self._get(path)
+            if record is not None and record[1:] == now:
+                return record[0]
+            return self._set(path, now)
+
+    def bump(self, path):
+        # A new version for a file the server has just changed.
+        now = fingerprint(self.lstat(path))
+        with self.lock:
+            self.bumps += 1
+            return self._set(path, now)
+
+    def forget(self, path):
+        with self.lock:
+            try:
+                del self.db[self._key(path)]
+            except KeyError:
+                return
+            self._written()
+
+    def sync(self):
+        with self.lock:
+            if hasattr(self.db, 'sync'):
+                self.db.sync()
+            self.unsynced = 0
+
+    def _key(self, path):
+        if isinstance(path, unicode):
+            path = path.encode('utf-8')
+        return path
+
+    def _get(self, path):
+        try:
+            return tuple(int(field) for field in self.db[self._key(path)].split())
+        except KeyError:
+            return None
+
+    def _set(self, path, now):
+        # Caller holds lock.
+        version = self._issue()
+        self.db[self._key(path)] = " ".join(str(field) for field in (version,) + now)
+        self._written()
+        return version
+
+    def _issue(self):
+        # Caller holds lock. The reservation is on disk before any version
+        # under it is handed out.
+        if self.next >= self.reserved:
+            self.reserved = self.next + self.reserve
+            tmp = self.counter_path + ".tmp"
+            with open(tmp, 'w') as f:
+                f.write(str(self.reserved))
+                f.flush()
+                os.fsync(f.fileno())
+            os.rename(tmp, self.counter_path)
+        self.next += 1
+        return self.next - 1
+
+    def _written(self):
+        # Caller holds lock.
+        self.unsynced += 1
+        if self.unsynced >= self.sync_every:
+            if hasattr(self.db, 'sync'):
+                self.db.sync()
+            self.unsynced = 0
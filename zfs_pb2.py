@@ -17,7 +17,7 @@ DESCRIPTOR = _descriptor.FileDescriptor(
   name='zfs.proto',
   package='zfs',
   syntax='proto3',
-  serialized_pb=b'\n\tzfs.proto\x12\x03zfs\"\xb4\x01\n\x08\x46ileStat\x12\x0e\n\x06st_ino\x18\x01 \x01(\x05\x12\x0e\n\x06st_dev\x18\x02 \x01(\x05\x12\x0f\n\x07st_mode\x18\x03 \x01(\x05\x12\x10\n\x08st_nlink\x18\x04 \x01(\x05\x12\x0e\n\x06st_uid\x18\x05 \x01(\x05\x12\x0e\n\x06st_gid\x18\x06 \x01(\x05\x12\x0f\n\x07st_size\x18\x08 \x01(\x05\x12\x10\n\x08st_atime\x18\x0b \x01(\x02\x12\x10\n\x08st_mtime\x18\x0c \x01(\x02\x12\x10\n\x08st_ctime\x18\r \x01(\x02\"&\n\x08\x46ilePath\x12\x0c\n\x04path\x18\x01 \x01(\t\x12\x0c\n\x04mode\x18\x02 \x01(\x05\"1\n\x08StdReply\x12\x0e\n\x06status\x18\x01 \x01(\x05\x12\x15\n\rerror_message\x18\x02 \x01(\t\"1\n\x0fTestAuthRequest\x12\x0c\n\x04path\x18\x01 \x01(\t\x12\x10\n\x08st_mtime\x18\x02 \x01(\x02\"\x1d\n\rTestAuthReply\x12\x0c\n\x04\x66lag\x18\x01 \x01(\x05\"#\n\rFileDataBlock\x12\x12\n\ndata_block\x18\x01 \x01(\t\"&\n\x0c\x44irListBlock\x12\x16\n\x0e\x64ir_list_block\x18\x01 \x01(\t\"%\n\tRenameMsg\x12\x0b\n\x03old\x18\x01 \x01(\t\x12\x0b\n\x03new\x18\x02 \x01(\t2\xe1\x03\n\x06ZfsRpc\x12-\n\x0bGetFileStat\x12\r.zfs.FilePath\x1a\r.zfs.FileStat\"\x00\x12\x36\n\x08TestAuth\x12\x14.zfs.TestAuthRequest\x1a\x12.zfs.TestAuthReply\"\x00\x12.\n\x05\x46\x65tch\x12\r.zfs.FilePath\x1a\x12.zfs.FileDataBlock\"\x00\x30\x01\x12.\n\x05Store\x12\x12.zfs.FileDataBlock\x1a\r.zfs.StdReply\"\x00(\x01\x12-\n\x0bSetFileStat\x12\r.zfs.FileStat\x1a\r.zfs.StdReply\"\x00\x12,\n\nRemoveFile\x12\r.zfs.FilePath\x1a\r.zfs.StdReply\"\x00\x12)\n\x07MakeDir\x12\r.zfs.FilePath\x1a\r.zfs.StdReply\"\x00\x12+\n\tRemoveDir\x12\r.zfs.FilePath\x1a\r.zfs.StdReply\"\x00\x12\x30\n\x08\x46\x65tchDir\x12\r.zfs.FilePath\x1a\x11.zfs.DirListBlock\"\x00\x30\x01\x12)\n\x06Rename\x12\x0e.zfs.RenameMsg\x1a\r.zfs.StdReply\"\x00\x42\x06\xa2\x02\x03HLWb\x06proto3'
+  serialized_pb=b'\n\tzfs.proto\x12\x03zfs\"\xf1\x01\n\x08\x46ileStat\x12\x0e\n\x06st_ino\x18\x01 \x01(\x03\x12\x0e\n\x06st_dev\x18\x02 \x01(\x03\x12\x0f\n\x07st_mode\x18\x03 \x01(\x05\x12\x10\n\x08st_nlink\x18\x04 \x01(\x05\x12\x0e\n\x06st_uid\x18\x05 \x01(\x05\x12\x0e\n\x06st_gid\x18\x06 \x01(\x05\x12\x0f\n\x07st_size\x18\x08 \x01(\x03\x12\x0c\n\x04path\x18\x0e \x01(\t\x12\r\n\x05\x65rror\x18\x0f \x01(\x05\x12\x13\n\x0bst_atime_ns\x18\x10 \x01(\x03\x12\x13\n\x0bst_mtime_ns\x18\x11 \x01(\x03\x12\x13\n\x0bst_ctime_ns\x18\x12 \x01(\x03\x12\x0f\n\x07version\x18\x13 \x01(\x03J\x04\x08\x0b\x10\x0e\"\x1a\n\tFilePaths\x12\r\n\x05paths\x18\x01 \x03(\t\")\n\tFileStats\x12\x1c\n\x05stats\x18\x01 \x03(\x0b\x32\r.zfs.FileStat\"n\n\x08\x46ilePath\x12\x0c\n\x04path\x18\x01 \x01(\t\x12\x0c\n\x04mode\x18\x02 \x01(\x05\x12\x11\n\tclient_id\x18\x03 \x01(\t\x12\x0f\n\x07version\x18\x04 \x01(\x03\x12\x0e\n\x06\x63odecs\x18\x05 \x03(\x05\x12\x12\n\nblock_size\x18\x06 \x01(\x05\"H\n\x08StdReply\x12\x0e\n\x06status\x18\x01 \x01(\x05\x12\x15\n\rerror_message\x18\x02 \x01(\t\x12\x0f\n\x07version\x18\x04 \x01(\x03J\x04\x08\x03\x10\x04\"I\n\x0fTestAuthRequest\x12\x0c\n\x04path\x18\x01 \x01(\t\x12\x11\n\tclient_id\x18\x03 \x01(\t\x12\x0f\n\x07version\x18\x04 \x01(\x03J\x04\x08\x02\x10\x03\"N\n\rTestAuthReply\x12\x0c\n\x04\x66lag\x18\x01 \x01(\x05\x12\x10\n\x08\x63\x61llback\x18\x02 \x01(\x05\x12\x0f\n\x07version\x18\x03 \x01(\x03\x12\x0c\n\x04size\x18\x04 \x01(\x03\"\x89\x01\n\rFileDataBlock\x12\x12\n\ndata_block\x18\x01 \x01(\x0c\x12\x11\n\tclient_id\x18\x02 \x01(\t\x12\r\n\x05\x63odec\x18\x03 \x01(\x05\x12\x0c\n\x04path\x18\x05 \x01(\t\x12\x0e\n\x06length\x18\x06 \x01(\x03\x12\x0f\n\x07version\x18\x07 \x01(\x03\x12\r\n\x05\x65rror\x18\x08 \x01(\x05J\x04\x08\x04\x10\x05\"j\n\x10\x46\x65tchManyRequest\x12\r\n\x05paths\x18\x01 \x03(\t\x12\x11\n\tclient_id\x18\x02 \x01(\t\x12\x0e\n\x06\x63odecs\x18\x03 \x03(\x05\x12\x12\n\nblock_size\x18\x04 \x01(\x05\x12\x10\n\x08max_size\x18\x05 \x01(\x03\"b\n\x0c\x44irListBlock\x12\r\n\x05names\x18\x01 \x03(\t\x12\x0f\n\x07version\x18\x02 \x01(\x03\x12\x14\n\x0cnot_modified\x18\x03 \x01(\x05\x12\x1c\n\x05stats\x18\x04 \x03(\x0b\x32\r.zfs.FileStat\"I\n\tRenameMsg\x12\x0b\n\x03old\x18\x01 \x01(\t\x12\x0b\n\x03new\x18\x02 \x01(\t\x12\x11\n\tclient_id\x18\x03 \x01(\t\x12\x0f\n\x07version\x18\x04 \x01(\x03\"g\n\x0cRangeRequest\x12\x0c\n\x04path\x18\x01 \x01(\t\x12\x0e\n\x06offset\x18\x02 \x01(\x03\x12\x0e\n\x06length\x18\x03 \x01(\x03\x12\x12\n\nblock_size\x18\x05 \x01(\x05\x12\x0f\n\x07version\x18\x06 \x01(\x03J\x04\x08\x04\x10\x05\"g\n\x0eSignatureBlock\x12\x12\n\nblock_size\x18\x01 \x01(\x05\x12\x0c\n\x04weak\x18\x03 \x03(\r\x12\x0e\n\x06strong\x18\x04 \x03(\x0c\x12\x0c\n\x04size\x18\x05 \x01(\x03\x12\x0f\n\x07version\x18\x06 \x01(\x03J\x04\x08\x02\x10\x03\"\xa6\x01\n\nDeltaBlock\x12\x0c\n\x04path\x18\x01 \x01(\t\x12\x0e\n\x06length\x18\x03 \x01(\x03\x12\x12\n\nblock_size\x18\x04 \x01(\x05\x12\x11\n\tclient_id\x18\x05 \x01(\t\x12\x12\n\ncopy_index\x18\x06 \x01(\x03\x12\x12\n\ncopy_count\x18\x07 \x01(\x05\x12\x0f\n\x07literal\x18\x08 \x01(\x0c\x12\x14\n\x0c\x62\x61se_version\x18\t \x01(\x03J\x04\x08\x02\x10\x03\"}\n\x08Manifest\x12\x0c\n\x04path\x18\x01 \x01(\t\x12\x0b\n\x03ids\x18\x02 \x03(\x0c\x12\x0f\n\x07lengths\x18\x03 \x03(\x03\x12\x0c\n\x04size\x18\x05 \x01(\x03\x12\x11\n\tclient_id\x18\x06 \x01(\t\x12\r\n\x05\x65rror\x18\x07 \x01(\x05\x12\x0f\n\x07version\x18\x08 \x01(\x03J\x04\x08\x04\x10\x05\"5\n\x08\x43hunkIds\x12\x0b\n\x03ids\x18\x01 \x03(\x0c\x12\x0e\n\x06\x63odecs\x18\x02 \x03(\x05\x12\x0c\n\x04path\x18\x03 \x01(\t\"B\n\tChunkData\x12\n\n\x02id\x18\x01 \x01(\x0c\x12\x0c\n\x04\x64\x61ta\x18\x02 \x01(\x0c\x12\r\n\x05\x63odec\x18\x03 \x01(\x05\x12\x0c\n\x04path\x18\x04 \x01(\t\"\x1d\n\x08\x43lientId\x12\x11\n\tclient_id\x18\x01 \x01(\t\"\x1d\n\rCallbackBreak\x12\x0c\n\x04path\x18\x01 \x01(\t\"*\n\x06Volume\x12\x0e\n\x06prefix\x18\x01 \x01(\t\x12\x10\n\x08\x65ndpoint\x18\x02 \x01(\t\"=\n\tVolumeMap\x12\x12\n\ngeneration\x18\x01 \x01(\x03\x12\x1c\n\x07volumes\x18\x02 \x03(\x0b\x32\x0b.zfs.Volume2\xd5\x08\n\x06ZfsRpc\x12-\n\x0bGetFileStat\x12\r.zfs.FilePath\x1a\r.zfs.FileStat\"\x00\x12\x30\n\x0cGetFileStats\x12\x0e.zfs.FilePaths\x1a\x0e.zfs.FileStats\"\x00\x12\x36\n\x08TestAuth\x12\x14.zfs.TestAuthRequest\x1a\x12.zfs.TestAuthReply\"\x00\x12.\n\x05\x46\x65tch\x12\r.zfs.FilePath\x1a\x12.zfs.FileDataBlock\"\x00\x30\x01\x12\x37\n\nFetchRange\x12\x11.zfs.RangeRequest\x1a\x12.zfs.FileDataBlock\"\x00\x30\x01\x12:\n\tFetchMany\x12\x15.zfs.FetchManyRequest\x1a\x12.zfs.FileDataBlock\"\x00\x30\x01\x12.\n\x05Store\x12\x12.zfs.FileDataBlock\x1a\r.zfs.StdReply\"\x00(\x01\x12\x37\n\rGetSignatures\x12\r.zfs.FilePath\x1a\x13.zfs.SignatureBlock\"\x00\x30\x01\x12\x30\n\nStoreDelta\x12\x0f.zfs.DeltaBlock\x1a\r.zfs.StdReply\"\x00(\x01\x12-\n\x0bGetManifest\x12\r.zfs.FilePath\x1a\r.zfs.Manifest\"\x00\x12\x30\n\x0b\x46\x65tchChunks\x12\r.zfs.ChunkIds\x1a\x0e.zfs.ChunkData\"\x00\x30\x01\x12/\n\rMissingChunks\x12\r.zfs.ChunkIds\x1a\r.zfs.ChunkIds\"\x00\x12.\n\tPutChunks\x12\x0e.zfs.ChunkData\x1a\r.zfs.StdReply\"\x00(\x01\x12/\n\rStoreManifest\x12\r.zfs.Manifest\x1a\r.zfs.StdReply\"\x00\x12-\n\x0bSetFileStat\x12\r.zfs.FileStat\x1a\r.zfs.StdReply\"\x00\x12,\n\nRemoveFile\x12\r.zfs.FilePath\x1a\r.zfs.StdReply\"\x00\x12)\n\x07MakeDir\x12\r.zfs.FilePath\x1a\r.zfs.StdReply\"\x00\x12+\n\tRemoveDir\x12\r.zfs.FilePath\x1a\r.zfs.StdReply\"\x00\x12\x30\n\x08\x46\x65tchDir\x12\r.zfs.FilePath\x1a\x11.zfs.DirListBlock\"\x00\x30\x01\x12\x34\n\x0c\x46\x65tchDirPlus\x12\r.zfs.FilePath\x1a\x11.zfs.DirListBlock\"\x00\x30\x01\x12)\n\x06Rename\x12\x0e.zfs.RenameMsg\x1a\r.zfs.StdReply\"\x00\x12\x37\n\x0e\x43\x61llbackBreaks\x12\r.zfs.ClientId\x1a\x12.zfs.CallbackBreak\"\x00\x30\x01\x32j\n\x0eVolumeLocation\x12-\n\nGetVolumes\x12\r.zfs.ClientId\x1a\x0e.zfs.VolumeMap\"\x00\x12)\n\tSetVolume\x12\x0b.zfs.Volume\x1a\r.zfs.StdReply\"\x00\x42\x06\xa2\x02\x03HLWb\x06proto3'
 )
 _sym_db.RegisterFileDescriptor(DESCRIPTOR)
 
@@ -33,70 +33,795 @@ _FILESTAT = _descriptor.Descriptor(
   fields=[
     _descriptor.FieldDescriptor(
       name='st_ino', full_name='zfs.FileStat.st_ino', index=0,
+      number=1, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='st_dev', full_name='zfs.FileStat.st_dev', index=1,
+      number=2, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='st_mode', full_name='zfs.FileStat.st_mode', index=2,
+      number=3, type=5, cpp_type=1, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='st_nlink', full_name='zfs.FileStat.st_nlink', index=3,
+      number=4, type=5, cpp_type=1, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='st_uid', full_name='zfs.FileStat.st_uid', index=4,
+      number=5, type=5, cpp_type=1, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='st_gid', full_name='zfs.FileStat.st_gid', index=5,
+      number=6, type=5, cpp_type=1, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='st_size', full_name='zfs.FileStat.st_size', index=6,
+      number=8, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='path', full_name='zfs.FileStat.path', index=7,
+      number=14, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='error', full_name='zfs.FileStat.error', index=8,
+      number=15, type=5, cpp_type=1, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='st_atime_ns', full_name='zfs.FileStat.st_atime_ns', index=9,
+      number=16, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='st_mtime_ns', full_name='zfs.FileStat.st_mtime_ns', index=10,
+      number=17, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='st_ctime_ns', full_name='zfs.FileStat.st_ctime_ns', index=11,
+      number=18, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='version', full_name='zfs.FileStat.version', index=12,
+      number=19, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=19,
+  serialized_end=260,
+)
+
+
+_FILEPATHS = _descriptor.Descriptor(
+  name='FilePaths',
+  full_name='zfs.FilePaths',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='paths', full_name='zfs.FilePaths.paths', index=0,
+      number=1, type=9, cpp_type=9, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=262,
+  serialized_end=288,
+)
+
+
+_FILESTATS = _descriptor.Descriptor(
+  name='FileStats',
+  full_name='zfs.FileStats',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='stats', full_name='zfs.FileStats.stats', index=0,
+      number=1, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=290,
+  serialized_end=331,
+)
+
+
+_FILEPATH = _descriptor.Descriptor(
+  name='FilePath',
+  full_name='zfs.FilePath',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='path', full_name='zfs.FilePath.path', index=0,
+      number=1, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='mode', full_name='zfs.FilePath.mode', index=1,
+      number=2, type=5, cpp_type=1, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='client_id', full_name='zfs.FilePath.client_id', index=2,
+      number=3, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='version', full_name='zfs.FilePath.version', index=3,
+      number=4, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='codecs', full_name='zfs.FilePath.codecs', index=4,
+      number=5, type=5, cpp_type=1, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='block_size', full_name='zfs.FilePath.block_size', index=5,
+      number=6, type=5, cpp_type=1, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=333,
+  serialized_end=443,
+)
+
+
+_STDREPLY = _descriptor.Descriptor(
+  name='StdReply',
+  full_name='zfs.StdReply',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='status', full_name='zfs.StdReply.status', index=0,
+      number=1, type=5, cpp_type=1, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='error_message', full_name='zfs.StdReply.error_message', index=1,
+      number=2, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='version', full_name='zfs.StdReply.version', index=2,
+      number=4, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=445,
+  serialized_end=517,
+)
+
+
+_TESTAUTHREQUEST = _descriptor.Descriptor(
+  name='TestAuthRequest',
+  full_name='zfs.TestAuthRequest',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='path', full_name='zfs.TestAuthRequest.path', index=0,
+      number=1, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='client_id', full_name='zfs.TestAuthRequest.client_id', index=1,
+      number=3, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='version', full_name='zfs.TestAuthRequest.version', index=2,
+      number=4, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=519,
+  serialized_end=592,
+)
+
+
+_TESTAUTHREPLY = _descriptor.Descriptor(
+  name='TestAuthReply',
+  full_name='zfs.TestAuthReply',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='flag', full_name='zfs.TestAuthReply.flag', index=0,
       number=1, type=5, cpp_type=1, label=1,
       has_default_value=False, default_value=0,
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
     _descriptor.FieldDescriptor(
-      name='st_dev', full_name='zfs.FileStat.st_dev', index=1,
-      number=2, type=5, cpp_type=1, label=1,
+      name='callback', full_name='zfs.TestAuthReply.callback', index=1,
+      number=2, type=5, cpp_type=1, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='version', full_name='zfs.TestAuthReply.version', index=2,
+      number=3, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='size', full_name='zfs.TestAuthReply.size', index=3,
+      number=4, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=594,
+  serialized_end=672,
+)
+
+
+_FILEDATABLOCK = _descriptor.Descriptor(
+  name='FileDataBlock',
+  full_name='zfs.FileDataBlock',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='data_block', full_name='zfs.FileDataBlock.data_block', index=0,
+      number=1, type=12, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"",
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='client_id', full_name='zfs.FileDataBlock.client_id', index=1,
+      number=2, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='codec', full_name='zfs.FileDataBlock.codec', index=2,
+      number=3, type=5, cpp_type=1, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='path', full_name='zfs.FileDataBlock.path', index=3,
+      number=5, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='length', full_name='zfs.FileDataBlock.length', index=4,
+      number=6, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='version', full_name='zfs.FileDataBlock.version', index=5,
+      number=7, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='error', full_name='zfs.FileDataBlock.error', index=6,
+      number=8, type=5, cpp_type=1, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=675,
+  serialized_end=812,
+)
+
+
+_FETCHMANYREQUEST = _descriptor.Descriptor(
+  name='FetchManyRequest',
+  full_name='zfs.FetchManyRequest',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='paths', full_name='zfs.FetchManyRequest.paths', index=0,
+      number=1, type=9, cpp_type=9, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='client_id', full_name='zfs.FetchManyRequest.client_id', index=1,
+      number=2, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='codecs', full_name='zfs.FetchManyRequest.codecs', index=2,
+      number=3, type=5, cpp_type=1, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='block_size', full_name='zfs.FetchManyRequest.block_size', index=3,
+      number=4, type=5, cpp_type=1, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='max_size', full_name='zfs.FetchManyRequest.max_size', index=4,
+      number=5, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=814,
+  serialized_end=920,
+)
+
+
+_DIRLISTBLOCK = _descriptor.Descriptor(
+  name='DirListBlock',
+  full_name='zfs.DirListBlock',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='names', full_name='zfs.DirListBlock.names', index=0,
+      number=1, type=9, cpp_type=9, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='version', full_name='zfs.DirListBlock.version', index=1,
+      number=2, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='not_modified', full_name='zfs.DirListBlock.not_modified', index=2,
+      number=3, type=5, cpp_type=1, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='stats', full_name='zfs.DirListBlock.stats', index=3,
+      number=4, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=922,
+  serialized_end=1020,
+)
+
+
+_RENAMEMSG = _descriptor.Descriptor(
+  name='RenameMsg',
+  full_name='zfs.RenameMsg',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='old', full_name='zfs.RenameMsg.old', index=0,
+      number=1, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='new', full_name='zfs.RenameMsg.new', index=1,
+      number=2, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='client_id', full_name='zfs.RenameMsg.client_id', index=2,
+      number=3, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='version', full_name='zfs.RenameMsg.version', index=3,
+      number=4, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=1022,
+  serialized_end=1095,
+)
+
+
+_RANGEREQUEST = _descriptor.Descriptor(
+  name='RangeRequest',
+  full_name='zfs.RangeRequest',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='path', full_name='zfs.RangeRequest.path', index=0,
+      number=1, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='offset', full_name='zfs.RangeRequest.offset', index=1,
+      number=2, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='length', full_name='zfs.RangeRequest.length', index=2,
+      number=3, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='block_size', full_name='zfs.RangeRequest.block_size', index=3,
+      number=5, type=5, cpp_type=1, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='version', full_name='zfs.RangeRequest.version', index=4,
+      number=6, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=1097,
+  serialized_end=1200,
+)
+
+
+_SIGNATUREBLOCK = _descriptor.Descriptor(
+  name='SignatureBlock',
+  full_name='zfs.SignatureBlock',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='block_size', full_name='zfs.SignatureBlock.block_size', index=0,
+      number=1, type=5, cpp_type=1, label=1,
       has_default_value=False, default_value=0,
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
     _descriptor.FieldDescriptor(
-      name='st_mode', full_name='zfs.FileStat.st_mode', index=2,
-      number=3, type=5, cpp_type=1, label=1,
-      has_default_value=False, default_value=0,
+      name='weak', full_name='zfs.SignatureBlock.weak', index=1,
+      number=3, type=13, cpp_type=3, label=3,
+      has_default_value=False, default_value=[],
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
     _descriptor.FieldDescriptor(
-      name='st_nlink', full_name='zfs.FileStat.st_nlink', index=3,
-      number=4, type=5, cpp_type=1, label=1,
+      name='strong', full_name='zfs.SignatureBlock.strong', index=2,
+      number=4, type=12, cpp_type=9, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='size', full_name='zfs.SignatureBlock.size', index=3,
+      number=5, type=3, cpp_type=2, label=1,
       has_default_value=False, default_value=0,
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
     _descriptor.FieldDescriptor(
-      name='st_uid', full_name='zfs.FileStat.st_uid', index=4,
-      number=5, type=5, cpp_type=1, label=1,
+      name='version', full_name='zfs.SignatureBlock.version', index=4,
+      number=6, type=3, cpp_type=2, label=1,
       has_default_value=False, default_value=0,
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=1202,
+  serialized_end=1305,
+)
+
+
+_DELTABLOCK = _descriptor.Descriptor(
+  name='DeltaBlock',
+  full_name='zfs.DeltaBlock',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='path', full_name='zfs.DeltaBlock.path', index=0,
+      number=1, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
     _descriptor.FieldDescriptor(
-      name='st_gid', full_name='zfs.FileStat.st_gid', index=5,
-      number=6, type=5, cpp_type=1, label=1,
+      name='length', full_name='zfs.DeltaBlock.length', index=1,
+      number=3, type=3, cpp_type=2, label=1,
       has_default_value=False, default_value=0,
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
     _descriptor.FieldDescriptor(
-      name='st_size', full_name='zfs.FileStat.st_size', index=6,
-      number=8, type=5, cpp_type=1, label=1,
+      name='block_size', full_name='zfs.DeltaBlock.block_size', index=2,
+      number=4, type=5, cpp_type=1, label=1,
       has_default_value=False, default_value=0,
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
     _descriptor.FieldDescriptor(
-      name='st_atime', full_name='zfs.FileStat.st_atime', index=7,
-      number=11, type=2, cpp_type=6, label=1,
+      name='client_id', full_name='zfs.DeltaBlock.client_id', index=3,
+      number=5, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='copy_index', full_name='zfs.DeltaBlock.copy_index', index=4,
+      number=6, type=3, cpp_type=2, label=1,
       has_default_value=False, default_value=0,
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
     _descriptor.FieldDescriptor(
-      name='st_mtime', full_name='zfs.FileStat.st_mtime', index=8,
-      number=12, type=2, cpp_type=6, label=1,
+      name='copy_count', full_name='zfs.DeltaBlock.copy_count', index=5,
+      number=7, type=5, cpp_type=1, label=1,
       has_default_value=False, default_value=0,
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
     _descriptor.FieldDescriptor(
-      name='st_ctime', full_name='zfs.FileStat.st_ctime', index=9,
-      number=13, type=2, cpp_type=6, label=1,
+      name='literal', full_name='zfs.DeltaBlock.literal', index=6,
+      number=8, type=12, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"",
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='base_version', full_name='zfs.DeltaBlock.base_version', index=7,
+      number=9, type=3, cpp_type=2, label=1,
       has_default_value=False, default_value=0,
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
@@ -113,28 +838,63 @@ _FILESTAT = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=19,
-  serialized_end=199,
+  serialized_start=1308,
+  serialized_end=1474,
 )
 
 
-_FILEPATH = _descriptor.Descriptor(
-  name='FilePath',
-  full_name='zfs.FilePath',
+_MANIFEST = _descriptor.Descriptor(
+  name='Manifest',
+  full_name='zfs.Manifest',
   filename=None,
   file=DESCRIPTOR,
   containing_type=None,
   fields=[
     _descriptor.FieldDescriptor(
-      name='path', full_name='zfs.FilePath.path', index=0,
+      name='path', full_name='zfs.Manifest.path', index=0,
       number=1, type=9, cpp_type=9, label=1,
       has_default_value=False, default_value=b"".decode('utf-8'),
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
     _descriptor.FieldDescriptor(
-      name='mode', full_name='zfs.FilePath.mode', index=1,
-      number=2, type=5, cpp_type=1, label=1,
+      name='ids', full_name='zfs.Manifest.ids', index=1,
+      number=2, type=12, cpp_type=9, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='lengths', full_name='zfs.Manifest.lengths', index=2,
+      number=3, type=3, cpp_type=2, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='size', full_name='zfs.Manifest.size', index=3,
+      number=5, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='client_id', full_name='zfs.Manifest.client_id', index=4,
+      number=6, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='error', full_name='zfs.Manifest.error', index=5,
+      number=7, type=5, cpp_type=1, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='version', full_name='zfs.Manifest.version', index=6,
+      number=8, type=3, cpp_type=2, label=1,
       has_default_value=False, default_value=0,
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
@@ -151,28 +911,35 @@ _FILEPATH = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=201,
-  serialized_end=239,
+  serialized_start=1476,
+  serialized_end=1601,
 )
 
 
-_STDREPLY = _descriptor.Descriptor(
-  name='StdReply',
-  full_name='zfs.StdReply',
+_CHUNKIDS = _descriptor.Descriptor(
+  name='ChunkIds',
+  full_name='zfs.ChunkIds',
   filename=None,
   file=DESCRIPTOR,
   containing_type=None,
   fields=[
     _descriptor.FieldDescriptor(
-      name='status', full_name='zfs.StdReply.status', index=0,
-      number=1, type=5, cpp_type=1, label=1,
-      has_default_value=False, default_value=0,
+      name='ids', full_name='zfs.ChunkIds.ids', index=0,
+      number=1, type=12, cpp_type=9, label=3,
+      has_default_value=False, default_value=[],
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
     _descriptor.FieldDescriptor(
-      name='error_message', full_name='zfs.StdReply.error_message', index=1,
-      number=2, type=9, cpp_type=9, label=1,
+      name='codecs', full_name='zfs.ChunkIds.codecs', index=1,
+      number=2, type=5, cpp_type=1, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='path', full_name='zfs.ChunkIds.path', index=2,
+      number=3, type=9, cpp_type=9, label=1,
       has_default_value=False, default_value=b"".decode('utf-8'),
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
@@ -189,32 +956,46 @@ _STDREPLY = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=241,
-  serialized_end=290,
+  serialized_start=1603,
+  serialized_end=1656,
 )
 
 
-_TESTAUTHREQUEST = _descriptor.Descriptor(
-  name='TestAuthRequest',
-  full_name='zfs.TestAuthRequest',
+_CHUNKDATA = _descriptor.Descriptor(
+  name='ChunkData',
+  full_name='zfs.ChunkData',
   filename=None,
   file=DESCRIPTOR,
   containing_type=None,
   fields=[
     _descriptor.FieldDescriptor(
-      name='path', full_name='zfs.TestAuthRequest.path', index=0,
-      number=1, type=9, cpp_type=9, label=1,
-      has_default_value=False, default_value=b"".decode('utf-8'),
+      name='id', full_name='zfs.ChunkData.id', index=0,
+      number=1, type=12, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"",
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='data', full_name='zfs.ChunkData.data', index=1,
+      number=2, type=12, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"",
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
     _descriptor.FieldDescriptor(
-      name='st_mtime', full_name='zfs.TestAuthRequest.st_mtime', index=1,
-      number=2, type=2, cpp_type=6, label=1,
+      name='codec', full_name='zfs.ChunkData.codec', index=2,
+      number=3, type=5, cpp_type=1, label=1,
       has_default_value=False, default_value=0,
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
+    _descriptor.FieldDescriptor(
+      name='path', full_name='zfs.ChunkData.path', index=3,
+      number=4, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
   ],
   extensions=[
   ],
@@ -227,22 +1008,22 @@ _TESTAUTHREQUEST = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=292,
-  serialized_end=341,
+  serialized_start=1658,
+  serialized_end=1724,
 )
 
 
-_TESTAUTHREPLY = _descriptor.Descriptor(
-  name='TestAuthReply',
-  full_name='zfs.TestAuthReply',
+_CLIENTID = _descriptor.Descriptor(
+  name='ClientId',
+  full_name='zfs.ClientId',
   filename=None,
   file=DESCRIPTOR,
   containing_type=None,
   fields=[
     _descriptor.FieldDescriptor(
-      name='flag', full_name='zfs.TestAuthReply.flag', index=0,
-      number=1, type=5, cpp_type=1, label=1,
-      has_default_value=False, default_value=0,
+      name='client_id', full_name='zfs.ClientId.client_id', index=0,
+      number=1, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
@@ -258,20 +1039,20 @@ _TESTAUTHREPLY = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=343,
-  serialized_end=372,
+  serialized_start=1726,
+  serialized_end=1755,
 )
 
 
-_FILEDATABLOCK = _descriptor.Descriptor(
-  name='FileDataBlock',
-  full_name='zfs.FileDataBlock',
+_CALLBACKBREAK = _descriptor.Descriptor(
+  name='CallbackBreak',
+  full_name='zfs.CallbackBreak',
   filename=None,
   file=DESCRIPTOR,
   containing_type=None,
   fields=[
     _descriptor.FieldDescriptor(
-      name='data_block', full_name='zfs.FileDataBlock.data_block', index=0,
+      name='path', full_name='zfs.CallbackBreak.path', index=0,
       number=1, type=9, cpp_type=9, label=1,
       has_default_value=False, default_value=b"".decode('utf-8'),
       message_type=None, enum_type=None, containing_type=None,
@@ -289,25 +1070,32 @@ _FILEDATABLOCK = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=374,
-  serialized_end=409,
+  serialized_start=1757,
+  serialized_end=1786,
 )
 
 
-_DIRLISTBLOCK = _descriptor.Descriptor(
-  name='DirListBlock',
-  full_name='zfs.DirListBlock',
+_VOLUME = _descriptor.Descriptor(
+  name='Volume',
+  full_name='zfs.Volume',
   filename=None,
   file=DESCRIPTOR,
   containing_type=None,
   fields=[
     _descriptor.FieldDescriptor(
-      name='dir_list_block', full_name='zfs.DirListBlock.dir_list_block', index=0,
+      name='prefix', full_name='zfs.Volume.prefix', index=0,
       number=1, type=9, cpp_type=9, label=1,
       has_default_value=False, default_value=b"".decode('utf-8'),
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
+    _descriptor.FieldDescriptor(
+      name='endpoint', full_name='zfs.Volume.endpoint', index=1,
+      number=2, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
   ],
   extensions=[
   ],
@@ -320,29 +1108,29 @@ _DIRLISTBLOCK = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=411,
-  serialized_end=449,
+  serialized_start=1788,
+  serialized_end=1830,
 )
 
 
-_RENAMEMSG = _descriptor.Descriptor(
-  name='RenameMsg',
-  full_name='zfs.RenameMsg',
+_VOLUMEMAP = _descriptor.Descriptor(
+  name='VolumeMap',
+  full_name='zfs.VolumeMap',
   filename=None,
   file=DESCRIPTOR,
   containing_type=None,
   fields=[
     _descriptor.FieldDescriptor(
-      name='old', full_name='zfs.RenameMsg.old', index=0,
-      number=1, type=9, cpp_type=9, label=1,
-      has_default_value=False, default_value=b"".decode('utf-8'),
+      name='generation', full_name='zfs.VolumeMap.generation', index=0,
+      number=1, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
     _descriptor.FieldDescriptor(
-      name='new', full_name='zfs.RenameMsg.new', index=1,
-      number=2, type=9, cpp_type=9, label=1,
-      has_default_value=False, default_value=b"".decode('utf-8'),
+      name='volumes', full_name='zfs.VolumeMap.volumes', index=1,
+      number=2, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
@@ -358,18 +1146,34 @@ _RENAMEMSG = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=451,
-  serialized_end=488,
+  serialized_start=1832,
+  serialized_end=1893,
 )
 
+_FILESTATS.fields_by_name['stats'].message_type = _FILESTAT
+_DIRLISTBLOCK.fields_by_name['stats'].message_type = _FILESTAT
+_VOLUMEMAP.fields_by_name['volumes'].message_type = _VOLUME
 DESCRIPTOR.message_types_by_name['FileStat'] = _FILESTAT
+DESCRIPTOR.message_types_by_name['FilePaths'] = _FILEPATHS
+DESCRIPTOR.message_types_by_name['FileStats'] = _FILESTATS
 DESCRIPTOR.message_types_by_name['FilePath'] = _FILEPATH
 DESCRIPTOR.message_types_by_name['StdReply'] = _STDREPLY
 DESCRIPTOR.message_types_by_name['TestAuthRequest'] = _TESTAUTHREQUEST
 DESCRIPTOR.message_types_by_name['TestAuthReply'] = _TESTAUTHREPLY
 DESCRIPTOR.message_types_by_name['FileDataBlock'] = _FILEDATABLOCK
+DESCRIPTOR.message_types_by_name['FetchManyRequest'] = _FETCHMANYREQUEST
 DESCRIPTOR.message_types_by_name['DirListBlock'] = _DIRLISTBLOCK
 DESCRIPTOR.message_types_by_name['RenameMsg'] = _RENAMEMSG
+DESCRIPTOR.message_types_by_name['RangeRequest'] = _RANGEREQUEST
+DESCRIPTOR.message_types_by_name['SignatureBlock'] = _SIGNATUREBLOCK
+DESCRIPTOR.message_types_by_name['DeltaBlock'] = _DELTABLOCK
+DESCRIPTOR.message_types_by_name['Manifest'] = _MANIFEST
+DESCRIPTOR.message_types_by_name['ChunkIds'] = _CHUNKIDS
+DESCRIPTOR.message_types_by_name['ChunkData'] = _CHUNKDATA
+DESCRIPTOR.message_types_by_name['ClientId'] = _CLIENTID
+DESCRIPTOR.message_types_by_name['CallbackBreak'] = _CALLBACKBREAK
+DESCRIPTOR.message_types_by_name['Volume'] = _VOLUME
+DESCRIPTOR.message_types_by_name['VolumeMap'] = _VOLUMEMAP
 
 FileStat = _reflection.GeneratedProtocolMessageType('FileStat', (_message.Message,), dict(
   DESCRIPTOR = _FILESTAT,
@@ -378,6 +1182,20 @@ FileStat = _reflection.GeneratedProtocolMessageType('FileStat', (_message.Messag
   ))
 _sym_db.RegisterMessage(FileStat)
 
+FilePaths = _reflection.GeneratedProtocolMessageType('FilePaths', (_message.Message,), dict(
+  DESCRIPTOR = _FILEPATHS,
+  __module__ = 'zfs_pb2'
+  # @@protoc_insertion_point(class_scope:zfs.FilePaths)
+  ))
+_sym_db.RegisterMessage(FilePaths)
+
+FileStats = _reflection.GeneratedProtocolMessageType('FileStats', (_message.Message,), dict(
+  DESCRIPTOR = _FILESTATS,
+  __module__ = 'zfs_pb2'
+  # @@protoc_insertion_point(class_scope:zfs.FileStats)
+  ))
+_sym_db.RegisterMessage(FileStats)
+
 FilePath = _reflection.GeneratedProtocolMessageType('FilePath', (_message.Message,), dict(
   DESCRIPTOR = _FILEPATH,
   __module__ = 'zfs_pb2'
@@ -413,6 +1231,13 @@ FileDataBlock = _reflection.GeneratedProtocolMessageType('FileDataBlock', (_mess
   ))
 _sym_db.RegisterMessage(FileDataBlock)
 
+FetchManyRequest = _reflection.GeneratedProtocolMessageType('FetchManyRequest', (_message.Message,), dict(
+  DESCRIPTOR = _FETCHMANYREQUEST,
+  __module__ = 'zfs_pb2'
+  # @@protoc_insertion_point(class_scope:zfs.FetchManyRequest)
+  ))
+_sym_db.RegisterMessage(FetchManyRequest)
+
 DirListBlock = _reflection.GeneratedProtocolMessageType('DirListBlock', (_message.Message,), dict(
   DESCRIPTOR = _DIRLISTBLOCK,
   __module__ = 'zfs_pb2'
@@ -427,6 +1252,76 @@ RenameMsg = _reflection.GeneratedProtocolMessageType('RenameMsg', (_message.Mess
   ))
 _sym_db.RegisterMessage(RenameMsg)
 
+RangeRequest = _reflection.GeneratedProtocolMessageType('RangeRequest', (_message.Message,), dict(
+  DESCRIPTOR = _RANGEREQUEST,
+  __module__ = 'zfs_pb2'
+  # @@protoc_insertion_point(class_scope:zfs.RangeRequest)
+  ))
+_sym_db.RegisterMessage(RangeRequest)
+
+SignatureBlock = _reflection.GeneratedProtocolMessageType('SignatureBlock', (_message.Message,), dict(
+  DESCRIPTOR = _SIGNATUREBLOCK,
+  __module__ = 'zfs_pb2'
+  # @@protoc_insertion_point(class_scope:zfs.SignatureBlock)
+  ))
+_sym_db.RegisterMessage(SignatureBlock)
+
+DeltaBlock = _reflection.GeneratedProtocolMessageType('DeltaBlock', (_message.Message,), dict(
+  DESCRIPTOR = _DELTABLOCK,
+  __module__ = 'zfs_pb2'
+  # @@protoc_insertion_point(class_scope:zfs.DeltaBlock)
+  ))
+_sym_db.RegisterMessage(DeltaBlock)
+
+Manifest = _reflection.GeneratedProtocolMessageType('Manifest', (_message.Message,), dict(
+  DESCRIPTOR = _MANIFEST,
+  __module__ = 'zfs_pb2'
+  # @@protoc_insertion_point(class_scope:zfs.Manifest)
+  ))
+_sym_db.RegisterMessage(Manifest)
+
+ChunkIds = _reflection.GeneratedProtocolMessageType('ChunkIds', (_message.Message,), dict(
+  DESCRIPTOR = _CHUNKIDS,
+  __module__ = 'zfs_pb2'
+  # @@protoc_insertion_point(class_scope:zfs.ChunkIds)
+  ))
+_sym_db.RegisterMessage(ChunkIds)
+
+ChunkData = _reflection.GeneratedProtocolMessageType('ChunkData', (_message.Message,), dict(
+  DESCRIPTOR = _CHUNKDATA,
+  __module__ = 'zfs_pb2'
+  # @@protoc_insertion_point(class_scope:zfs.ChunkData)
+  ))
+_sym_db.RegisterMessage(ChunkData)
+
+ClientId = _reflection.GeneratedProtocolMessageType('ClientId', (_message.Message,), dict(
+  DESCRIPTOR = _CLIENTID,
+  __module__ = 'zfs_pb2'
+  # @@protoc_insertion_point(class_scope:zfs.ClientId)
+  ))
+_sym_db.RegisterMessage(ClientId)
+
+CallbackBreak = _reflection.GeneratedProtocolMessageType('CallbackBreak', (_message.Message,), dict(
+  DESCRIPTOR = _CALLBACKBREAK,
+  __module__ = 'zfs_pb2'
+  # @@protoc_insertion_point(class_scope:zfs.CallbackBreak)
+  ))
+_sym_db.RegisterMessage(CallbackBreak)
+
+Volume = _reflection.GeneratedProtocolMessageType('Volume', (_message.Message,), dict(
+  DESCRIPTOR = _VOLUME,
+  __module__ = 'zfs_pb2'
+  # @@protoc_insertion_point(class_scope:zfs.Volume)
+  ))
+_sym_db.RegisterMessage(Volume)
+
+VolumeMap = _reflection.GeneratedProtocolMessageType('VolumeMap', (_message.Message,), dict(
+  DESCRIPTOR = _VOLUMEMAP,
+  __module__ = 'zfs_pb2'
+  # @@protoc_insertion_point(class_scope:zfs.VolumeMap)
+  ))
+_sym_db.RegisterMessage(VolumeMap)
+
 
 DESCRIPTOR.has_options = True
 DESCRIPTOR._options = _descriptor._ParseOptions(descriptor_pb2.FileOptions(), b'\242\002\003HLW')
@@ -443,15 +1338,45 @@ class EarlyAdopterZfsRpcServicer(object):
   def GetFileStat(self, request, context):
     raise NotImplementedError()
   @abc.abstractmethod
+  def GetFileStats(self, request, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
   def TestAuth(self, request, context):
     raise NotImplementedError()
   @abc.abstractmethod
   def Fetch(self, request, context):
     raise NotImplementedError()
   @abc.abstractmethod
+  def FetchRange(self, request, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
+  def FetchMany(self, request, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
   def Store(self, request_iterator, context):
     raise NotImplementedError()
   @abc.abstractmethod
+  def GetSignatures(self, request, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
+  def StoreDelta(self, request_iterator, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
+  def GetManifest(self, request, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
+  def FetchChunks(self, request, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
+  def MissingChunks(self, request, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
+  def PutChunks(self, request_iterator, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
+  def StoreManifest(self, request, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
   def SetFileStat(self, request, context):
     raise NotImplementedError()
   @abc.abstractmethod
@@ -467,8 +1392,14 @@ class EarlyAdopterZfsRpcServicer(object):
   def FetchDir(self, request, context):
     raise NotImplementedError()
   @abc.abstractmethod
+  def FetchDirPlus(self, request, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
   def Rename(self, request, context):
     raise NotImplementedError()
+  @abc.abstractmethod
+  def CallbackBreaks(self, request, context):
+    raise NotImplementedError()
 class EarlyAdopterZfsRpcServer(object):
   """<fill me in later!>"""
   __metaclass__ = abc.ABCMeta
@@ -486,6 +1417,10 @@ class EarlyAdopterZfsRpcStub(object):
     raise NotImplementedError()
   GetFileStat.async = None
   @abc.abstractmethod
+  def GetFileStats(self, request):
+    raise NotImplementedError()
+  GetFileStats.async = None
+  @abc.abstractmethod
   def TestAuth(self, request):
     raise NotImplementedError()
   TestAuth.async = None
@@ -494,10 +1429,46 @@ class EarlyAdopterZfsRpcStub(object):
     raise NotImplementedError()
   Fetch.async = None
   @abc.abstractmethod
+  def FetchRange(self, request):
+    raise NotImplementedError()
+  FetchRange.async = None
+  @abc.abstractmethod
+  def FetchMany(self, request):
+    raise NotImplementedError()
+  FetchMany.async = None
+  @abc.abstractmethod
   def Store(self, request_iterator):
     raise NotImplementedError()
   Store.async = None
   @abc.abstractmethod
+  def GetSignatures(self, request):
+    raise NotImplementedError()
+  GetSignatures.async = None
+  @abc.abstractmethod
+  def StoreDelta(self, request_iterator):
+    raise NotImplementedError()
+  StoreDelta.async = None
+  @abc.abstractmethod
+  def GetManifest(self, request):
+    raise NotImplementedError()
+  GetManifest.async = None
+  @abc.abstractmethod
+  def FetchChunks(self, request):
+    raise NotImplementedError()
+  FetchChunks.async = None
+  @abc.abstractmethod
+  def MissingChunks(self, request):
+    raise NotImplementedError()
+  MissingChunks.async = None
+  @abc.abstractmethod
+  def PutChunks(self, request_iterator):
+    raise NotImplementedError()
+  PutChunks.async = None
+  @abc.abstractmethod
+  def StoreManifest(self, request):
+    raise NotImplementedError()
+  StoreManifest.async = None
+  @abc.abstractmethod
   def SetFileStat(self, request):
     raise NotImplementedError()
   SetFileStat.async = None
@@ -518,10 +1489,42 @@ class EarlyAdopterZfsRpcStub(object):
     raise NotImplementedError()
   FetchDir.async = None
   @abc.abstractmethod
+  def FetchDirPlus(self, request):
+    raise NotImplementedError()
+  FetchDirPlus.async = None
+  @abc.abstractmethod
   def Rename(self, request):
     raise NotImplementedError()
   Rename.async = None
+  @abc.abstractmethod
+  def CallbackBreaks(self, request):
+    raise NotImplementedError()
+  CallbackBreaks.async = None
 def early_adopter_create_ZfsRpc_server(servicer, port, private_key=None, certificate_chain=None):
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
   import zfs_pb2
   import zfs_pb2
   import zfs_pb2
@@ -543,26 +1546,76 @@ def early_adopter_create_ZfsRpc_server(servicer, port, private_key=None, certifi
   import zfs_pb2
   import zfs_pb2
   method_service_descriptions = {
+    "CallbackBreaks": alpha_utilities.unary_stream_service_description(
+      servicer.CallbackBreaks,
+      zfs_pb2.ClientId.FromString,
+      zfs_pb2.CallbackBreak.SerializeToString,
+    ),
     "Fetch": alpha_utilities.unary_stream_service_description(
       servicer.Fetch,
       zfs_pb2.FilePath.FromString,
       zfs_pb2.FileDataBlock.SerializeToString,
     ),
+    "FetchChunks": alpha_utilities.unary_stream_service_description(
+      servicer.FetchChunks,
+      zfs_pb2.ChunkIds.FromString,
+      zfs_pb2.ChunkData.SerializeToString,
+    ),
     "FetchDir": alpha_utilities.unary_stream_service_description(
       servicer.FetchDir,
       zfs_pb2.FilePath.FromString,
       zfs_pb2.DirListBlock.SerializeToString,
     ),
+    "FetchDirPlus": alpha_utilities.unary_stream_service_description(
+      servicer.FetchDirPlus,
+      zfs_pb2.FilePath.FromString,
+      zfs_pb2.DirListBlock.SerializeToString,
+    ),
+    "FetchMany": alpha_utilities.unary_stream_service_description(
+      servicer.FetchMany,
+      zfs_pb2.FetchManyRequest.FromString,
+      zfs_pb2.FileDataBlock.SerializeToString,
+    ),
+    "FetchRange": alpha_utilities.unary_stream_service_description(
+      servicer.FetchRange,
+      zfs_pb2.RangeRequest.FromString,
+      zfs_pb2.FileDataBlock.SerializeToString,
+    ),
     "GetFileStat": alpha_utilities.unary_unary_service_description(
       servicer.GetFileStat,
       zfs_pb2.FilePath.FromString,
       zfs_pb2.FileStat.SerializeToString,
     ),
+    "GetFileStats": alpha_utilities.unary_unary_service_description(
+      servicer.GetFileStats,
+      zfs_pb2.FilePaths.FromString,
+      zfs_pb2.FileStats.SerializeToString,
+    ),
+    "GetManifest": alpha_utilities.unary_unary_service_description(
+      servicer.GetManifest,
+      zfs_pb2.FilePath.FromString,
+      zfs_pb2.Manifest.SerializeToString,
+    ),
+    "GetSignatures": alpha_utilities.unary_stream_service_description(
+      servicer.GetSignatures,
+      zfs_pb2.FilePath.FromString,
+      zfs_pb2.SignatureBlock.SerializeToString,
+    ),
     "MakeDir": alpha_utilities.unary_unary_service_description(
       servicer.MakeDir,
       zfs_pb2.FilePath.FromString,
       zfs_pb2.StdReply.SerializeToString,
     ),
+    "MissingChunks": alpha_utilities.unary_unary_service_description(
+      servicer.MissingChunks,
+      zfs_pb2.ChunkIds.FromString,
+      zfs_pb2.ChunkIds.SerializeToString,
+    ),
+    "PutChunks": alpha_utilities.stream_unary_service_description(
+      servicer.PutChunks,
+      zfs_pb2.ChunkData.FromString,
+      zfs_pb2.StdReply.SerializeToString,
+    ),
     "RemoveDir": alpha_utilities.unary_unary_service_description(
       servicer.RemoveDir,
       zfs_pb2.FilePath.FromString,
@@ -588,6 +1641,16 @@ def early_adopter_create_ZfsRpc_server(servicer, port, private_key=None, certifi
       zfs_pb2.FileDataBlock.FromString,
       zfs_pb2.StdReply.SerializeToString,
     ),
+    "StoreDelta": alpha_utilities.stream_unary_service_description(
+      servicer.StoreDelta,
+      zfs_pb2.DeltaBlock.FromString,
+      zfs_pb2.StdReply.SerializeToString,
+    ),
+    "StoreManifest": alpha_utilities.unary_unary_service_description(
+      servicer.StoreManifest,
+      zfs_pb2.Manifest.FromString,
+      zfs_pb2.StdReply.SerializeToString,
+    ),
     "TestAuth": alpha_utilities.unary_unary_service_description(
       servicer.TestAuth,
       zfs_pb2.TestAuthRequest.FromString,
@@ -596,6 +1659,30 @@ def early_adopter_create_ZfsRpc_server(servicer, port, private_key=None, certifi
   }
   return early_adopter_implementations.server("zfs.ZfsRpc", method_service_descriptions, port, private_key=private_key, certificate_chain=certificate_chain)
 def early_adopter_create_ZfsRpc_stub(host, port, metadata_transformer=None, secure=False, root_certificates=None, private_key=None, certificate_chain=None, server_host_override=None):
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
   import zfs_pb2
   import zfs_pb2
   import zfs_pb2
@@ -617,22 +1704,62 @@ def early_adopter_create_ZfsRpc_stub(host, port, metadata_transformer=None, secu
   import zfs_pb2
   import zfs_pb2
   method_invocation_descriptions = {
+    "CallbackBreaks": alpha_utilities.unary_stream_invocation_description(
+      zfs_pb2.ClientId.SerializeToString,
+      zfs_pb2.CallbackBreak.FromString,
+    ),
     "Fetch": alpha_utilities.unary_stream_invocation_description(
       zfs_pb2.FilePath.SerializeToString,
       zfs_pb2.FileDataBlock.FromString,
     ),
+    "FetchChunks": alpha_utilities.unary_stream_invocation_description(
+      zfs_pb2.ChunkIds.SerializeToString,
+      zfs_pb2.ChunkData.FromString,
+    ),
     "FetchDir": alpha_utilities.unary_stream_invocation_description(
       zfs_pb2.FilePath.SerializeToString,
       zfs_pb2.DirListBlock.FromString,
     ),
+    "FetchDirPlus": alpha_utilities.unary_stream_invocation_description(
+      zfs_pb2.FilePath.SerializeToString,
+      zfs_pb2.DirListBlock.FromString,
+    ),
+    "FetchMany": alpha_utilities.unary_stream_invocation_description(
+      zfs_pb2.FetchManyRequest.SerializeToString,
+      zfs_pb2.FileDataBlock.FromString,
+    ),
+    "FetchRange": alpha_utilities.unary_stream_invocation_description(
+      zfs_pb2.RangeRequest.SerializeToString,
+      zfs_pb2.FileDataBlock.FromString,
+    ),
     "GetFileStat": alpha_utilities.unary_unary_invocation_description(
       zfs_pb2.FilePath.SerializeToString,
       zfs_pb2.FileStat.FromString,
     ),
+    "GetFileStats": alpha_utilities.unary_unary_invocation_description(
+      zfs_pb2.FilePaths.SerializeToString,
+      zfs_pb2.FileStats.FromString,
+    ),
+    "GetManifest": alpha_utilities.unary_unary_invocation_description(
+      zfs_pb2.FilePath.SerializeToString,
+      zfs_pb2.Manifest.FromString,
+    ),
+    "GetSignatures": alpha_utilities.unary_stream_invocation_description(
+      zfs_pb2.FilePath.SerializeToString,
+      zfs_pb2.SignatureBlock.FromString,
+    ),
     "MakeDir": alpha_utilities.unary_unary_invocation_description(
       zfs_pb2.FilePath.SerializeToString,
       zfs_pb2.StdReply.FromString,
     ),
+    "MissingChunks": alpha_utilities.unary_unary_invocation_description(
+      zfs_pb2.ChunkIds.SerializeToString,
+      zfs_pb2.ChunkIds.FromString,
+    ),
+    "PutChunks": alpha_utilities.stream_unary_invocation_description(
+      zfs_pb2.ChunkData.SerializeToString,
+      zfs_pb2.StdReply.FromString,
+    ),
     "RemoveDir": alpha_utilities.unary_unary_invocation_description(
       zfs_pb2.FilePath.SerializeToString,
       zfs_pb2.StdReply.FromString,
@@ -653,6 +1780,14 @@ def early_adopter_create_ZfsRpc_stub(host, port, metadata_transformer=None, secu
       zfs_pb2.FileDataBlock.SerializeToString,
       zfs_pb2.StdReply.FromString,
     ),
+    "StoreDelta": alpha_utilities.stream_unary_invocation_description(
+      zfs_pb2.DeltaBlock.SerializeToString,
+      zfs_pb2.StdReply.FromString,
+    ),
+    "StoreManifest": alpha_utilities.unary_unary_invocation_description(
+      zfs_pb2.Manifest.SerializeToString,
+      zfs_pb2.StdReply.FromString,
+    ),
     "TestAuth": alpha_utilities.unary_unary_invocation_description(
       zfs_pb2.TestAuthRequest.SerializeToString,
       zfs_pb2.TestAuthReply.FromString,
@@ -667,15 +1802,45 @@ class BetaZfsRpcServicer(object):
   def GetFileStat(self, request, context):
     raise NotImplementedError()
   @abc.abstractmethod
+  def GetFileStats(self, request, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
   def TestAuth(self, request, context):
     raise NotImplementedError()
   @abc.abstractmethod
   def Fetch(self, request, context):
     raise NotImplementedError()
   @abc.abstractmethod
+  def FetchRange(self, request, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
+  def FetchMany(self, request, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
   def Store(self, request_iterator, context):
     raise NotImplementedError()
   @abc.abstractmethod
+  def GetSignatures(self, request, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
+  def StoreDelta(self, request_iterator, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
+  def GetManifest(self, request, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
+  def FetchChunks(self, request, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
+  def MissingChunks(self, request, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
+  def PutChunks(self, request_iterator, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
+  def StoreManifest(self, request, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
   def SetFileStat(self, request, context):
     raise NotImplementedError()
   @abc.abstractmethod
@@ -691,8 +1856,14 @@ class BetaZfsRpcServicer(object):
   def FetchDir(self, request, context):
     raise NotImplementedError()
   @abc.abstractmethod
+  def FetchDirPlus(self, request, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
   def Rename(self, request, context):
     raise NotImplementedError()
+  @abc.abstractmethod
+  def CallbackBreaks(self, request, context):
+    raise NotImplementedError()
 
 class BetaZfsRpcStub(object):
   """The interface to which stubs will conform."""
@@ -702,6 +1873,10 @@ class BetaZfsRpcStub(object):
     raise NotImplementedError()
   GetFileStat.future = None
   @abc.abstractmethod
+  def GetFileStats(self, request, timeout):
+    raise NotImplementedError()
+  GetFileStats.future = None
+  @abc.abstractmethod
   def TestAuth(self, request, timeout):
     raise NotImplementedError()
   TestAuth.future = None
@@ -709,10 +1884,42 @@ class BetaZfsRpcStub(object):
   def Fetch(self, request, timeout):
     raise NotImplementedError()
   @abc.abstractmethod
+  def FetchRange(self, request, timeout):
+    raise NotImplementedError()
+  @abc.abstractmethod
+  def FetchMany(self, request, timeout):
+    raise NotImplementedError()
+  @abc.abstractmethod
   def Store(self, request_iterator, timeout):
     raise NotImplementedError()
   Store.future = None
   @abc.abstractmethod
+  def GetSignatures(self, request, timeout):
+    raise NotImplementedError()
+  @abc.abstractmethod
+  def StoreDelta(self, request_iterator, timeout):
+    raise NotImplementedError()
+  StoreDelta.future = None
+  @abc.abstractmethod
+  def GetManifest(self, request, timeout):
+    raise NotImplementedError()
+  GetManifest.future = None
+  @abc.abstractmethod
+  def FetchChunks(self, request, timeout):
+    raise NotImplementedError()
+  @abc.abstractmethod
+  def MissingChunks(self, request, timeout):
+    raise NotImplementedError()
+  MissingChunks.future = None
+  @abc.abstractmethod
+  def PutChunks(self, request_iterator, timeout):
+    raise NotImplementedError()
+  PutChunks.future = None
+  @abc.abstractmethod
+  def StoreManifest(self, request, timeout):
+    raise NotImplementedError()
+  StoreManifest.future = None
+  @abc.abstractmethod
   def SetFileStat(self, request, timeout):
     raise NotImplementedError()
   SetFileStat.future = None
@@ -732,11 +1939,41 @@ class BetaZfsRpcStub(object):
   def FetchDir(self, request, timeout):
     raise NotImplementedError()
   @abc.abstractmethod
+  def FetchDirPlus(self, request, timeout):
+    raise NotImplementedError()
+  @abc.abstractmethod
   def Rename(self, request, timeout):
     raise NotImplementedError()
   Rename.future = None
+  @abc.abstractmethod
+  def CallbackBreaks(self, request, timeout):
+    raise NotImplementedError()
 
 def beta_create_ZfsRpc_server(servicer, pool=None, pool_size=None, default_timeout=None, maximum_timeout=None):
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
   import zfs_pb2
   import zfs_pb2
   import zfs_pb2
@@ -758,45 +1995,105 @@ def beta_create_ZfsRpc_server(servicer, pool=None, pool_size=None, default_timeo
   import zfs_pb2
   import zfs_pb2
   request_deserializers = {
+    ('zfs.ZfsRpc', 'CallbackBreaks'): zfs_pb2.ClientId.FromString,
     ('zfs.ZfsRpc', 'Fetch'): zfs_pb2.FilePath.FromString,
+    ('zfs.ZfsRpc', 'FetchChunks'): zfs_pb2.ChunkIds.FromString,
     ('zfs.ZfsRpc', 'FetchDir'): zfs_pb2.FilePath.FromString,
+    ('zfs.ZfsRpc', 'FetchDirPlus'): zfs_pb2.FilePath.FromString,
+    ('zfs.ZfsRpc', 'FetchMany'): zfs_pb2.FetchManyRequest.FromString,
+    ('zfs.ZfsRpc', 'FetchRange'): zfs_pb2.RangeRequest.FromString,
     ('zfs.ZfsRpc', 'GetFileStat'): zfs_pb2.FilePath.FromString,
+    ('zfs.ZfsRpc', 'GetFileStats'): zfs_pb2.FilePaths.FromString,
+    ('zfs.ZfsRpc', 'GetManifest'): zfs_pb2.FilePath.FromString,
+    ('zfs.ZfsRpc', 'GetSignatures'): zfs_pb2.FilePath.FromString,
     ('zfs.ZfsRpc', 'MakeDir'): zfs_pb2.FilePath.FromString,
+    ('zfs.ZfsRpc', 'MissingChunks'): zfs_pb2.ChunkIds.FromString,
+    ('zfs.ZfsRpc', 'PutChunks'): zfs_pb2.ChunkData.FromString,
     ('zfs.ZfsRpc', 'RemoveDir'): zfs_pb2.FilePath.FromString,
     ('zfs.ZfsRpc', 'RemoveFile'): zfs_pb2.FilePath.FromString,
     ('zfs.ZfsRpc', 'Rename'): zfs_pb2.RenameMsg.FromString,
     ('zfs.ZfsRpc', 'SetFileStat'): zfs_pb2.FileStat.FromString,
     ('zfs.ZfsRpc', 'Store'): zfs_pb2.FileDataBlock.FromString,
+    ('zfs.ZfsRpc', 'StoreDelta'): zfs_pb2.DeltaBlock.FromString,
+    ('zfs.ZfsRpc', 'StoreManifest'): zfs_pb2.Manifest.FromString,
     ('zfs.ZfsRpc', 'TestAuth'): zfs_pb2.TestAuthRequest.FromString,
   }
   response_serializers = {
+    ('zfs.ZfsRpc', 'CallbackBreaks'): zfs_pb2.CallbackBreak.SerializeToString,
     ('zfs.ZfsRpc', 'Fetch'): zfs_pb2.FileDataBlock.SerializeToString,
+    ('zfs.ZfsRpc', 'FetchChunks'): zfs_pb2.ChunkData.SerializeToString,
     ('zfs.ZfsRpc', 'FetchDir'): zfs_pb2.DirListBlock.SerializeToString,
+    ('zfs.ZfsRpc', 'FetchDirPlus'): zfs_pb2.DirListBlock.SerializeToString,
+    ('zfs.ZfsRpc', 'FetchMany'): zfs_pb2.FileDataBlock.SerializeToString,
+    ('zfs.ZfsRpc', 'FetchRange'): zfs_pb2.FileDataBlock.SerializeToString,
     ('zfs.ZfsRpc', 'GetFileStat'): zfs_pb2.FileStat.SerializeToString,
+    ('zfs.ZfsRpc', 'GetFileStats'): zfs_pb2.FileStats.SerializeToString,
+    ('zfs.ZfsRpc', 'GetManifest'): zfs_pb2.Manifest.SerializeToString,
+    ('zfs.ZfsRpc', 'GetSignatures'): zfs_pb2.SignatureBlock.SerializeToString,
     ('zfs.ZfsRpc', 'MakeDir'): zfs_pb2.StdReply.SerializeToString,
+    ('zfs.ZfsRpc', 'MissingChunks'): zfs_pb2.ChunkIds.SerializeToString,
+    ('zfs.ZfsRpc', 'PutChunks'): zfs_pb2.StdReply.SerializeToString,
     ('zfs.ZfsRpc', 'RemoveDir'): zfs_pb2.StdReply.SerializeToString,
     ('zfs.ZfsRpc', 'RemoveFile'): zfs_pb2.StdReply.SerializeToString,
     ('zfs.ZfsRpc', 'Rename'): zfs_pb2.StdReply.SerializeToString,
     ('zfs.ZfsRpc', 'SetFileStat'): zfs_pb2.StdReply.SerializeToString,
     ('zfs.ZfsRpc', 'Store'): zfs_pb2.StdReply.SerializeToString,
+    ('zfs.ZfsRpc', 'StoreDelta'): zfs_pb2.StdReply.SerializeToString,
+    ('zfs.ZfsRpc', 'StoreManifest'): zfs_pb2.StdReply.SerializeToString,
     ('zfs.ZfsRpc', 'TestAuth'): zfs_pb2.TestAuthReply.SerializeToString,
   }
   method_implementations = {
+    ('zfs.ZfsRpc', 'CallbackBreaks'): face_utilities.unary_stream_inline(servicer.CallbackBreaks),
     ('zfs.ZfsRpc', 'Fetch'): face_utilities.unary_stream_inline(servicer.Fetch),
+    ('zfs.ZfsRpc', 'FetchChunks'): face_utilities.unary_stream_inline(servicer.FetchChunks),
     ('zfs.ZfsRpc', 'FetchDir'): face_utilities.unary_stream_inline(servicer.FetchDir),
+    ('zfs.ZfsRpc', 'FetchDirPlus'): face_utilities.unary_stream_inline(servicer.FetchDirPlus),
+    ('zfs.ZfsRpc', 'FetchMany'): face_utilities.unary_stream_inline(servicer.FetchMany),
+    ('zfs.ZfsRpc', 'FetchRange'): face_utilities.unary_stream_inline(servicer.FetchRange),
     ('zfs.ZfsRpc', 'GetFileStat'): face_utilities.unary_unary_inline(servicer.GetFileStat),
+    ('zfs.ZfsRpc', 'GetFileStats'): face_utilities.unary_unary_inline(servicer.GetFileStats),
+    ('zfs.ZfsRpc', 'GetManifest'): face_utilities.unary_unary_inline(servicer.GetManifest),
+    ('zfs.ZfsRpc', 'GetSignatures'): face_utilities.unary_stream_inline(servicer.GetSignatures),
     ('zfs.ZfsRpc', 'MakeDir'): face_utilities.unary_unary_inline(servicer.MakeDir),
+    ('zfs.ZfsRpc', 'MissingChunks'): face_utilities.unary_unary_inline(servicer.MissingChunks),
+    ('zfs.ZfsRpc', 'PutChunks'): face_utilities.stream_unary_inline(servicer.PutChunks),
     ('zfs.ZfsRpc', 'RemoveDir'): face_utilities.unary_unary_inline(servicer.RemoveDir),
     ('zfs.ZfsRpc', 'RemoveFile'): face_utilities.unary_unary_inline(servicer.RemoveFile),
     ('zfs.ZfsRpc', 'Rename'): face_utilities.unary_unary_inline(servicer.Rename),
     ('zfs.ZfsRpc', 'SetFileStat'): face_utilities.unary_unary_inline(servicer.SetFileStat),
     ('zfs.ZfsRpc', 'Store'): face_utilities.stream_unary_inline(servicer.Store),
+    ('zfs.ZfsRpc', 'StoreDelta'): face_utilities.stream_unary_inline(servicer.StoreDelta),
+    ('zfs.ZfsRpc', 'StoreManifest'): face_utilities.unary_unary_inline(servicer.StoreManifest),
     ('zfs.ZfsRpc', 'TestAuth'): face_utilities.unary_unary_inline(servicer.TestAuth),
   }
   server_options = beta_implementations.server_options(request_deserializers=request_deserializers, response_serializers=response_serializers, thread_pool=pool, thread_pool_size=pool_size, default_timeout=default_timeout, maximum_timeout=maximum_timeout)
   return beta_implementations.server(method_implementations, options=server_options)
 
 def beta_create_ZfsRpc_stub(channel, host=None, metadata_transformer=None, pool=None, pool_size=None):
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
   import zfs_pb2
   import zfs_pb2
   import zfs_pb2
@@ -818,41 +2115,202 @@ def beta_create_ZfsRpc_stub(channel, host=None, metadata_transformer=None, pool=
   import zfs_pb2
   import zfs_pb2
   request_serializers = {
+    ('zfs.ZfsRpc', 'CallbackBreaks'): zfs_pb2.ClientId.SerializeToString,
     ('zfs.ZfsRpc', 'Fetch'): zfs_pb2.FilePath.SerializeToString,
+    ('zfs.ZfsRpc', 'FetchChunks'): zfs_pb2.ChunkIds.SerializeToString,
     ('zfs.ZfsRpc', 'FetchDir'): zfs_pb2.FilePath.SerializeToString,
+    ('zfs.ZfsRpc', 'FetchDirPlus'): zfs_pb2.FilePath.SerializeToString,
+    ('zfs.ZfsRpc', 'FetchMany'): zfs_pb2.FetchManyRequest.SerializeToString,
+    ('zfs.ZfsRpc', 'FetchRange'): zfs_pb2.RangeRequest.SerializeToString,
     ('zfs.ZfsRpc', 'GetFileStat'): zfs_pb2.FilePath.SerializeToString,
+    ('zfs.ZfsRpc', 'GetFileStats'): zfs_pb2.FilePaths.SerializeToString,
+    ('zfs.ZfsRpc', 'GetManifest'): zfs_pb2.FilePath.SerializeToString,
+    ('zfs.ZfsRpc', 'GetSignatures'): zfs_pb2.FilePath.SerializeToString,
     ('zfs.ZfsRpc', 'MakeDir'): zfs_pb2.FilePath.SerializeToString,
+    ('zfs.ZfsRpc', 'MissingChunks'): zfs_pb2.ChunkIds.SerializeToString,
+    ('zfs.ZfsRpc', 'PutChunks'): zfs_pb2.ChunkData.SerializeToString,
     ('zfs.ZfsRpc', 'RemoveDir'): zfs_pb2.FilePath.SerializeToString,
     ('zfs.ZfsRpc', 'RemoveFile'): zfs_pb2.FilePath.SerializeToString,
     ('zfs.ZfsRpc', 'Rename'): zfs_pb2.RenameMsg.SerializeToString,
     ('zfs.ZfsRpc', 'SetFileStat'): zfs_pb2.FileStat.SerializeToString,
     ('zfs.ZfsRpc', 'Store'): zfs_pb2.FileDataBlock.SerializeToString,
+    ('zfs.ZfsRpc', 'StoreDelta'): zfs_pb2.DeltaBlock.SerializeToString,
+    ('zfs.ZfsRpc', 'StoreManifest'): zfs_pb2.Manifest.SerializeToString,
     ('zfs.ZfsRpc', 'TestAuth'): zfs_pb2.TestAuthRequest.SerializeToString,
   }
   response_deserializers = {
+    ('zfs.ZfsRpc', 'CallbackBreaks'): zfs_pb2.CallbackBreak.FromString,
     ('zfs.ZfsRpc', 'Fetch'): zfs_pb2.FileDataBlock.FromString,
+    ('zfs.ZfsRpc', 'FetchChunks'): zfs_pb2.ChunkData.FromString,
     ('zfs.ZfsRpc', 'FetchDir'): zfs_pb2.DirListBlock.FromString,
+    ('zfs.ZfsRpc', 'FetchDirPlus'): zfs_pb2.DirListBlock.FromString,
+    ('zfs.ZfsRpc', 'FetchMany'): zfs_pb2.FileDataBlock.FromString,
+    ('zfs.ZfsRpc', 'FetchRange'): zfs_pb2.FileDataBlock.FromString,
     ('zfs.ZfsRpc', 'GetFileStat'): zfs_pb2.FileStat.FromString,
+    ('zfs.ZfsRpc', 'GetFileStats'): zfs_pb2.FileStats.FromString,
+    ('zfs.ZfsRpc', 'GetManifest'): zfs_pb2.Manifest.FromString,
+    ('zfs.ZfsRpc', 'GetSignatures'): zfs_pb2.SignatureBlock.FromString,
     ('zfs.ZfsRpc', 'MakeDir'): zfs_pb2.StdReply.FromString,
+    ('zfs.ZfsRpc', 'MissingChunks'): zfs_pb2.ChunkIds.FromString,
+    ('zfs.ZfsRpc', 'PutChunks'): zfs_pb2.StdReply.FromString,
     ('zfs.ZfsRpc', 'RemoveDir'): zfs_pb2.StdReply.FromString,
     ('zfs.ZfsRpc', 'RemoveFile'): zfs_pb2.StdReply.FromString,
     ('zfs.ZfsRpc', 'Rename'): zfs_pb2.StdReply.FromString,
     ('zfs.ZfsRpc', 'SetFileStat'): zfs_pb2.StdReply.FromString,
     ('zfs.ZfsRpc', 'Store'): zfs_pb2.StdReply.FromString,
+    ('zfs.ZfsRpc', 'StoreDelta'): zfs_pb2.StdReply.FromString,
+    ('zfs.ZfsRpc', 'StoreManifest'): zfs_pb2.StdReply.FromString,
     ('zfs.ZfsRpc', 'TestAuth'): zfs_pb2.TestAuthReply.FromString,
   }
   cardinalities = {
+    'CallbackBreaks': cardinality.Cardinality.UNARY_STREAM,
     'Fetch': cardinality.Cardinality.UNARY_STREAM,
+    'FetchChunks': cardinality.Cardinality.UNARY_STREAM,
     'FetchDir': cardinality.Cardinality.UNARY_STREAM,
+    'FetchDirPlus': cardinality.Cardinality.UNARY_STREAM,
+    'FetchMany': cardinality.Cardinality.UNARY_STREAM,
+    'FetchRange': cardinality.Cardinality.UNARY_STREAM,
     'GetFileStat': cardinality.Cardinality.UNARY_UNARY,
+    'GetFileStats': cardinality.Cardinality.UNARY_UNARY,
+    'GetManifest': cardinality.Cardinality.UNARY_UNARY,
+    'GetSignatures': cardinality.Cardinality.UNARY_STREAM,
     'MakeDir': cardinality.Cardinality.UNARY_UNARY,
+    'MissingChunks': cardinality.Cardinality.UNARY_UNARY,
+    'PutChunks': cardinality.Cardinality.STREAM_UNARY,
     'RemoveDir': cardinality.Cardinality.UNARY_UNARY,
     'RemoveFile': cardinality.Cardinality.UNARY_UNARY,
     'Rename': cardinality.Cardinality.UNARY_UNARY,
     'SetFileStat': cardinality.Cardinality.UNARY_UNARY,
     'Store': cardinality.Cardinality.STREAM_UNARY,
+    'StoreDelta': cardinality.Cardinality.STREAM_UNARY,
+    'StoreManifest': cardinality.Cardinality.UNARY_UNARY,
     'TestAuth': cardinality.Cardinality.UNARY_UNARY,
   }
   stub_options = beta_implementations.stub_options(host=host, metadata_transformer=metadata_transformer, request_serializers=request_serializers, response_deserializers=response_deserializers, thread_pool=pool, thread_pool_size=pool_size)
   return beta_implementations.dynamic_stub(channel, 'zfs.ZfsRpc', cardinalities, options=stub_options)
+class EarlyAdopterVolumeLocationServicer(object):
+  """<fill me in later!>"""
+  __metaclass__ = abc.ABCMeta
+  @abc.abstractmethod
+  def GetVolumes(self, request, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
+  def SetVolume(self, request, context):
+    raise NotImplementedError()
+class EarlyAdopterVolumeLocationServer(object):
+  """<fill me in later!>"""
+  __metaclass__ = abc.ABCMeta
+  @abc.abstractmethod
+  def start(self):
+    raise NotImplementedError()
+  @abc.abstractmethod
+  def stop(self):
+    raise NotImplementedError()
+class EarlyAdopterVolumeLocationStub(object):
+  """<fill me in later!>"""
+  __metaclass__ = abc.ABCMeta
+  @abc.abstractmethod
+  def GetVolumes(self, request):
+    raise NotImplementedError()
+  GetVolumes.async = None
+  @abc.abstractmethod
+  def SetVolume(self, request):
+    raise NotImplementedError()
+  SetVolume.async = None
+def early_adopter_create_VolumeLocation_server(servicer, port, private_key=None, certificate_chain=None):
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  method_service_descriptions = {
+    "GetVolumes": alpha_utilities.unary_unary_service_description(
+      servicer.GetVolumes,
+      zfs_pb2.ClientId.FromString,
+      zfs_pb2.VolumeMap.SerializeToString,
+    ),
+    "SetVolume": alpha_utilities.unary_unary_service_description(
+      servicer.SetVolume,
+      zfs_pb2.Volume.FromString,
+      zfs_pb2.StdReply.SerializeToString,
+    ),
+  }
+  return early_adopter_implementations.server("zfs.VolumeLocation", method_service_descriptions, port, private_key=private_key, certificate_chain=certificate_chain)
+def early_adopter_create_VolumeLocation_stub(host, port, metadata_transformer=None, secure=False, root_certificates=None, private_key=None, certificate_chain=None, server_host_override=None):
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  method_invocation_descriptions = {
+    "GetVolumes": alpha_utilities.unary_unary_invocation_description(
+      zfs_pb2.ClientId.SerializeToString,
+      zfs_pb2.VolumeMap.FromString,
+    ),
+    "SetVolume": alpha_utilities.unary_unary_invocation_description(
+      zfs_pb2.Volume.SerializeToString,
+      zfs_pb2.StdReply.FromString,
+    ),
+  }
+  return early_adopter_implementations.stub("zfs.VolumeLocation", method_invocation_descriptions, host, port, metadata_transformer=metadata_transformer, secure=secure, root_certificates=root_certificates, private_key=private_key, certificate_chain=certificate_chain, server_host_override=server_host_override)
+
+class BetaVolumeLocationServicer(object):
+  """<fill me in later!>"""
+  __metaclass__ = abc.ABCMeta
+  @abc.abstractmethod
+  def GetVolumes(self, request, context):
+    raise NotImplementedError()
+  @abc.abstractmethod
+  def SetVolume(self, request, context):
+    raise NotImplementedError()
+
+class BetaVolumeLocationStub(object):
+  """The interface to which stubs will conform."""
+  __metaclass__ = abc.ABCMeta
+  @abc.abstractmethod
+  def GetVolumes(self, request, timeout):
+    raise NotImplementedError()
+  GetVolumes.future = None
+  @abc.abstractmethod
+  def SetVolume(self, request, timeout):
+    raise NotImplementedError()
+  SetVolume.future = None
+
+def beta_create_VolumeLocation_server(servicer, pool=None, pool_size=None, default_timeout=None, maximum_timeout=None):
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  request_deserializers = {
+    ('zfs.VolumeLocation', 'GetVolumes'): zfs_pb2.ClientId.FromString,
+    ('zfs.VolumeLocation', 'SetVolume'): zfs_pb2.Volume.FromString,
+  }
+  response_serializers = {
+    ('zfs.VolumeLocation', 'GetVolumes'): zfs_pb2.VolumeMap.SerializeToString,
+    ('zfs.VolumeLocation', 'SetVolume'): zfs_pb2.StdReply.SerializeToString,
+  }
+  method_implementations = {
+    ('zfs.VolumeLocation', 'GetVolumes'): face_utilities.unary_unary_inline(servicer.GetVolumes),
+    ('zfs.VolumeLocation', 'SetVolume'): face_utilities.unary_unary_inline(servicer.SetVolume),
+  }
+  server_options = beta_implementations.server_options(request_deserializers=request_deserializers, response_serializers=response_serializers, thread_pool=pool, thread_pool_size=pool_size, default_timeout=default_timeout, maximum_timeout=maximum_timeout)
+  return beta_implementations.server(method_implementations, options=server_options)
+
+def beta_create_VolumeLocation_stub(channel, host=None, metadata_transformer=None, pool=None, pool_size=None):
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  import zfs_pb2
+  request_serializers = {
+    ('zfs.VolumeLocation', 'GetVolumes'): zfs_pb2.ClientId.SerializeToString,
+    ('zfs.VolumeLocation', 'SetVolume'): zfs_pb2.Volume.SerializeToString,
+  }
+  response_deserializers = {
+    ('zfs.VolumeLocation', 'GetVolumes'): zfs_pb2.VolumeMap.FromString,
+    ('zfs.VolumeLocation', 'SetVolume'): zfs_pb2.StdReply.FromString,
+  }
+  cardinalities = {
+    'GetVolumes': cardinality.Cardinality.UNARY_UNARY,
+    'SetVolume': cardinality.Cardinality.UNARY_UNARY,
+  }
+  stub_options = beta_implementations.stub_options(host=host, metadata_transformer=metadata_transformer, request_serializers=request_serializers, response_deserializers=response_deserializers, thread_pool=pool, thread_pool_size=pool_size)
+  return beta_implementations.dynamic_stub(channel, 'zfs.VolumeLocation', cardinalities, options=stub_options)
 # @@protoc_insertion_point(module_scope)
@@ -0,0 +1,148 @@
+import threading
+import time
+
+from grpc.beta import interfaces as beta_interfaces
+from grpc.framework.interfaces.face import face
+
+from zfs_common import CLIENT_ID_KEY, STREAMS_PER_CLIENT
+
+# Deadlines, in seconds, by kind of call. Calls that move file data get far
+# longer than metadata calls.
+META_TIMEOUT = 10
+BULK_TIMEOUT = 600
+BULK_METHODS = frozenset(['Fetch', 'FetchRange', 'FetchMany', 'Store', 'StoreDelta', 'GetSignatures', 'GetManifest',
+                          'FetchChunks', 'PutChunks', 'StoreManifest'])
+# Calls, open streams included, in flight on the channel at once.
+RPC_WINDOW = 64
+# Pauses between retries of a call the server was too busy to take, which
+# are retried until the call's deadline would have passed.
+BUSY_DELAY = 0.05
+BUSY_MAX = 5
+
+
+def unreachable(error):
+    # The server could not be reached or did not answer in time, as opposed
+    # to failing the call.
+    return isinstance(error, face.AbortionError) and getattr(error, 'code', None) in \
+        (beta_interfaces.StatusCode.UNAVAILABLE, beta_interfaces.StatusCode.DEADLINE_EXCEEDED)
+
+
+class RpcCore(object):
+    # Every client RPC goes through here. Unary-response calls are started
+    # with the stub's future interface, so a caller can have many of them in
+    # flight on the one channel and wait for them later, without a thread
+    # per outstanding call. FUSE operations use call(), which just waits on
+    # the future. At most window calls and streams are in flight, and at most
+    # bulk of them move file data; further callers wait for a slot. Every
+    # call carries the client id, which the server uses to limit the
+    # transfers any one client has running, so bulk is kept within that
+    # limit and contention queues here instead of being turned away.
+
+    def __init__(self, stub, client_id, window=RPC_WINDOW, meta_timeout=META_TIMEOUT,
+                 bulk_timeout=BULK_TIMEOUT, bulk=STREAMS_PER_CLIENT):
+        self.stub = stub
+        self.metadata = ((CLIENT_ID_KEY, client_id),)
+        self.slots = threading.Semaphore(window)
+        self.bulk_slots = threading.Semaphore(bulk)
+        self.meta_timeout = meta_timeout
+        self.bulk_timeout = bulk_timeout
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.calls = 0
+        self.busy = 0
+
+    def timeout(self, method):
+        return self.bulk_timeout if method in BULK_METHODS else self.meta_timeout
+
+    def _acquire(self, method):
+        if method in BULK_METHODS:
+            self.bulk_slots.acquire()
+        self.slots.acquire()
+        with self.lock:
+            self.in_flight += 1
+            self.calls += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def _release(self, method):
+        with self.lock:
+            self.in_flight -= 1
+        self.slots.release()
+        if method in BULK_METHODS:
+            self.bulk_slots.release()
+
+    def _busy(self, error):
+        if getattr(error, 'code', None) != beta_interfaces.StatusCode.RESOURCE_EXHAUSTED:
+            return False
+        with self.lock:
+            self.busy += 1
+        return True
+
+    def submit(self, method, request, timeout=None):
+        # Starts a call with a unary response and returns its future.
+        self._acquire(method)
+        try:
+            future = getattr(self.stub, method).future(request, timeout or self.timeout(method),
+                                                       metadata=self.metadata)
+        except Exception:
+            self._release(method)
+            raise
+        future.add_done_callback(lambda future: self._release(method))
+        return future
+
+    def _backoff(self, method, timeout):
+        # Yields the pauses before each retry of a busy call, until the
+        # call's deadline would have passed.
+        delay = BUSY_DELAY
+        waited = 0
+        while waited + delay <= (timeout or self.timeout(method)):
+            yield delay
+            waited += delay
+            delay = min(delay * 2, BUSY_MAX)
+
+    def call(self, method, request, timeout=None):
+        # Waits for the reply, retrying while the server is too busy to take
+        # the call. A streamed request is passed as a function returning the
+        # request iterator, so that it can be sent again.
+        pauses = self._backoff(method, timeout)
+        while True:
+            try:
+                return self.submit(method, request() if callable(request) else request, timeout).result()
+            except face.AbortionError as e:
+                if not self._busy(e):
+                    raise
+                delay = next(pauses, None)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+
+    def stream(self, method, request, timeout=None):
+        # Iterates over the responses of a call with a streamed response. The
+        # call starts, and takes its slot, on the first next() and keeps the
+        # slot until the responses are drained or the iterator is dropped. A
+        # call the server was too busy to take is retried.
+        pauses = self._backoff(method, timeout)
+        while True:
+            self._acquire(method)
+            responses = None
+            started = False
+            done = False
+            try:
+                responses = getattr(self.stub, method)(request, timeout or self.timeout(method),
+                                                       metadata=self.metadata)
+                for response in responses:
+                    started = True
+                    yield response
+                done = True
+                return
+            except face.AbortionError as e:
+                if started or not self._busy(e):
+                    raise
+                delay = next(pauses, None)
+                if delay is None:
+                    raise
+            finally:
+                if responses is not None and not done:
+                    responses.cancel()
+                self._release(method)
+            time.sleep(delay)
@@ -2,17 +2,212 @@ __author__ = 'adi'
 
 import time
 import os
+import sys
+import errno
+import mmap
+import stat
 import traceback
+import threading
+import Queue
+import inspect
 
 import zfs_pb2
-from functools import partial
+from grpc.beta import interfaces as beta_interfaces
+from zfs_common import to_ns, signature_block_size, file_signatures, file_chunks, chunk_id, \
+    ChunkStore, ChunkLocations, CompressionStats, Packer, unpack, BlockSizer, CLIENT_ID_KEY, SERVER_PORT, \
+    STREAMS_PER_CLIENT
+from zfs_meta import MetaCache, FileVersions
+from zfs_commit import GroupCommit, Staging, STAGING_NAME
 
 import tempfile
 
-BLOCK_SIZE = 4096
+CALLBACK_POLL = 1
+DIR_BATCH = 1024
+SIGNATURE_BATCH = 1024
+# Signatures of this many recently requested files are kept in memory.
+SIGNATURE_CACHE = 256
+# Directory mtimes only move once per clock tick, so a listing taken this soon
+# after a change may miss a later change with the same mtime. Such listings
+# are sent with version 0, which clients do not cache.
+RACY_WINDOW = 1
+# Chunks uploaded by clients, kept until the StoreManifest that uses them.
+# Chunks of files the server already has are read from those files instead.
+CHUNK_DIR = os.path.join(tempfile.gettempdir(), "zfs_chunks")
+# Manifests of this many recently chunked files are kept in memory. Chunking
+# runs at Python speed, so it is done by a background thread and never while
+# a call waits; at most MANIFEST_QUEUE files wait for it.
+MANIFEST_CACHE = 1024
+MANIFEST_QUEUE = 1024
+# Per-file version numbers and the counter they are issued from.
+VERSION_DIR = os.path.join(tempfile.gettempdir(), "zfs_versions")
+# The staging directories uploads have used, cleaned out at startup.
+STAGING_LIST = os.path.join(tempfile.gettempdir(), "zfs_staging_dirs")
+# Worker threads. Calls that move file data and callback streams hold a
+# thread for as long as they run, so each kind is admitted only up to its
+# own share of the pool and META_WORKERS threads are always left for
+# metadata calls. Over its share, or over its per-client limit, a call is
+# turned away with RESOURCE_EXHAUSTED and the client retries it.
+META_WORKERS = 16
+BULK_WORKERS = 16
+CALLBACK_STREAMS = 64
+
+
+class Admission(object):
+
+    def __init__(self, slots, per_client):
+        self.slots = slots
+        self.per_client = per_client
+        self.active = 0
+        self.clients = {}
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def admit(self, client_id):
+        with self.lock:
+            if self.active >= self.slots or self.clients.get(client_id, 0) >= self.per_client:
+                self.rejected += 1
+                return False
+            self.active += 1
+            self.clients[client_id] = self.clients.get(client_id, 0) + 1
+            return True
+
+    def release(self, client_id):
+        with self.lock:
+            self.active -= 1
+            count = self.clients[client_id] - 1
+            if count:
+                self.clients[client_id] = count
+            else:
+                del self.clients[client_id]
+
+
+def caller(context):
+    for key, value in context.invocation_metadata() or ():
+        if key == CLIENT_ID_KEY:
+            return value
+    return ''
+
+
+def admitted(pool, reply_type=None):
+    # Runs the decorated call only if the named Admission pool of the server
+    # has room for it. reply_type is what a unary call answers when refused.
+    def decorate(method):
+        if inspect.isgeneratorfunction(method):
+            def wrapper(self, request, context):
+                admission = getattr(self, pool)
+                client_id = caller(context)
+                if not self._admit(admission, client_id, context):
+                    return
+                try:
+                    for response in method(self, request, context):
+                        yield response
+                finally:
+                    admission.release(client_id)
+        else:
+            def wrapper(self, request, context):
+                admission = getattr(self, pool)
+                client_id = caller(context)
+                if not self._admit(admission, client_id, context):
+                    return reply_type()
+                try:
+                    return method(self, request, context)
+                finally:
+                    admission.release(client_id)
+        wrapper.__name__ = method.__name__
+        return wrapper
+    return decorate
 
 
 class ZfsServer(zfs_pb2.BetaZfsRpcServicer):
+    def __init__(self, bulk_workers=BULK_WORKERS, streams_per_client=STREAMS_PER_CLIENT,
+                 callback_streams=CALLBACK_STREAMS, port=SERVER_PORT):
+        self.bulk = Admission(bulk_workers, streams_per_client)
+        # A reconnecting client's old stream may linger until it notices.
+        self.watchers = Admission(callback_streams, 2)
+        # callbacks: path -> set of client ids holding a promise on it
+        # clients: client id -> queue of breaks waiting to be streamed to it
+        self.callbacks = {}
+        self.clients = {}
+        self.callback_lock = threading.Lock()
+        # signatures: path -> (version, block size, weak list, strong list, size)
+        self.signatures = {}
+        self.signature_lock = threading.Lock()
+        # manifests: path -> (version, chunk ids, chunk lengths)
+        self.manifests = {}
+        self.manifest_lock = threading.Lock()
+        # Files queued for chunking, and the queue itself.
+        self.chunking = set()
+        self.chunk_queue = Queue.Queue(MANIFEST_QUEUE)
+        t = threading.Thread(target=self._chunk_loop, name="zfs-chunker")
+        t.daemon = True
+        t.start()
+        self.chunk_store = ChunkStore(instance_path(CHUNK_DIR, port))
+        # Left by uploads that died with the server.
+        removed = self.chunk_store.clear()
+        if removed:
+            print "removed", removed, "orphaned chunks"
+        self.locations = ChunkLocations()
+        self.compression = CompressionStats()
+        # lstat results and listings for metadata calls. Every change the
+        # server makes is invalidated here before the reply goes out.
+        self.meta = MetaCache()
+        self.versions = FileVersions(instance_path(VERSION_DIR, port), self.meta.lstat)
+        # Stored files are synced, renamed into place and their directories
+        # synced in batches shared by concurrent stores.
+        self.commits = GroupCommit()
+        self.staging = Staging(instance_path(STAGING_LIST, port), instance_path(STAGING_NAME, port))
+        self.staging.cleanup()
+        # Fetch and FetchRange bytes served, against the process CPU time
+        # since start.
+        self.bytes_served = 0
+        self.serve_lock = threading.Lock()
+        self.started_cpu = sum(os.times()[:2])
+
+    def _add_callback(self, path, client_id):
+        # A promise is only worth making if we can deliver its break. Paths
+        # are kept normalized, as the parents breaks are sent for are.
+        path = os.path.normpath(path)
+        with self.callback_lock:
+            if client_id not in self.clients:
+                return False
+            self.callbacks.setdefault(path, set()).add(client_id)
+            return True
+
+    def _break_callbacks(self, path, origin=None):
+        path = os.path.normpath(path)
+        with self.callback_lock:
+            holders = self.callbacks.pop(path, set())
+            for client_id in holders:
+                if client_id == origin:
+                    # The writer's cached copy is the new version, keep its promise.
+                    self.callbacks.setdefault(path, set()).add(client_id)
+                    continue
+                print "breaking callback on", path, "for client", client_id
+                self.clients[client_id].put(path)
+
+    def _forget_promises(self, client_id):
+        # Caller holds callback_lock.
+        for path in self.callbacks.keys():
+            holders = self.callbacks[path]
+            holders.discard(client_id)
+            if not holders:
+                del self.callbacks[path]
+
+    def _drop_client(self, client_id, queue):
+        with self.callback_lock:
+            if self.clients.get(client_id) is not queue:
+                return
+            del self.clients[client_id]
+            self._forget_promises(client_id)
+
+    def _admit(self, admission, client_id, context):
+        if admission.admit(client_id):
+            return True
+        print "busy, turning away call from client", client_id
+        context.code(beta_interfaces.StatusCode.RESOURCE_EXHAUSTED)
+        context.details('server busy')
+        return False
+
     def _full_path(self, partial):
         if partial.startswith("/"):
             partial = partial[1:]
@@ -26,30 +221,41 @@ class ZfsServer(zfs_pb2.BetaZfsRpcServicer):
         print "Status: ", ret
         return zfs_pb2.StdReply(error_message='Returned, %s!' % ret, status=0)
 
-    def GetFileStat(self, request, context):
-        print "Get attr req received"
-        print "Req path: " + request.path
-        st = os.lstat(request.path)
-        #print "atime", getattr(st, 'st_atime'), "ctime", getattr(st, 'st_ctime')
-        #statMap = dict((key, getattr(st, key)) for key in ('st_ino', 'st_dev', 'st_atime', 'st_ctime', 'st_gid', 'st_mode', 'st_mtime', 'st_nlink', 'st_size', 'st_uid'))
-        #print "from map", statMap['st_atime'], statMap['st_ctime']
-        return zfs_pb2.FileStat(st_atime=getattr(st, 'st_atime'),
-                              st_ctime=getattr(st, 'st_ctime'),
+    def _stat(self, path):
+        try:
+            st = self.meta.lstat(path)
+        except OSError as e:
+            return zfs_pb2.FileStat(path=path, error=e.errno)
+        version = self.versions.current(path, st) if stat.S_ISREG(st.st_mode) else 0
+        return zfs_pb2.FileStat(st_atime_ns=to_ns(st.st_atime),
+                              st_ctime_ns=to_ns(st.st_ctime),
                               st_gid=getattr(st, 'st_gid'),
                               st_mode=getattr(st, 'st_mode'),
-                              st_mtime=getattr(st, 'st_mtime'),
+                              st_mtime_ns=to_ns(st.st_mtime),
                               st_nlink=getattr(st, 'st_nlink'),
                               st_size=getattr(st, 'st_size'),
                               st_uid=getattr(st, 'st_uid'),
                               st_ino=getattr(st, 'st_ino'),
-                              st_dev=getattr(st, 'st_dev'))
-        #for key in ['st_ino', 'st_dev', 'st_atime', 'st_ctime', 'st_gid', 'st_mode', 'st_mtime', 'st_nlink', 'st_size', 'st_uid']:
-            #fileStat.mapfield[key] = st.key
+                              st_dev=getattr(st, 'st_dev'),
+                              version=version,
+                              path=path)
+
+    def GetFileStat(self, request, context):
+        print "Get attr req received"
+        print "Req path: " + request.path
+        return self._stat(request.path)
+
+    def GetFileStats(self, request, context):
+        print "batched get attr req received for", len(request.paths), "files"
+        return zfs_pb2.FileStats(stats=[self._stat(path) for path in request.paths])
 
     def RemoveDir(self, request, context):
         print "Rm dir req received"
         print "Req path: " + request.path
         os.rmdir(request.path)
+        self.meta.invalidate(request.path, tree=True)
+        self._break_callbacks(request.path, request.client_id)
+        self._break_callbacks(os.path.dirname(request.path))
         return zfs_pb2.StdReply(status=1, error_message='')
         # print "Status: " + retdef release(self, path, fh):
         # print "sending release req"#
@@ -60,6 +266,8 @@ class ZfsServer(zfs_pb2.BetaZfsRpcServicer):
         print "Mk dir req received"
         print "Req path: " + request.path
         os.mkdir(request.path, request.mode)
+        self.meta.invalidate(request.path)
+        self._break_callbacks(os.path.dirname(request.path))
         return zfs_pb2.StdReply(status=1, error_message='')
         # print "Status: " + ret
         # return zfs_pb2.IntRet(message='Returned, %s!' % ret)
@@ -67,76 +275,481 @@ class ZfsServer(zfs_pb2.BetaZfsRpcServicer):
     def RemoveFile(self, request, context):
         print "unlink req received"
         os.unlink(request.path)
+        self.meta.invalidate(request.path)
+        self.versions.forget(request.path)
+        self._forget_manifest(request.path)
+        self._break_callbacks(request.path, request.client_id)
+        self._break_callbacks(os.path.dirname(request.path))
         return zfs_pb2.StdReply(status=1, error_message='')
 
+    @admitted('bulk')
     def Fetch(self, request, context):
         print "read file req recvd for file: ", request.path
+        # Promised before the file is opened, so a store committing after
+        # the open cannot miss the client.
+        if request.client_id:
+            self._add_callback(request.path, request.client_id)
         try:
-            fd = open(request.path, 'r+')
+            fd = open(request.path, 'rb')
             with fd as reader:
-                for chunk in iter(partial(reader.read, BLOCK_SIZE), ''):
-                    print "read block", chunk
+                # The client expects the file length as the first block so it
+                # can tell a complete fetch from a truncated one.
+                size = os.fstat(fd.fileno()).st_size
+                yield zfs_pb2.FileDataBlock(length=size)
+                packer = Packer(request.codecs, request.path, self.compression)
+                sizer = BlockSizer(size, request.block_size)
+                for chunk in self._file_blocks(reader, 0, size, sizer):
+                    codec, payload = packer.pack(chunk)
+                    yield zfs_pb2.FileDataBlock(data_block=payload, codec=codec)
+                    sizer.sent(len(payload))
+                print "compression:", " ".join(self.compression.report(request.path))
+                print "sent", request.path, "in blocks of up to", sizer.block_size, "bytes"
+        except (OSError, ValueError, IOError):
+            print "error", traceback.print_exc()
+
+    @admitted('bulk')
+    def FetchRange(self, request, context):
+        print "range req recvd for file:", request.path, "offset:", request.offset, "length:", request.length
+        try:
+            with open(request.path, 'r') as reader:
+                if self.versions.current(request.path, os.fstat(reader.fileno())) != request.version:
+                    print "file changed since client started caching it:", request.path
+                    return
+                sizer = BlockSizer(request.length, request.block_size)
+                for chunk in self._file_blocks(reader, request.offset, request.length, sizer):
                     yield zfs_pb2.FileDataBlock(data_block=chunk)
+                    sizer.sent(len(chunk))
         except (OSError, ValueError, IOError):
             print "error", traceback.print_exc()
 
+    @admitted('bulk')
+    def FetchMany(self, request, context):
+        print "fetch many req recvd for", len(request.paths), "files"
+        sent = 0
+        for path in request.paths:
+            # Before the open, as in Fetch.
+            if request.client_id:
+                self._add_callback(path, request.client_id)
+            try:
+                with open(path, 'rb') as reader:
+                    st = os.fstat(reader.fileno())
+                    if not stat.S_ISREG(st.st_mode) or (request.max_size and st.st_size > request.max_size):
+                        yield zfs_pb2.FileDataBlock(path=path, error=errno.EFBIG)
+                        continue
+                    # The version of the inode we have open, so it matches
+                    # the data even if the file is replaced meanwhile.
+                    yield zfs_pb2.FileDataBlock(path=path, length=st.st_size,
+                                                version=self.versions.current(path, st))
+                    packer = Packer(request.codecs, path, self.compression)
+                    sizer = BlockSizer(st.st_size, request.block_size)
+                    for chunk in self._file_blocks(reader, 0, st.st_size, sizer):
+                        codec, payload = packer.pack(chunk)
+                        yield zfs_pb2.FileDataBlock(data_block=payload, codec=codec)
+                        sizer.sent(len(payload))
+                    sent += 1
+            except (OSError, IOError) as e:
+                yield zfs_pb2.FileDataBlock(path=path, error=e.errno or errno.EIO)
+        print "sent", sent, "of", len(request.paths), "files"
+
+    def _file_blocks(self, reader, offset, length, sizer):
+        # Yields [offset, offset + length) of the file in blocks of
+        # sizer.block_size, sliced out of a read-only mapping of it rather
+        # than read through a file object. Stores replace files by rename, so
+        # the mapped file is never truncated under us. The protobuf runtime
+        # only takes str for bytes fields, so each slice is still copied once,
+        # straight from the page cache.
+        end = min(offset + length, os.fstat(reader.fileno()).st_size)
+        if offset >= end:
+            return
+        mapped = mmap.mmap(reader.fileno(), 0, prot=mmap.PROT_READ)
+        try:
+            while offset < end:
+                block = mapped[offset:min(offset + sizer.block_size, end)]
+                offset += len(block)
+                with self.serve_lock:
+                    self.bytes_served += len(block)
+                yield block
+        finally:
+            mapped.close()
+            self._report_serving()
+
+    def _report_serving(self):
+        with self.serve_lock:
+            served = self.bytes_served
+        cpu = sum(os.times()[:2]) - self.started_cpu
+        print "served", served, "bytes, %.2fs cpu per GB" % (cpu / max(served / float(1 << 30), 1e-9))
+
     def read(self, path, length, offset, fh):
         return os.lsos.read(fh, length)
 
+    @admitted('bulk', zfs_pb2.StdReply)
     def Store(self, request_iterator, context):
         print "store req received"
-
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            tmp_filename = tmp.name
-            act_filename = None
-            actlen = 0
-            count = 0
-            for chunk in request_iterator:
-                if count == 0:
-                    print "Not read, opening file: ", chunk.data_block
-                    count += 1
-                    act_filename = chunk.data_block
-                if count == 1:
-                    print "Not read, opening file: ", chunk.data_block
-                    count += 1
-                    actlen = chunk.data_block
-                else:
-                    tmp.write(chunk.data_block)
-            tmp.flush()
-            os.fsync(tmp.fileno())
+        header = next(request_iterator)
+        act_filename = header.path
+        print "staging upload of", act_filename, ":", header.length, "bytes"
+        tmp, tmp_filename = self.staging.create(act_filename, header.length)
+        try:
+            with tmp:
+                for chunk in request_iterator:
+                    tmp.write(unpack(chunk.codec, chunk.data_block, act_filename, self.compression))
+        except Exception:
+            os.unlink(tmp_filename)
+            raise
+        return self._commit_store(tmp_filename, act_filename, header.length, header.client_id)
+
+    def _commit_store(self, tmp_filename, act_filename, actlen, client_id):
         tmplen = os.stat(tmp_filename).st_size
         print "tmplen:", tmplen, "actual len:", actlen
-        if tmplen < actlen:
-            return zfs_pb2.StdReply(status=0, error_message='not stored')
+        if tmplen != actlen:
+            os.unlink(tmp_filename)
+            return zfs_pb2.StdReply(status=0, error_message='not stored, length mismatch')
+
+        created = not os.path.exists(act_filename)
+        # The staging file is private (0600); keep the mode of the file it replaces.
+        if created:
+            os.chmod(tmp_filename, 0644)
+        else:
+            os.chmod(tmp_filename, stat.S_IMODE(os.lstat(act_filename).st_mode))
+        try:
+            self.commits.commit(tmp_filename, act_filename)
+        except (OSError, IOError) as e:
+            print "store of", act_filename, "failed:", e
+            if os.path.exists(tmp_filename):
+                os.unlink(tmp_filename)
+            return zfs_pb2.StdReply(status=0, error_message=str(e))
+        self.meta.invalidate(act_filename)
+        version = self.versions.bump(act_filename)
+        self._break_callbacks(act_filename, client_id)
+        if created:
+            self._break_callbacks(os.path.dirname(act_filename))
+        return zfs_pb2.StdReply(status=1, error_message='', version=version)
+
+    def _signatures(self, path):
+        with open(path, 'rb') as reader:
+            st = os.fstat(reader.fileno())
+            version = self.versions.current(path, st)
+            with self.signature_lock:
+                cached = self.signatures.get(path)
+            if cached is not None and cached[0] == version:
+                return cached
+            block_size = signature_block_size(st.st_size)
+            weaks = []
+            strongs = []
+            for weak, strong in file_signatures(reader, block_size):
+                weaks.append(weak)
+                strongs.append(strong)
+        sigs = (version, block_size, weaks, strongs, st.st_size)
+        with self.signature_lock:
+            if len(self.signatures) >= SIGNATURE_CACHE:
+                self.signatures.pop(next(iter(self.signatures)))
+            self.signatures[path] = sigs
+        return sigs
+
+    @admitted('bulk')
+    def GetSignatures(self, request, context):
+        print "signature req recvd for file:", request.path
+        version, block_size, weaks, strongs, size = self._signatures(request.path)
+        yield zfs_pb2.SignatureBlock(block_size=block_size, version=version, size=size)
+        for i in range(0, len(weaks), SIGNATURE_BATCH):
+            yield zfs_pb2.SignatureBlock(weak=weaks[i:i + SIGNATURE_BATCH],
+                                         strong=strongs[i:i + SIGNATURE_BATCH])
+
+    @admitted('bulk', zfs_pb2.StdReply)
+    def StoreDelta(self, request_iterator, context):
+        print "delta store req received"
+        header = next(request_iterator)
+        act_filename = header.path
+        try:
+            base = open(act_filename, 'rb')
+        except IOError:
+            return zfs_pb2.StdReply(status=0, error_message='no base')
+        with base:
+            if self.versions.current(act_filename, os.fstat(base.fileno())) != header.base_version:
+                print "base of delta changed on server:", act_filename
+                return zfs_pb2.StdReply(status=0, error_message='base changed')
+            copied = 0
+            literal = 0
+            tmp, tmp_filename = self.staging.create(act_filename, header.length)
+            try:
+                with tmp:
+                    for block in request_iterator:
+                        if block.copy_count:
+                            base.seek(block.copy_index * header.block_size)
+                            data = base.read(block.copy_count * header.block_size)
+                            copied += len(data)
+                            tmp.write(data)
+                        else:
+                            literal += len(block.literal)
+                            tmp.write(block.literal)
+            except Exception:
+                os.unlink(tmp_filename)
+                raise
+        print "delta for", act_filename, ":", copied, "bytes copied,", literal, "bytes sent"
+        return self._commit_store(tmp_filename, act_filename, header.length, header.client_id)
+
+    def _manifest(self, path):
+        # The manifest of the file as it is now, if one is cached; otherwise
+        # None, and the file is queued to be chunked.
+        version = self.versions.current(path)
+        with self.manifest_lock:
+            cached = self.manifests.get(path)
+        if cached is not None and cached[0] == version:
+            return cached
+        with self.manifest_lock:
+            if path in self.chunking:
+                return None
+            self.chunking.add(path)
+        try:
+            self.chunk_queue.put_nowait(path)
+        except Queue.Full:
+            with self.manifest_lock:
+                self.chunking.discard(path)
+        return None
 
-        os.rename(tmp_filename, act_filename)
+    def _chunk_loop(self):
+        while True:
+            path = self.chunk_queue.get()
+            try:
+                with open(path, 'rb') as reader:
+                    version = self.versions.current(path, os.fstat(reader.fileno()))
+                    ids = []
+                    lengths = []
+                    for cid, data in file_chunks(reader):
+                        ids.append(cid)
+                        lengths.append(len(data))
+                self._remember_manifest(path, version, ids, lengths)
+            except (OSError, IOError) as e:
+                print "cannot chunk", path, ":", e
+            finally:
+                with self.manifest_lock:
+                    self.chunking.discard(path)
+
+    def _remember_manifest(self, path, version, ids, lengths):
+        manifest = (version, ids, lengths)
+        with self.manifest_lock:
+            if path not in self.manifests and len(self.manifests) >= MANIFEST_CACHE:
+                self.locations.forget(self.manifests.popitem()[0])
+            self.manifests[path] = manifest
+        self.locations.add(path, ids, lengths)
+        return manifest
+
+    def _forget_manifest(self, path):
+        with self.manifest_lock:
+            self.manifests.pop(path, None)
+        self.locations.forget(path)
+
+    def _chunk(self, cid):
+        data = self.locations.read(cid)
+        if data is None:
+            data = self.chunk_store.get(cid)
+        return data
+
+    @admitted('bulk', zfs_pb2.Manifest)
+    def GetManifest(self, request, context):
+        print "manifest req recvd for file:", request.path
+        # Before the version is read, as in Fetch.
+        if request.client_id:
+            self._add_callback(request.path, request.client_id)
+        try:
+            manifest = self._manifest(request.path)
+        except (OSError, IOError) as e:
+            return zfs_pb2.Manifest(path=request.path, error=e.errno or 1)
+        if manifest is None:
+            # Not chunked yet; fetch it whole this time.
+            return zfs_pb2.Manifest(path=request.path, error=errno.EAGAIN)
+        version, ids, lengths = manifest
+        return zfs_pb2.Manifest(path=request.path, ids=ids, lengths=lengths, version=version,
+                                size=sum(lengths))
+
+    @admitted('bulk')
+    def FetchChunks(self, request, context):
+        print "chunk req recvd for", len(request.ids), "chunks"
+        packer = Packer(request.codecs, request.path, self.compression)
+        for cid in request.ids:
+            data = self._chunk(cid)
+            if data is not None:
+                codec, payload = packer.pack(data)
+                yield zfs_pb2.ChunkData(id=cid, data=payload, codec=codec)
+
+    def MissingChunks(self, request, context):
+        missing = [cid for cid in request.ids
+                   if not self.locations.has(cid) and not self.chunk_store.has(cid)]
+        print "missing", len(missing), "of", len(request.ids), "chunks"
+        return zfs_pb2.ChunkIds(ids=missing)
+
+    @admitted('bulk', zfs_pb2.StdReply)
+    def PutChunks(self, request_iterator, context):
+        count = 0
+        path = ''
+        for chunk in request_iterator:
+            path = path or chunk.path
+            data = unpack(chunk.codec, chunk.data, path, self.compression)
+            if chunk_id(data) != chunk.id:
+                return zfs_pb2.StdReply(status=0, error_message='corrupt chunk')
+            self.chunk_store.put(chunk.id, data)
+            count += 1
+        print "stored", count, "chunks"
         return zfs_pb2.StdReply(status=1, error_message='')
 
+    @admitted('bulk', zfs_pb2.StdReply)
+    def StoreManifest(self, request, context):
+        print "manifest store req recvd for file:", request.path
+        tmp, tmp_filename = self.staging.create(request.path, request.size)
+        with tmp:
+            for cid in request.ids:
+                data = self._chunk(cid)
+                if data is None:
+                    break
+                tmp.write(data)
+            else:
+                data = ''
+        if data is None:
+            os.unlink(tmp_filename)
+            reply = zfs_pb2.StdReply(status=0, error_message='missing chunks')
+        else:
+            reply = self._commit_store(tmp_filename, request.path, request.size, request.client_id)
+        if reply.status == 1:
+            self._remember_manifest(request.path, reply.version, list(request.ids), list(request.lengths))
+        # The file now holds what was uploaded for it; on failure the client
+        # falls back to sending the file another way.
+        for cid in set(request.ids):
+            self.chunk_store.remove(cid)
+        return reply
+
+    def _dir_version(self, path):
+        st = self.meta.lstat(path)
+        if time.time() - st.st_mtime < RACY_WINDOW:
+            return 0
+        return to_ns(st.st_mtime)
+
     def FetchDir(self, request, context):
         print "readdir req recvd for:", request.path
+        return self._dir_blocks(request, False)
+
+    def FetchDirPlus(self, request, context):
+        print "readdirplus req recvd for:", request.path
+        return self._dir_blocks(request, True)
+
+    def _dir_blocks(self, request, plus):
         dirents = ['.', '..']
-        if os.path.isdir(request.path):
-            dirents.extend(os.listdir(request.path))
-        for r in dirents:
-            yield zfs_pb2.DirListBlock(dir_list_block=r)
+        version = 0
+        not_modified = 0
+        # Read the version before the names: if the directory changes in
+        # between, the client just relists on its next revalidation.
+        if self.meta.isdir(request.path):
+            # Before the version is read, as in Fetch.
+            if request.client_id:
+                self._add_callback(request.path, request.client_id)
+            version = self._dir_version(request.path)
+            if version and request.version == version:
+                not_modified = 1
+            # Attributes are sent even when the names are not.
+            if plus or not not_modified:
+                # Staging files of uploads in progress are not shown.
+                dirents.extend(name for name in self.meta.listdir(request.path)
+                               if not name.startswith(STAGING_NAME))
+        if not_modified and not plus:
+            yield zfs_pb2.DirListBlock(version=version, not_modified=1)
+            return
+        for i in range(0, len(dirents), DIR_BATCH):
+            batch = dirents[i:i + DIR_BATCH]
+            block = zfs_pb2.DirListBlock(version=version, not_modified=not_modified)
+            if not not_modified:
+                block.names.extend(batch)
+            if plus:
+                block.stats.extend(self._stat(os.path.normpath(os.path.join(request.path, name)))
+                                   for name in batch)
+            yield block
 
     def TestAuth(self, request, context):
         print "test auth req received for file: ", request.path
-        mtime = os.lstat(request.path).st_mtime
-        caller_mtime = request.st_mtime
-        print "mtime on server: ", mtime, "; mtime received from client: ", caller_mtime, "; server-client= ", mtime-caller_mtime
-        if mtime > caller_mtime:
+        # Before the version is read, as in Fetch.
+        callback = 0
+        if request.client_id and self._add_callback(request.path, request.client_id):
+            callback = 1
+        st = self.meta.lstat(request.path)
+        version = self.versions.current(request.path, st)
+        print "version on server:", version, "; version received from client:", request.version
+        if version != request.version:
             print "file modified on server"
-            return zfs_pb2.TestAuthReply(flag=1)
-        else:
-            return zfs_pb2.TestAuthReply(flag=0)
+            # The client refetches it next and needs the size for that.
+            return zfs_pb2.TestAuthReply(flag=1, version=version, size=st.st_size)
+        return zfs_pb2.TestAuthReply(flag=0, callback=callback, version=version)
+
+    @admitted('watchers')
+    def CallbackBreaks(self, request, context):
+        client_id = request.client_id
+        print "callback stream opened by client", client_id
+        queue = Queue.Queue()
+        with self.callback_lock:
+            # A reconnecting client has already dropped its old promises.
+            self._forget_promises(client_id)
+            self.clients[client_id] = queue
+        try:
+            yield zfs_pb2.CallbackBreak(path='')
+            while context.is_active():
+                try:
+                    path = queue.get(timeout=CALLBACK_POLL)
+                except Queue.Empty:
+                    continue
+                yield zfs_pb2.CallbackBreak(path=path)
+        finally:
+            print "callback stream closed for client", client_id
+            self._drop_client(client_id, queue)
 
     def SetFileStat(self, request, context):
-        print "set file stat"
+        print "set file stat for:", request.path
+        try:
+            held = self._held(request.path, request.version)
+            os.chmod(request.path, stat.S_IMODE(request.st_mode))
+        except OSError as e:
+            return zfs_pb2.StdReply(status=0, error_message=str(e))
+        self.meta.invalidate(request.path)
+        version = self.versions.bump(request.path)
+        self._break_callbacks(request.path)
+        return zfs_pb2.StdReply(status=1, error_message='', version=self._carry(request.path, held, version))
+
+    def _held(self, path, version):
+        # The inode of path if the caller's copy of it, at version, is the
+        # file as it is now, else None. A file is not given a new version
+        # for its chmod or rename to be refetched by the client that made it.
+        if not version:
+            return None
+        try:
+            st = os.lstat(path)
+            if stat.S_ISREG(st.st_mode) and self.versions.current(path, st) == version:
+                return st.st_ino
+        except OSError:
+            pass
+        return None
+
+    def _carry(self, path, held, version):
+        # version, for the caller to record, if the file changed is still the
+        # one it held a copy of; 0 if a store replaced it in between.
+        try:
+            if held is not None and os.lstat(path).st_ino == held:
+                return version
+        except OSError:
+            pass
+        return 0
 
     def Rename(self, request, context):
+        held = self._held(request.old, request.version)
         os.rename(request.old, request.new)
-        return zfs_pb2.StdReply(status=1, error_message='')
+        self.meta.invalidate(request.old, tree=True)
+        self.meta.invalidate(request.new, tree=True)
+        self.versions.forget(request.old)
+        version = 0
+        if not self.meta.isdir(request.new):
+            version = self._carry(request.new, held, self.versions.bump(request.new))
+        self._forget_manifest(request.old)
+        self._forget_manifest(request.new)
+        self._break_callbacks(request.old, request.client_id)
+        self._break_callbacks(request.new, request.client_id)
+        self._break_callbacks(os.path.dirname(request.old))
+        self._break_callbacks(os.path.dirname(request.new))
+        return zfs_pb2.StdReply(status=1, error_message='', version=version)
 
     def write(self, path, buf, offset, fh):
         os.lseek(fh, offset, os.SEEK_SET)
@@ -201,17 +814,30 @@ class ZfsServer(zfs_pb2.BetaZfsRpcServicer):
             f.truncate(length)
 
 
-def serve():
-    print "running server"
-    server = zfs_pb2.beta_create_ZfsRpc_server(ZfsServer())
-    server.add_insecure_port('[::]:50051')
+def instance_path(path, port):
+    # Servers on other ports keep state of their own, so that several, each
+    # holding its own volumes, can share a machine.
+    return path if port == SERVER_PORT else "%s.%d" % (path, port)
+
+
+def serve(meta_workers=META_WORKERS, bulk_workers=BULK_WORKERS, streams_per_client=STREAMS_PER_CLIENT,
+          callback_streams=CALLBACK_STREAMS, port=SERVER_PORT):
+    print "running server on port", port
+    servicer = ZfsServer(bulk_workers, streams_per_client, callback_streams, port)
+    server = zfs_pb2.beta_create_ZfsRpc_server(
+        servicer, pool_size=meta_workers + bulk_workers + callback_streams)
+    server.add_insecure_port('[::]:%d' % port)
     server.start()
     try:
         while True:
             time.sleep(24*60*60)
     except KeyboardInterrupt:
         server.stop()
+        servicer.versions.sync()
 
 
 if __name__ == '__main__':
-    serve()
+    if len(sys.argv) == 2:
+        serve(port=int(sys.argv[1]))
+    else:
+        serve()
@@ -0,0 +1,235 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from grpc.beta import implementations
+
+import zfs_pb2
+from zfs_common import CLIENT_ID_KEY, SERVER_PORT
+from zfs_rpc import RpcCore, RPC_WINDOW, META_TIMEOUT, BULK_TIMEOUT
+
+# The volume location service: which ZfsRpc server holds which part of the
+# namespace. A volume is an absolute path prefix; a path belongs to the
+# volume with the longest prefix of it.
+
+VLDB_PORT = 50050
+VLDB_WORKERS = 4
+VOLUME_TABLE = os.path.join(tempfile.gettempdir(), "zfs_volumes")
+# Clients fetch the table again this often, in seconds.
+VOLUME_REFRESH = 30
+
+
+def split_endpoint(endpoint, default_port):
+    # "host" or "host:port" -> (host, port)
+    host, _, port = endpoint.rpartition(':')
+    if not host or not port.isdigit():
+        return endpoint, default_port
+    return host, int(port)
+
+
+def in_volume(prefix, path):
+    return path == prefix or path.startswith(prefix.rstrip('/') + '/')
+
+
+def owner(volumes, path):
+    # volumes: (prefix, endpoint) pairs, longest prefix first
+    for prefix, endpoint in volumes:
+        if in_volume(prefix, path):
+            return endpoint
+    return None
+
+
+def request_path(request):
+    # The path a request is about, which decides the server it goes to.
+    for field in ('path', 'old'):
+        path = getattr(request, field, '')
+        if path:
+            return path
+    paths = getattr(request, 'paths', None)
+    if paths:
+        return paths[0]
+    raise ValueError("no path to route %s by" % type(request).__name__)
+
+
+class VolumeTable(object):
+    # The table, kept in a file: the generation on the first line, then a
+    # line of prefix and endpoint, tab separated, per volume. It is
+    # rewritten whole, through a synced temporary file and a rename, on
+    # every change.
+
+    def __init__(self, path):
+        self.path = path
+        self.volumes = {}
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                lines = f.read().splitlines()
+        except IOError:
+            return
+        if lines:
+            self.generation = int(lines[0])
+        for line in lines[1:]:
+            prefix, _, endpoint = line.partition('\t')
+            if prefix and endpoint:
+                self.volumes[prefix] = endpoint
+        print "loaded", len(self.volumes), "volumes, generation", self.generation
+
+    def snapshot(self):
+        with self.lock:
+            return self.generation, sorted(self.volumes.items())
+
+    def set(self, prefix, endpoint):
+        with self.lock:
+            if endpoint:
+                self.volumes[prefix] = endpoint
+            elif self.volumes.pop(prefix, None) is None:
+                return
+            self.generation += 1
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                f.write("%d\n" % self.generation)
+                for item in sorted(self.volumes.items()):
+                    f.write("%s\t%s\n" % item)
+                f.flush()
+                os.fsync(f.fileno())
+            os.rename(tmp_path, self.path)
+
+
+class VolumeLocationServer(zfs_pb2.BetaVolumeLocationServicer):
+
+    def __init__(self, table_path=VOLUME_TABLE):
+        self.table = VolumeTable(table_path)
+        self.table.load()
+
+    def GetVolumes(self, request, context):
+        generation, volumes = self.table.snapshot()
+        return zfs_pb2.VolumeMap(generation=generation,
+                                 volumes=[zfs_pb2.Volume(prefix=prefix, endpoint=endpoint)
+                                          for prefix, endpoint in volumes])
+
+    def SetVolume(self, request, context):
+        if not os.path.isabs(request.prefix) or '\t' in request.prefix + request.endpoint:
+            return zfs_pb2.StdReply(status=0, error_message="bad volume prefix or endpoint")
+        prefix = os.path.normpath(request.prefix)
+        print "volume", prefix, "now at", request.endpoint or "nowhere"
+        try:
+            self.table.set(prefix, request.endpoint)
+        except (OSError, IOError) as e:
+            return zfs_pb2.StdReply(status=0, error_message=str(e))
+        return zfs_pb2.StdReply(status=1)
+
+
+class VolumeRouter(object):
+    # Stands in for RpcCore on the client. Every call goes to the RpcCore of
+    # the server holding the volume of the request's path, or of the path
+    # passed with it for requests that do not carry one. Paths in no volume
+    # go to the default server, so without a location service there is just
+    # that one. The table is fetched from the location service by refresh().
+
+    def __init__(self, client_id, default, location=None, window=RPC_WINDOW, meta_timeout=META_TIMEOUT,
+                 bulk_timeout=BULK_TIMEOUT):
+        self.client_id = client_id
+        self.default = default
+        self.metadata = ((CLIENT_ID_KEY, client_id),)
+        self.options = (window, meta_timeout, bulk_timeout)
+        self.location = None
+        if location:
+            host, port = split_endpoint(location, VLDB_PORT)
+            stub = zfs_pb2.beta_create_VolumeLocation_stub(implementations.insecure_channel(host, port))
+            self.location = RpcCore(stub, client_id, 1, meta_timeout, meta_timeout)
+        # volumes: (prefix, endpoint) pairs, longest prefix first
+        self.volumes = []
+        self.generation = -1
+        # cores: endpoint -> RpcCore on a channel to it
+        self.cores = {}
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        # Returns whether the table changed.
+        if self.location is None:
+            return False
+        reply = self.location.call('GetVolumes', zfs_pb2.ClientId(client_id=self.client_id))
+        volumes = sorted(((v.prefix, v.endpoint) for v in reply.volumes), key=lambda v: len(v[0]), reverse=True)
+        with self.lock:
+            if reply.generation == self.generation:
+                return False
+            self.generation = reply.generation
+            self.volumes = volumes
+        print "volume table generation", reply.generation, "with", len(volumes), "volumes"
+        return True
+
+    def endpoint(self, path):
+        with self.lock:
+            return owner(self.volumes, path) or self.default
+
+    def endpoints(self):
+        with self.lock:
+            return set([self.default] + [endpoint for prefix, endpoint in self.volumes])
+
+    def core(self, endpoint):
+        with self.lock:
+            core = self.cores.get(endpoint)
+            if core is None:
+                host, port = split_endpoint(endpoint, SERVER_PORT)
+                stub = zfs_pb2.beta_create_ZfsRpc_stub(implementations.insecure_channel(host, port))
+                core = self.cores[endpoint] = RpcCore(stub, self.client_id, *self.options)
+            return core
+
+    def route(self, path):
+        return self.core(self.endpoint(path))
+
+    def submit(self, method, request, timeout=None, path=None):
+        return self.route(path or request_path(request)).submit(method, request, timeout)
+
+    def call(self, method, request, timeout=None, path=None):
+        return self.route(path or request_path(request)).call(method, request, timeout)
+
+    def stream(self, method, request, timeout=None, path=None):
+        return self.route(path or request_path(request)).stream(method, request, timeout)
+
+    def report(self):
+        with self.lock:
+            cores = self.cores.items()
+        return ["%s: calls %d, peak in flight %d, busy %d" % (endpoint, core.calls, core.peak, core.busy)
+                for endpoint, core in sorted(cores)]
+
+
+def serve(port=VLDB_PORT, table_path=VOLUME_TABLE):
+    print "running volume location service"
+    server = zfs_pb2.beta_create_VolumeLocation_server(VolumeLocationServer(table_path), pool_size=VLDB_WORKERS)
+    server.add_insecure_port('[::]:%d' % port)
+    server.start()
+    try:
+        while True:
+            time.sleep(24*60*60)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+def main(args):
+    # zfs_vldb.py [port]                              run the service
+    # zfs_vldb.py list <location>                     print the table
+    # zfs_vldb.py set <location> <prefix> [endpoint]  add, move or remove a volume
+    if not args or args[0].isdigit():
+        serve(*[int(arg) for arg in args[:1]])
+        return
+    host, port = split_endpoint(args[1], VLDB_PORT)
+    stub = zfs_pb2.beta_create_VolumeLocation_stub(implementations.insecure_channel(host, port))
+    if args[0] == 'list':
+        reply = stub.GetVolumes(zfs_pb2.ClientId(), META_TIMEOUT)
+        print "generation", reply.generation
+        for volume in reply.volumes:
+            print volume.prefix, volume.endpoint
+    elif args[0] == 'set':
+        reply = stub.SetVolume(zfs_pb2.Volume(prefix=args[2], endpoint=(args[3:] or [''])[0]), META_TIMEOUT)
+        if reply.status != 1:
+            print "failed:", reply.error_message
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])